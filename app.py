@@ -3,6 +3,7 @@ from ui.sidebar import render_sidebar
 from ui.dashboard import render_main_content
 from ui.theme import apply_custom_theme
 from ui.state import ensure_defaults
+from models.llm_manager import local_llm_manager
 
 
 def main():
@@ -16,6 +17,10 @@ def main():
     apply_custom_theme()
     ensure_defaults()
 
+    # Preload writer/researcher models in the background so the first generation
+    # doesn't pay the model load (no-op once they are warm)
+    local_llm_manager.start_warm_up()
+
     # Add a custom header
     st.markdown("""
     <div style='text-align: center; padding: 1rem; background: var(--card); border-bottom: 1px solid var(--border); margin-bottom: 1rem; border-radius: var(--radius);'>
@@ -0,0 +1,109 @@
+"""
+Backend benchmark: the same prompts through Ollama (HTTP) and llama.cpp (in-process).
+
+Each prompt runs through LocalLLMClient.invoke on both backends, so the numbers
+include everything a node pays: request building, transport, parsing and
+Response construction. Caching and coalescing are off. Reports per backend and
+prompt: median wall time, time to first token (prompt eval), decode speed and
+overhead (wall time the backend didn't spend loading, evaluating or decoding;
+for Ollama this is serialization and the network hop).
+
+Usage:
+    python benchmarks/llm_backends.py --model llama3.1:8b [--gguf path/to/model.gguf]
+        [--runs 5] [--max-tokens 128] [--threads 8] [--backends ollama llama_cpp]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PROMPTS = {
+    # Short structured call, like ranking or keyword extraction
+    "classify": [
+        ("system", "You are a research analyst. Return ONLY a JSON object."),
+        ("human", 'Which of these topics is about databases? 1. B-trees 2. CSS grid 3. Raft. '
+                  'Return {"indices": [...]}'),
+    ],
+    # Longer prompt with a paragraph of output, like a section draft
+    "draft": [
+        ("system", "You are a technical writer."),
+        ("human", "Write a short paragraph explaining how a write-ahead log makes database commits durable. "
+                  "Mention fsync, checkpoints and crash recovery. " * 4),
+    ],
+}
+
+
+def run_backend(client, runs: int) -> dict:
+    """Warm the model once, then time `runs` invocations per prompt"""
+    client.backend.load(client.model, keep_alive=client.keep_alive,
+                        num_ctx=client.manager.num_ctx_for(client.model, client.max_tokens))
+    results = {}
+    for name, messages in PROMPTS.items():
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            response = client.invoke(messages, use_cache=False)
+            wall_ms = (time.perf_counter() - started) * 1000
+            if response.response_metadata.get("model") == "perplexity":
+                raise RuntimeError("local call failed and was answered by the Perplexity fallback")
+            timings = response.response_metadata.get("timings", {})
+            usage = response.response_metadata.get("token_usage", {})
+            samples.append({
+                "wall_ms": wall_ms,
+                "ttft_ms": timings.get("load_ms", 0) + timings.get("prompt_eval_ms", 0),
+                "tok_s": usage.get("completion_tokens", 0) / (timings["eval_ms"] / 1000) if timings.get("eval_ms") else 0,
+                "overhead_ms": max(0.0, wall_ms - timings.get("total_ms", 0)),
+            })
+        results[name] = {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.getenv("LOCAL_WRITER_MODEL", "llama3.1:8b"),
+                        help="Ollama model name (also used to find the GGUF file)")
+    parser.add_argument("--gguf", help="GGUF file for the llama.cpp backend (default: LLAMA_CPP_MODEL_DIR lookup)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-tokens", type=int, default=128)
+    parser.add_argument("--threads", type=int, help="llama.cpp threads (default: LLAMA_CPP_THREADS / physical cores)")
+    parser.add_argument("--backends", nargs="+", default=["ollama", "llama_cpp"])
+    args = parser.parse_args()
+
+    from models.backends import LlamaCppBackend, create_backend
+    from models.llm_manager import LocalLLMClient, local_llm_manager
+
+    local_llm_manager.response_cache.enabled = False
+    backends = {
+        "ollama": lambda: create_backend("ollama", local_llm_manager),
+        "llama_cpp": lambda: LlamaCppBackend(
+            model_map={args.model: args.gguf} if args.gguf else None, n_threads=args.threads
+        ),
+    }
+
+    print(f"{'backend':<10} {'prompt':<10} {'wall (ms)':>10} {'ttft (ms)':>10} {'tok/s':>8} {'overhead (ms)':>14}")
+    print("-" * 66)
+    failed = False
+    for name in args.backends:
+        client = LocalLLMClient(args.model, "writer", local_llm_manager, backend=backends[name]())
+        client.max_tokens = args.max_tokens
+        client.temperature = 0.0
+        try:
+            results = run_backend(client, args.runs)
+        except Exception as e:
+            print(f"{name:<10} FAILED: {e}")
+            failed = True
+            continue
+        for prompt, r in results.items():
+            print(f"{name:<10} {prompt:<10} {r['wall_ms']:>10.1f} {r['ttft_ms']:>10.1f} "
+                  f"{r['tok_s']:>8.1f} {r['overhead_ms']:>14.1f}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Startup benchmark: import time per application module.
+
+Each module is imported in a fresh interpreter so timings are cold and
+independent. Uses `python -X importtime` to also list the heaviest transitive
+imports, which is where regressions (torch, transformers, vllm, ...) show up.
+
+Usage:
+    python benchmarks/startup_imports.py [--top 10] [module ...]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = [
+    "config",
+    "models.llm_manager",
+    "models.summarizer",
+    "models",
+    "utils.file_processing",
+    "nodes",
+    "workflow",
+    "ui.dashboard",
+    "app",
+]
+
+
+def measure_import(module: str) -> dict:
+    """Import one module in a child interpreter; return wall time and -X importtime rows."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+
+    # stderr lines: "import time: self [us] | cumulative | imported package"
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        rows.append((int(parts[1].strip()), parts[2].rstrip()))
+
+    error = ""
+    if proc.returncode != 0:
+        error = (proc.stderr.strip().splitlines() or ["import failed"])[-1]
+
+    return {
+        "module": module,
+        "wall_seconds": wall,
+        "import_seconds": max((us for us, _ in rows), default=0) / 1e6,
+        "rows": rows,
+        "error": error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=5, help="heaviest transitive imports to show per module")
+    args = parser.parse_args()
+
+    print(f"{'module':<24} {'import (s)':>10} {'process (s)':>12}")
+    print("-" * 48)
+    results = [measure_import(m) for m in args.modules]
+    for r in results:
+        status = f"  FAILED: {r['error']}" if r["error"] else ""
+        print(f"{r['module']:<24} {r['import_seconds']:>10.3f} {r['wall_seconds']:>12.3f}{status}")
+
+    if args.top:
+        print("\nHeaviest imports (cumulative):")
+        for r in results:
+            heaviest = sorted(r["rows"], reverse=True)[1:args.top + 1]  # [0] is the module itself
+            if not heaviest:
+                continue
+            print(f"\n{r['module']}")
+            for us, name in heaviest:
+                print(f"  {us / 1e6:>8.3f}s  {name.strip()}")
+
+    return 1 if any(r["error"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,7 @@
+import json
 import os
+import threading
+import time
 from typing import Dict, Any
 try:
     from dotenv import load_dotenv  # type: ignore
@@ -13,6 +16,105 @@ class ModelConfig:
     LOCAL_WRITER_MODEL = os.getenv("LOCAL_WRITER_MODEL", "llama3.1:8b")
     LOCAL_RESEARCHER_MODEL = os.getenv("LOCAL_RESEARCHER_MODEL", "llama3.1:8b")
     OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    # Comma-separated Ollama endpoints to spread generation calls over (defaults to OLLAMA_BASE_URL)
+    OLLAMA_HOSTS = [url.strip() for url in os.getenv("OLLAMA_HOSTS", "").split(",") if url.strip()] or [OLLAMA_BASE_URL]
+    # Generation backend: "ollama" (HTTP), or "llama_cpp" to run GGUF models in-process on CPU
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "ollama").lower()
+    # llama.cpp: GGUF file per model name (JSON map), else <LLAMA_CPP_MODEL_DIR>/<name>.gguf
+    # with ":" replaced by "-" (e.g. llama3.1-8b.gguf)
+    LLAMA_CPP_MODEL_DIR = os.path.expanduser(os.getenv("LLAMA_CPP_MODEL_DIR", "~/.cache/smartblogger/gguf"))
+    LLAMA_CPP_MODEL_MAP = json.loads(os.getenv("LLAMA_CPP_MODEL_MAP", "{}"))
+    # CPU threads per llama.cpp call (0: one per physical core) and prompt batch size
+    LLAMA_CPP_THREADS = int(os.getenv("LLAMA_CPP_THREADS", 0))
+    LLAMA_CPP_BATCH = int(os.getenv("LLAMA_CPP_BATCH", 512))
+    # Consecutive failures before a host is ejected, and how long it stays out
+    OLLAMA_EJECT_AFTER = int(os.getenv("OLLAMA_EJECT_AFTER", 2))
+    OLLAMA_EJECT_SECONDS = float(os.getenv("OLLAMA_EJECT_SECONDS", 30))
+
+    # HTTP transport (shared keep-alive pool for Ollama and Perplexity calls)
+    OLLAMA_POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", 8))
+    OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", 3.0))
+    OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", 120.0))
+    # Parallel decode slots configured on the Ollama server (bounds invoke_many)
+    OLLAMA_NUM_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL", 4))
+    # Concurrent backend calls across all sessions (see models/request_queue.py); 0 means
+    # OLLAMA_NUM_PARALLEL per host
+    QUEUE_CONCURRENCY = int(os.getenv("LLM_QUEUE_CONCURRENCY", 0))
+    # Options picked by `python -m models.autotune` (num_thread, num_batch, num_ctx cap,
+    # parallelism), per host and model; applied to every call unless disabled
+    AUTOTUNE_FILE = os.path.expanduser(os.getenv("LLM_AUTOTUNE_FILE", "~/.cache/smartblogger/autotune.json"))
+    AUTOTUNE_APPLY = os.getenv("LLM_AUTOTUNE_APPLY", "true").lower() in ("1", "true", "yes")
+    # How long Ollama keeps a model resident after a call (override per role with
+    # WRITER_KEEP_ALIVE / RESEARCHER_KEEP_ALIVE)
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    # Seconds a cached Ollama health probe is served before a background refresh
+    OLLAMA_HEALTH_TTL = float(os.getenv("OLLAMA_HEALTH_TTL", 15))
+
+    # Context window: num_ctx grows through these steps as prompts need it, up to
+    # OLLAMA_MAX_NUM_CTX. Each change reloads the model, so a model never shrinks.
+    NUM_CTX_STEPS = (2048, 4096, 8192, 16384, 32768)
+    MAX_NUM_CTX = int(os.getenv("OLLAMA_MAX_NUM_CTX", 8192))
+
+    # Hugging Face tokenizers used to count prompt tokens, by Ollama model family
+    TOKENIZER_MAP = {
+        "llama3": "NousResearch/Meta-Llama-3.1-8B-Instruct",
+        "qwen2.5": "Qwen/Qwen2.5-7B-Instruct",
+        "qwen2": "Qwen/Qwen2-7B-Instruct",
+        "mistral": "mistralai/Mistral-7B-Instruct-v0.3",
+        "phi3": "microsoft/Phi-3-mini-4k-instruct",
+        "gemma2": "google/gemma-2-9b-it",
+        **json.loads(os.getenv("OLLAMA_TOKENIZER_MAP", "{}")),
+    }
+    # Tokenizers are read from the local HF cache only; downloading them is opt-in
+    # (several mapped repos are gated and would fail after a network round-trip)
+    TOKENIZER_ALLOW_DOWNLOAD = os.getenv("TOKENIZER_ALLOW_DOWNLOAD", "false").lower() in ("1", "true", "yes")
+
+    # Task classes: each maps to a model and generation budget. A model of None
+    # means the base role's model; max_tokens/temperature of None mean the role's.
+    # Short structured calls (ranking, keywords, intent, verdicts) use "classify",
+    # which should point at a small, fast model.
+    TASK_CLASSES = {
+        "draft": {
+            "role": "writer",
+            "model": os.getenv("TASK_DRAFT_MODEL"),
+            "max_tokens": None,
+            "temperature": None,
+        },
+        "critique": {
+            "role": "researcher",
+            "model": os.getenv("TASK_CRITIQUE_MODEL"),
+            "max_tokens": int(os.getenv("TASK_CRITIQUE_MAX_TOKENS", 800)),
+            "temperature": 0.3,
+        },
+        "classify": {
+            "role": "researcher",
+            "model": os.getenv("TASK_CLASSIFY_MODEL", "llama3.2:3b"),
+            "max_tokens": int(os.getenv("TASK_CLASSIFY_MAX_TOKENS", 400)),
+            "temperature": 0.1,
+        },
+        "summarize": {
+            "role": "researcher",
+            "model": os.getenv("TASK_SUMMARIZE_MODEL"),
+            "max_tokens": int(os.getenv("TASK_SUMMARIZE_MAX_TOKENS", 600)),
+            "temperature": 0.3,
+        },
+    }
+
+    # Circuit breaker per backend (ollama, llama_cpp, perplexity): opens after this many
+    # consecutive failures or timeouts, then lets one trial call through after the recovery time
+    BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 3))
+    BREAKER_RECOVERY_SECONDS = float(os.getenv("LLM_BREAKER_RECOVERY_SECONDS", 30))
+    # Hedging: when a local call runs past this percentile of its recent latencies, also ask
+    # Perplexity and take whichever answers first (needs PERPLEXITY_API_KEY)
+    HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+    HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))
+    HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 10))
+
+    # Draft all remaining sections phase by phase (drafts, critiques, refinements)
+    # instead of alternating models per section: "off" (default), "on", or "auto"
+    # (on when the draft and critique models differ). Fewer model swaps, but each
+    # section is written from the earlier sections' first drafts, not refined ones.
+    MODEL_AFFINITY = os.getenv("LLM_MODEL_AFFINITY", "off").lower()
 
     # Fallback to Groq if local not available (optional)
     GROQ_WRITER = "llama3-70b-8192"
@@ -37,8 +139,47 @@ class SummarizationConfig:
     CHUNK_SIZE = 4000
     HF_MODEL = "facebook/bart-large-cnn"  # Fallback model
     ENABLE_HF_FALLBACK = True  # Set to False if you want pure local LLM only
+    # Short texts summarized together go through the HF pipeline HF_BATCH_SIZE at a time;
+    # HF_QUANTIZE swaps its Linear layers for int8 dynamic quantization (CPU only)
+    HF_BATCH_SIZE = int(os.getenv("SUMMARY_HF_BATCH_SIZE", 8))
+    HF_QUANTIZE = os.getenv("SUMMARY_HF_QUANTIZE", "false").lower() in ("1", "true", "yes")
     FAST_THRESHOLD = 800
     LLM_THRESHOLD = 1500
+    # Long content is map-reduced: every CHUNK_SIZE-char chunk is summarized (MAP_CONCURRENCY
+    # at a time), then partial summaries are combined level by level until one fits TARGET_LENGTH
+    MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", 4))
+    TARGET_LENGTH = int(os.getenv("SUMMARY_TARGET_LENGTH", 1500))
+    MAX_REDUCE_DEPTH = 4
+    EXTRACTIVE_LENGTH = 500  # chars kept by the model-free extractive fallback
+    # Summary cache: sharded in-memory LRU in front of an on-disk tier shared across runs and sessions
+    CACHE_PERSIST = os.getenv("SUMMARY_CACHE_PERSIST", "true").lower() in ("1", "true", "yes")
+    CACHE_DIR = os.getenv("SUMMARY_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "smartblogger", "summaries"))
+    CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", 2048))
+    CACHE_SHARDS = int(os.getenv("SUMMARY_CACHE_SHARDS", 16))
+    CACHE_SIZE_MB = int(os.getenv("SUMMARY_CACHE_SIZE_MB", 128))
+    CACHE_TTL_SECONDS = int(os.getenv("SUMMARY_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+
+
+# LLM response cache (opt-in, on disk)
+class LLMCacheConfig:
+    ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+    DIRECTORY = os.getenv("LLM_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "smartblogger", "llm"))
+    SIZE_LIMIT_MB = int(os.getenv("LLM_CACHE_SIZE_MB", 512))
+    TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+
+    # Semantic tier: on an exact miss, reuse the answer to a near-identical prompt
+    # (same model, system prompt and parameters) when the cosine similarity of the
+    # prompt embeddings reaches the task's threshold. Tasks or roles without a
+    # threshold (drafting, critique, the writer) never take semantic hits. Verdicts
+    # ("classify", e.g. plagiarism re-checks of a rewritten section) and research
+    # calls are left out on purpose: a near-identical prompt must get a fresh answer.
+    SEMANTIC_ENABLED = os.getenv("LLM_SEMANTIC_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+    SEMANTIC_EMBED_MODEL = os.getenv("LLM_SEMANTIC_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    SEMANTIC_CAPACITY = int(os.getenv("LLM_SEMANTIC_CAPACITY", 4096))
+    SEMANTIC_THRESHOLDS = {
+        "summarize": 0.95,
+        **json.loads(os.getenv("LLM_SEMANTIC_THRESHOLDS", "{}")),
+    }
 
 
 # ADD VALIDATION
@@ -50,9 +191,9 @@ def validate_environment() -> Dict[str, Any]:
     # Check local LLM availability
     try:
         import requests
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
+        response = requests.get(f"{ModelConfig.OLLAMA_BASE_URL}/api/tags", timeout=(2, 5))
         if response.status_code != 200:
-            issues.append("Ollama not running on localhost:11434")
+            issues.append(f"Ollama not running on {ModelConfig.OLLAMA_BASE_URL}")
     except:
         issues.append("Cannot connect to Ollama. Please ensure it's installed and running.")
 
@@ -80,8 +221,42 @@ def validate_environment() -> Dict[str, Any]:
     }
 
 
-# Add to config.py
-VALIDATION_RESULT = validate_environment()
+# Validation is lazy: importing config must not block on the network.
+_VALIDATION_TTL_SECONDS = 60
+_validation_cache: Dict[str, Any] = {"result": None, "checked_at": 0.0, "refreshing": False}
+_validation_lock = threading.Lock()
+
+
+def _refresh_validation() -> Dict[str, Any]:
+    result = validate_environment()
+    with _validation_lock:
+        _validation_cache.update(result=result, checked_at=time.time(), refreshing=False)
+    return result
+
+
+def get_validation_result(max_age: float = _VALIDATION_TTL_SECONDS) -> Dict[str, Any]:
+    """validate_environment(), computed on first use and refreshed in the background once stale"""
+    with _validation_lock:
+        result = _validation_cache["result"]
+        start_refresh = (
+            result is not None
+            and time.time() - _validation_cache["checked_at"] > max_age
+            and not _validation_cache["refreshing"]
+        )
+        if start_refresh:
+            _validation_cache["refreshing"] = True
+    if result is None:
+        return _refresh_validation()
+    if start_refresh:
+        threading.Thread(target=_refresh_validation, name="config-validation", daemon=True).start()
+    return result
+
+
+def __getattr__(name: str):
+    # Keeps `from config import VALIDATION_RESULT` working without an import-time probe
+    if name == "VALIDATION_RESULT":
+        return get_validation_result()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Other configurations remain the same
 PLAGIARISM_THRESHOLD = int(os.getenv("PLAGIARISM_THRESHOLD", 15))
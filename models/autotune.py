@@ -0,0 +1,291 @@
+"""Hardware-aware auto-tuning of Ollama runtime options.
+
+Runs a short micro-benchmark per (host, model) and picks, one option at a time:
+
+- num_thread: CPU threads (candidates from the detected core counts)
+- num_batch: prompt-processing batch size
+- num_ctx: the largest context window whose resident size (per /api/ps) stays
+  under the memory ceiling; LocalLLMManager.num_ctx_for never goes above it
+- parallel: how many concurrent requests the host serves before aggregate
+  throughput stops growing; caps invoke_many and the model-affinity scheduler
+
+Throughput is output tokens per second of prompt evaluation plus decoding, on
+a ~1k-token prompt. Results are stored per host in ModelConfig.AUTOTUNE_FILE
+and applied to every call routed to that host (see LocalLLMManager._tuned_payload).
+
+Usage:
+    python -m models.autotune [--models llama3.1:8b ...] [--hosts http://localhost:11434 ...]
+        [--memory-gb 12] [--threads 4 8] [--runs 2]
+"""
+
+import argparse
+import concurrent.futures
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from config import ModelConfig
+from utils.hardware import detect_hardware, memory_budget_gb
+
+log = logging.getLogger(__name__)
+
+# ~1k tokens of technical prose; each run gets a distinct first line so Ollama can't reuse the cached prefix
+BENCH_PROMPT = (
+    "Explain, for an experienced backend engineer, how a write-ahead log keeps a database durable. "
+    "Cover fsync and group commit, checkpoints, log truncation, torn pages, crash recovery with redo "
+    "and undo, and how replication ships the log to followers. "
+) * 24 + "\nWrite the explanation now, in detail."
+
+BATCH_CANDIDATES = (128, 256, 512, 1024)
+PARALLEL_CANDIDATES = (1, 2, 4, 8)
+
+
+class TuningStore:
+    """Tuned options per host URL and model, persisted as JSON"""
+
+    def __init__(self, path: Optional[str] = None, enabled: Optional[bool] = None):
+        self.path = path or ModelConfig.AUTOTUNE_FILE
+        self.enabled = ModelConfig.AUTOTUNE_APPLY if enabled is None else enabled
+        self._profiles: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None
+        self._lock = threading.Lock()
+
+    def _all(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        if self._profiles is None:
+            try:
+                with open(self.path) as f:
+                    self._profiles = json.load(f)
+            except FileNotFoundError:
+                self._profiles = {}
+            except Exception as e:
+                log.warning(f"Ignoring unreadable auto-tune file {self.path}: {e}")
+                self._profiles = {}
+        return self._profiles
+
+    def get(self, host_url: str, model: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._all().get(host_url.rstrip("/"), {}).get(model)
+
+    def save(self, host_url: str, model: str, profile: Dict[str, Any]):
+        with self._lock:
+            profiles = self._all()
+            profiles.setdefault(host_url.rstrip("/"), {})[model] = profile
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(profiles, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+
+    def options(self, host_url: str, model: str) -> Dict[str, int]:
+        """Runtime options to add to a request for model on this host"""
+        profile = self.get(host_url, model) or {}
+        return {k: profile[k] for k in ("num_thread", "num_batch") if profile.get(k)}
+
+    def max_num_ctx(self, model: str) -> Optional[int]:
+        """Largest context window that fits on every tuned host"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            sizes = [p[model]["num_ctx"] for p in self._all().values() if p.get(model, {}).get("num_ctx")]
+        return min(sizes) if sizes else None
+
+    def host_parallel(self, host_url: str, model: str) -> Optional[int]:
+        """Tuned concurrent requests for model on one host"""
+        return (self.get(host_url, model) or {}).get("parallel")
+
+    def parallel(self, model: str, host_urls: List[str], default: int) -> int:
+        """Concurrent requests for model across the given hosts: each host's tuned value, else default"""
+        return sum(self.host_parallel(url, model) or default for url in host_urls)
+
+    def host_capacity(self, host_url: str, default: int) -> int:
+        """Concurrent requests a host takes: the largest tuned value of any model on it, else default"""
+        if not self.enabled:
+            return default
+        with self._lock:
+            tuned = [p["parallel"] for p in self._all().get(host_url.rstrip("/"), {}).values() if p.get("parallel")]
+        return max(tuned) if tuned else default
+
+
+def is_local(host_url: str) -> bool:
+    return urlparse(host_url).hostname in ("localhost", "127.0.0.1", "::1", "0.0.0.0")
+
+
+class OllamaAutoTuner:
+    """Benchmarks one model on one Ollama host and returns the best options found"""
+
+    def __init__(self, manager, host_url: str, model: str, memory_gb: Optional[float] = None,
+                 threads: Optional[List[int]] = None, runs: int = 2, max_tokens: int = 96,
+                 report: Callable[[str], None] = print):
+        self.manager = manager
+        self.host_url = host_url.rstrip("/")
+        self.model = model
+        self.hardware = detect_hardware() if is_local(host_url) else None
+        self.memory_gb = memory_gb or (memory_budget_gb(self.hardware) if self.hardware else None)
+        if threads:
+            self.threads = list(threads)
+        elif self.hardware:
+            cpu = self.hardware["cpu"]
+            physical, logical = cpu["cores_physical"], cpu["cores_logical"]
+            self.threads = sorted({max(1, physical // 2), physical, logical})
+        else:
+            self.threads = [None]  # remote host: leave num_thread to Ollama
+        self.runs = max(1, runs)
+        self.max_tokens = max_tokens
+        self.report = report
+        self._nonce = 0
+
+    # ===== Measurements =====
+    def _generate(self, options: Dict[str, Any]) -> Dict[str, Any]:
+        self._nonce += 1
+        payload = {
+            "model": self.model,
+            "prompt": f"Run {self._nonce}.\n{BENCH_PROMPT}",
+            "stream": False,
+            "keep_alive": "5m",
+            "options": {"temperature": 0, "seed": 0, "num_predict": self.max_tokens,
+                        **{k: v for k, v in options.items() if v is not None}},
+        }
+        response = self.manager.session.post(f"{self.host_url}/api/generate", json=payload,
+                                             timeout=self.manager._timeout())
+        response.raise_for_status()
+        return response.json()
+
+    def _resident_gb(self) -> Optional[float]:
+        """Memory the loaded model takes on the host (weights plus KV cache), per /api/ps"""
+        try:
+            ps = self.manager.session.get(f"{self.host_url}/api/ps", timeout=(2, 5)).json()
+        except Exception:
+            return None
+        for m in ps.get("models", []):
+            if m.get("name") in (self.model, f"{self.model}:latest"):
+                return m.get("size", 0) / 1e9
+        return None
+
+    def _fits(self, memory_gb: Optional[float]) -> bool:
+        return self.memory_gb is None or memory_gb is None or memory_gb <= self.memory_gb
+
+    def measure(self, options: Dict[str, Any]) -> Optional[Dict[str, float]]:
+        """Median throughput for options, or None if the model doesn't fit under the memory ceiling"""
+        self._generate({**options, "num_predict": 1})  # (re)load with these options; not timed
+        memory_gb = self._resident_gb()
+        if not self._fits(memory_gb):
+            return None
+        samples, decode = [], []
+        for _ in range(self.runs):
+            r = self._generate(options)
+            busy_ns = r.get("prompt_eval_duration", 0) + r.get("eval_duration", 0)
+            if busy_ns and r.get("eval_count"):
+                samples.append(r["eval_count"] / (busy_ns / 1e9))
+                decode.append(r["eval_count"] / (r["eval_duration"] / 1e9) if r.get("eval_duration") else 0.0)
+        if not samples:
+            return None
+        return {"tokens_per_sec": statistics.median(samples), "decode_tokens_per_sec": statistics.median(decode),
+                "memory_gb": memory_gb}
+
+    def measure_parallel(self, options: Dict[str, Any], concurrency: int) -> float:
+        """Aggregate output tokens/sec with `concurrency` requests in flight at once"""
+        started = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda _: self._generate(options), range(concurrency)))
+        return sum(r.get("eval_count", 0) for r in results) / (time.perf_counter() - started)
+
+    # ===== Search =====
+    def _best(self, name: str, candidates, options: Dict[str, Any]):
+        """Try each candidate value for one option; returns (best value, its measurement)"""
+        best_value, best = None, None
+        for value in candidates:
+            result = self.measure({**options, name: value})
+            shown = f"{result['tokens_per_sec']:.1f} tok/s" if result else "over memory ceiling"
+            self.report(f"  {name}={value}: {shown}")
+            if result and (best is None or result["tokens_per_sec"] > best["tokens_per_sec"]):
+                best_value, best = value, result
+        return best_value, best
+
+    def run(self) -> Dict[str, Any]:
+        ceiling = f"{self.memory_gb:.1f} GB" if self.memory_gb else "none"
+        self.report(f"Tuning {self.model} on {self.host_url} (memory ceiling: {ceiling})")
+        steps = [s for s in ModelConfig.NUM_CTX_STEPS if s <= ModelConfig.MAX_NUM_CTX]
+        options: Dict[str, Any] = {"num_ctx": steps[0]}
+
+        options["num_thread"], _ = self._best("num_thread", self.threads, options)
+        options["num_batch"], best = self._best("num_batch", BATCH_CANDIDATES, options)
+        if best is None:
+            raise RuntimeError(f"{self.model} does not fit in {ceiling} on {self.host_url} at any setting")
+
+        # Context window: as large as fits; a bigger KV cache doesn't make short calls faster
+        num_ctx, memory_gb = steps[0], best["memory_gb"]
+        for size in steps[1:]:
+            self._generate({**options, "num_ctx": size, "num_predict": 1})
+            resident = self._resident_gb()
+            self.report(f"  num_ctx={size}: {f'{resident:.1f} GB' if resident else 'size unknown'}")
+            if not self._fits(resident):
+                break
+            num_ctx, memory_gb = size, resident
+
+        # Parallelism: smallest concurrency within 5% of the best aggregate throughput
+        throughput = {}
+        for concurrency in PARALLEL_CANDIDATES:
+            throughput[concurrency] = self.measure_parallel(options, concurrency)
+            self.report(f"  parallel={concurrency}: {throughput[concurrency]:.1f} tok/s aggregate")
+        peak = max(throughput.values())
+        parallel = min(c for c, t in throughput.items() if t >= 0.95 * peak)
+
+        return {
+            "num_thread": options["num_thread"],
+            "num_batch": options["num_batch"],
+            "num_ctx": num_ctx,
+            "parallel": parallel,
+            "tokens_per_sec": round(best["tokens_per_sec"], 1),
+            "decode_tokens_per_sec": round(best["decode_tokens_per_sec"], 1),
+            "memory_gb": round(memory_gb, 2) if memory_gb else None,
+            "memory_ceiling_gb": round(self.memory_gb, 2) if self.memory_gb else None,
+            "hardware": self.hardware,
+            "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", help="Models to tune (default: writer, researcher and task models)")
+    parser.add_argument("--hosts", nargs="+", help="Ollama URLs (default: OLLAMA_HOSTS)")
+    parser.add_argument("--memory-gb", type=float, help="Memory ceiling per model (default: 80%% of VRAM/RAM "
+                                                        "on a local host, none on a remote one)")
+    parser.add_argument("--threads", type=int, nargs="+", help="num_thread candidates (default: from core counts)")
+    parser.add_argument("--runs", type=int, default=2, help="Timed runs per setting")
+    args = parser.parse_args()
+
+    from models.llm_manager import local_llm_manager as manager
+
+    hosts = args.hosts or [h.url for h in manager.hosts.hosts]
+    models = args.models or list(dict.fromkeys(
+        [manager.get_writer().model, manager.get_researcher().model] +
+        [manager.get_for_task(task).model for task in ModelConfig.TASK_CLASSES]
+    ))
+    failed = False
+    for host in hosts:
+        for model in models:
+            try:
+                tuner = OllamaAutoTuner(manager, host, model, memory_gb=args.memory_gb,
+                                        threads=args.threads, runs=args.runs)
+                profile = tuner.run()
+            except Exception as e:
+                print(f"  FAILED: {e}")
+                failed = True
+                continue
+            manager.tuning.save(host, model, profile)
+            print(f"  -> num_thread={profile['num_thread']} num_batch={profile['num_batch']} "
+                  f"num_ctx={profile['num_ctx']} parallel={profile['parallel']} "
+                  f"({profile['tokens_per_sec']} tok/s)")
+    print(f"Saved to {manager.tuning.path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""Generation backends behind LocalLLMClient.
+
+A backend turns one generation request into an Ollama-shaped result dict: the
+text under "response" plus Ollama's stats (prompt_eval_count, eval_count and
+total/load/prompt_eval/eval durations in ns). LocalLLMClient builds its
+Response, token usage and timings from that dict, so nodes see the same
+contract whichever backend ran the call.
+
+- OllamaBackend: HTTP calls to the Ollama host pool (the default).
+- LlamaCppBackend: quantized GGUF models run in-process on CPU through the
+  llama-cpp-python bindings; no serialization or network hop per call.
+
+Pick one with LLM_BACKEND ("ollama" or "llama_cpp").
+"""
+
+import asyncio
+import concurrent.futures
+import contextlib
+import contextvars
+import inspect
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from config import ModelConfig
+from .host_pool import OllamaAPIError
+
+log = logging.getLogger(__name__)
+
+
+class LLMBackend:
+    """Interface: generate / chat / stream (plus async variants) and load"""
+
+    name = ""
+
+    def generate(self, model: str, prompt: str, system: str = "", **options) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def chat(self, model: str, messages: list, **options) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def stream(self, model: str, prompt: str, system: str = "",
+               on_token: Optional[Callable[[str], Any]] = None, messages: Optional[list] = None,
+               format=None, **options) -> Dict[str, Any]:
+        """Like generate, calling on_token per chunk (False stops early; sets "stopped_early").
+        With messages, the chat history replaces prompt/system. format: "json" or a JSON schema.
+        """
+        raise NotImplementedError
+
+    async def agenerate(self, model: str, prompt: str, system: str = "", **options) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.generate, model, prompt, system, **options)
+
+    async def astream(self, model: str, prompt: str, system: str = "",
+                      on_token: Optional[Callable[[str], Any]] = None, **options) -> Dict[str, Any]:
+        """Runs stream() on a worker thread; on_token may be a coroutine function"""
+        loop = asyncio.get_running_loop()
+
+        def _relay(text: str):
+            result = on_token(text) if on_token is not None else None
+            if inspect.isawaitable(result):
+                result = asyncio.run_coroutine_threadsafe(result, loop).result()
+            return result
+
+        return await asyncio.to_thread(self.stream, model, prompt, system, on_token=_relay, **options)
+
+    def load(self, model: str, keep_alive=None, num_ctx: Optional[int] = None) -> float:
+        """Load a model ahead of its first call; returns the load time in seconds"""
+        raise NotImplementedError
+
+
+class OllamaBackend(LLMBackend):
+    """Ollama over HTTP; the transport lives on LocalLLMManager (host pool, sessions)"""
+
+    name = "ollama"
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    def generate(self, model: str, prompt: str, system: str = "", **options) -> Dict[str, Any]:
+        return self.manager._call_ollama(model=model, prompt=prompt, system=system, **options)
+
+    def chat(self, model: str, messages: list, **options) -> Dict[str, Any]:
+        return self.manager._call_ollama_chat(model=model, messages=messages, **options)
+
+    def stream(self, model: str, prompt: str, system: str = "",
+               on_token: Optional[Callable[[str], Any]] = None, messages: Optional[list] = None,
+               format=None, **options) -> Dict[str, Any]:
+        return self.manager._stream_ollama(model=model, prompt=prompt, system=system, on_token=on_token,
+                                           messages=messages, format=format, **options)
+
+    async def agenerate(self, model: str, prompt: str, system: str = "", **options) -> Dict[str, Any]:
+        return await self.manager._acall_ollama(model=model, prompt=prompt, system=system, **options)
+
+    async def astream(self, model: str, prompt: str, system: str = "",
+                      on_token: Optional[Callable[[str], Any]] = None, **options) -> Dict[str, Any]:
+        return await self.manager._astream_ollama(model=model, prompt=prompt, system=system,
+                                                  on_token=on_token, **options)
+
+    def load(self, model: str, keep_alive=None, num_ctx: Optional[int] = None) -> float:
+        """An empty generate request only loads the model; Ollama reports the load time.
+
+        Every host with the model installed gets the request (in parallel), so
+        whichever host the pool picks for the first call has it resident. Returns
+        the slowest host's load time; fails only if no host loaded it.
+        """
+        manager = self.manager
+        payload = {"model": model, "prompt": "", "stream": False}
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        if num_ctx:
+            payload["options"] = {"num_ctx": num_ctx}
+
+        def _post(base_url: str) -> Dict[str, Any]:
+            # Raised per host so a 5xx is retried on another host and counts against this one
+            response = manager.session.post(
+                f"{base_url}/api/generate", json=manager._tuned_payload(payload, base_url), timeout=manager._timeout()
+            )
+            if response.status_code != 200:
+                raise OllamaAPIError(response.status_code)
+            return response.json()
+
+        pool = manager.hosts
+        urls = pool.hosts_with(model)
+        if len(urls) < 2:
+            return pool.run(model, _post).get("load_duration", 0) / 1e9
+
+        def _load_on(url: str) -> Dict[str, Any]:
+            # Leased like any call (in-flight count, failures), pinned to this host
+            with pool.lease(model, exclude={h.url for h in pool.hosts} - {url}) as base_url:
+                return _post(base_url)
+
+        seconds, errors = [], []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(urls)) as executor:
+            futures = {executor.submit(contextvars.copy_context().run, _load_on, url): url for url in urls}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    seconds.append(future.result().get("load_duration", 0) / 1e9)
+                except Exception as e:
+                    log.warning(f"Loading {model} on {futures[future]} failed: {e}")
+                    errors.append(e)
+        if not seconds:
+            raise errors[0]
+        return max(seconds)
+
+
+class _LlamaHandle:
+    """One loaded GGUF model; llama.cpp contexts are not thread-safe, so calls take the lock"""
+
+    def __init__(self, llm, path: str, n_ctx: int):
+        self.llm = llm
+        self.path = path
+        self.n_ctx = n_ctx
+        self.lock = threading.Lock()
+
+
+class LlamaCppBackend(LLMBackend):
+    """GGUF models run in-process on CPU via llama-cpp-python.
+
+    Handles stay loaded for the life of the process (keep_alive is ignored) and
+    are reloaded only when a call needs a larger context than the handle was
+    built with. llama.cpp reuses the longest matching prompt prefix of the
+    previous call on a handle, so LLMSession steps stay cheap here too.
+    """
+
+    name = "llama_cpp"
+
+    def __init__(self, model_dir: Optional[str] = None, model_map: Optional[Dict[str, str]] = None,
+                 n_threads: Optional[int] = None, n_batch: Optional[int] = None):
+        self.model_dir = model_dir or ModelConfig.LLAMA_CPP_MODEL_DIR
+        self.model_map = {**ModelConfig.LLAMA_CPP_MODEL_MAP, **(model_map or {})}
+        self.n_threads = n_threads or ModelConfig.LLAMA_CPP_THREADS or self._physical_cores()
+        self.n_batch = n_batch or ModelConfig.LLAMA_CPP_BATCH
+        self._handles: Dict[str, _LlamaHandle] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _physical_cores() -> int:
+        # Hyperthreads slow llama.cpp down; one thread per physical core is the usual sweet spot
+        try:
+            import psutil
+            return psutil.cpu_count(logical=False) or os.cpu_count() or 4
+        except Exception:
+            return os.cpu_count() or 4
+
+    def model_path(self, model: str) -> str:
+        """GGUF file for a model name: LLAMA_CPP_MODEL_MAP, a .gguf path, or <model_dir>/<name>.gguf"""
+        if model in self.model_map:
+            return os.path.expanduser(self.model_map[model])
+        if model.endswith(".gguf"):
+            return os.path.expanduser(model)
+        return os.path.join(self.model_dir, f"{model.replace(':', '-').replace('/', '_')}.gguf")
+
+    def _handle(self, model: str, num_ctx: Optional[int] = None) -> tuple:
+        """(handle, seconds spent loading it for this call)"""
+        n_ctx = num_ctx or ModelConfig.NUM_CTX_STEPS[0]
+        with self._lock:
+            handle = self._handles.get(model)
+            if handle is not None and handle.n_ctx >= n_ctx:
+                return handle, 0.0
+            try:
+                from llama_cpp import Llama  # optional: pip install llama-cpp-python
+            except ImportError as e:
+                raise RuntimeError("LLM_BACKEND=llama_cpp needs the llama-cpp-python package") from e
+            path = self.model_path(model)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No GGUF file for {model} (looked for {path})")
+            if handle is not None:
+                n_ctx = max(n_ctx, handle.n_ctx)
+                log.info(f"Reloading {model} with n_ctx={n_ctx}")
+            started = time.perf_counter()
+            llm = Llama(model_path=path, n_ctx=n_ctx, n_threads=self.n_threads, n_threads_batch=self.n_threads,
+                        n_batch=self.n_batch, n_gpu_layers=0, verbose=False)
+            handle = self._handles[model] = _LlamaHandle(llm, path, n_ctx)
+            return handle, time.perf_counter() - started
+
+    def load(self, model: str, keep_alive=None, num_ctx: Optional[int] = None) -> float:
+        return self._handle(model, num_ctx)[1]
+
+    def unload(self, model: Optional[str] = None):
+        """Drop one handle (or all) to free its memory"""
+        with self._lock:
+            for name in [model] if model else list(self._handles):
+                self._handles.pop(name, None)
+
+    def generate(self, model: str, prompt: str, system: str = "", **options) -> Dict[str, Any]:
+        return self.stream(model, prompt, system, **options)
+
+    def chat(self, model: str, messages: list, **options) -> Dict[str, Any]:
+        return self.stream(model, "", messages=messages, **options)
+
+    def stream(self, model: str, prompt: str, system: str = "",
+               on_token: Optional[Callable[[str], Any]] = None, messages: Optional[list] = None,
+               format=None, temperature: float = 0.7, max_tokens: int = 4000,
+               top_k: int = 40, top_p: float = 0.9, keep_alive=None,
+               num_ctx: Optional[int] = None) -> Dict[str, Any]:
+        if messages is None:
+            messages = ([{"role": "system", "content": system}] if system else []) + \
+                       [{"role": "user", "content": prompt}]
+        handle, load_seconds = self._handle(model, num_ctx)
+        request = {
+            "messages": messages,
+            "temperature": temperature,
+            "top_k": top_k,
+            "top_p": top_p,
+            "max_tokens": max_tokens,
+            "stream": True,
+        }
+        if format:
+            # Same constraint as Ollama's `format`: any JSON, or JSON matching the schema
+            request["response_format"] = {"type": "json_object"}
+            if isinstance(format, dict):
+                request["response_format"]["schema"] = format
+
+        parts = []
+        stopped_early = False
+        with handle.lock:
+            prompt_tokens = len(handle.llm.tokenize(
+                "\n".join(m["content"] for m in messages).encode("utf-8"), add_bos=True
+            ))
+            started = time.perf_counter()
+            first_token = None
+            with contextlib.closing(handle.llm.create_chat_completion(**request)) as chunks:
+                for chunk in chunks:
+                    text = chunk["choices"][0].get("delta", {}).get("content") or ""
+                    if not text:
+                        continue
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    parts.append(text)
+                    if on_token is not None and on_token(text) is False:
+                        stopped_early = True
+                        break
+            ended = time.perf_counter()
+
+        first_token = first_token or ended
+        # Ollama-shaped stats: one streamed chunk per generated token; time to first token is prompt eval
+        return {
+            "model": model,
+            "response": "".join(parts),
+            "done": True,
+            "stopped_early": stopped_early,
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": len(parts),
+            "load_duration": int(load_seconds * 1e9),
+            "prompt_eval_duration": int((first_token - started) * 1e9),
+            "eval_duration": int((ended - first_token) * 1e9),
+            "total_duration": int((ended - started + load_seconds) * 1e9),
+        }
+
+
+def create_backend(name: str, manager) -> LLMBackend:
+    """Backend for an LLM_BACKEND value"""
+    if name == "ollama":
+        return OllamaBackend(manager)
+    if name in ("llama_cpp", "llama.cpp", "llamacpp"):
+        return LlamaCppBackend()
+    raise ValueError(f"Unknown LLM backend: {name}")
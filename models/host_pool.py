@@ -0,0 +1,304 @@
+"""Pool of Ollama endpoints with least-loaded, model-aware routing.
+
+Each call leases a host: among healthy hosts, those that already have the
+model resident (per /api/ps) win, then those that have it installed, and ties
+go to the host with the fewest in-flight requests. Hosts that fail repeatedly
+are ejected for a cool-down and then retried with a single probe call; a
+success brings them back.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+import requests
+
+log = logging.getLogger(__name__)
+
+
+class OllamaAPIError(Exception):
+    """Non-200 response from Ollama"""
+
+    def __init__(self, status_code: int, detail: str = ""):
+        self.status_code = status_code
+        super().__init__(f"Ollama API error: {detail or status_code}")
+
+
+class NoHealthyHostError(Exception):
+    """Every host in the pool is ejected or down"""
+
+
+def is_host_failure(error: BaseException) -> bool:
+    """Errors that say something about the host (unreachable, timing out, 5xx), not the request"""
+    if isinstance(error, OllamaAPIError):
+        return error.status_code >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, httpx.TransportError))
+
+
+class OllamaHost:
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.up: Optional[bool] = None  # None until probed
+        self.models: set = set()
+        self.resident: set = set()
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0  # consecutive
+        self.total_failures = 0
+        self.busy_seconds = 0.0
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.probing = False  # a recovery call is in flight
+        self.last_error = ""
+        # Model of the previous call; a change is a swap when the host only fits one model
+        self.last_model: Optional[str] = None
+        self.swaps = 0
+
+    def has_model(self, model: str, names: set) -> bool:
+        return model in names or f"{model}:latest" in names
+
+
+class OllamaHostPool:
+    def __init__(self, urls: List[str], session_getter: Callable[[], requests.Session],
+                 eject_after: int = 2, eject_seconds: float = 30.0, refresh_seconds: float = 15.0,
+                 slots_per_host: int = 1, probe_timeout=(2, 3),
+                 slots_for: Optional[Callable[[str, str], int]] = None):
+        if not urls:
+            raise ValueError("OllamaHostPool needs at least one URL")
+        self.hosts = [OllamaHost(url) for url in dict.fromkeys(urls)]
+        self._session_getter = session_getter
+        self.eject_after = max(1, eject_after)
+        self.eject_seconds = eject_seconds
+        self.refresh_seconds = refresh_seconds
+        self.slots_per_host = max(1, slots_per_host)
+        # Per (host URL, model) slot count when it differs by host (e.g. auto-tuned); else slots_per_host
+        self._slots_for = slots_for
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._refreshed_at = 0.0
+        self._refreshing = False
+        self._started = time.time()
+
+    @property
+    def primary(self) -> OllamaHost:
+        """First configured host; used for management calls (pull, delete, start/stop)"""
+        return self.hosts[0]
+
+    def _slots(self, host: OllamaHost, model: Optional[str]) -> int:
+        """Concurrent requests host takes for model"""
+        if self._slots_for is None or model is None:
+            return self.slots_per_host
+        return max(1, self._slots_for(host.url, model))
+
+    # ===== Discovery =====
+    def refresh(self) -> List[OllamaHost]:
+        """Probe every host's installed (/api/tags) and resident (/api/ps) models"""
+        session = self._session_getter()
+        for host in self.hosts:
+            try:
+                tags = session.get(f"{host.url}/api/tags", timeout=self.probe_timeout)
+                up = tags.status_code == 200
+                models = {m["name"] for m in tags.json().get("models", [])} if up else set()
+                resident = set()
+                if up:
+                    ps = session.get(f"{host.url}/api/ps", timeout=self.probe_timeout)
+                    if ps.status_code == 200:
+                        resident = {m["name"] for m in ps.json().get("models", [])}
+            except Exception as e:
+                up, models, resident = False, set(), set()
+                host.last_error = str(e)
+            with self._lock:
+                host.up, host.models, host.resident = up, models, resident
+        with self._lock:
+            self._refreshed_at = time.time()
+            self._refreshing = False
+        return self.hosts
+
+    def _refresh_due(self) -> Optional[str]:
+        """Returns "first" before any probe, "stale" when a background refresh should start, else None"""
+        with self._lock:
+            if not self._refreshed_at:
+                return "first"
+            if time.time() - self._refreshed_at > self.refresh_seconds and not self._refreshing:
+                self._refreshing = True
+                return "stale"
+        return None
+
+    def _maybe_refresh(self):
+        """First use probes synchronously; afterwards stale state is refreshed in the background"""
+        due = self._refresh_due()
+        if due == "first":
+            self.refresh()
+        elif due == "stale":
+            threading.Thread(target=self.refresh, name="ollama-pool-refresh", daemon=True).start()
+
+    async def _amaybe_refresh(self):
+        """Async variant of _maybe_refresh: the blocking first probe runs off the event loop"""
+        due = self._refresh_due()
+        if due == "first":
+            await asyncio.to_thread(self.refresh)
+        elif due == "stale":
+            threading.Thread(target=self.refresh, name="ollama-pool-refresh", daemon=True).start()
+
+    # ===== Routing =====
+    def _pick(self, model: str, exclude: set) -> OllamaHost:
+        now = time.time()
+        with self._lock:
+            usable = [h for h in self.hosts if h.url not in exclude and h.ejected_until <= now]
+            healthy = [h for h in usable if not h.ejected_until and h.up is not False]
+            # Ejected hosts whose cool-down is over compete again, one trial call at a time
+            recovering = [h for h in usable if h.ejected_until and not h.probing]
+            # Last resort: hosts the last probe saw down (they may have come up since)
+            candidates = (healthy + recovering) or [h for h in usable if not h.ejected_until]
+            if not candidates:
+                raise NoHealthyHostError(f"No healthy Ollama host for {model}")
+
+            def rank(h: OllamaHost):
+                tier = 0 if h.has_model(model, h.resident) else 1 if h.has_model(model, h.models) else 2
+                return tier, h.in_flight / self._slots(h, model), h.calls
+
+            host = min(candidates, key=rank)
+            if host.ejected_until:
+                host.probing = True
+            host.in_flight += 1
+            host.calls += 1
+            if host.last_model and host.last_model != model:
+                host.swaps += 1
+            host.last_model = model
+            return host
+
+    def _release(self, host: OllamaHost, model: str, started: float, error: Optional[BaseException]):
+        with self._lock:
+            host.in_flight -= 1
+            host.busy_seconds += time.time() - started
+            host.probing = False
+            if error is None:
+                host.failures = 0
+                if host.ejected_until:
+                    log.info(f"Ollama host {host.url} recovered")
+                host.ejected_until = 0.0
+                host.up = True
+                host.resident.add(model)
+                host.models.add(model)
+                return
+            if not is_host_failure(error):
+                return
+            host.failures += 1
+            host.total_failures += 1
+            host.last_error = str(error)
+            if host.failures >= self.eject_after or host.ejected_until:
+                host.ejected_until = time.time() + self.eject_seconds
+                host.ejections += 1
+                log.warning(f"Ejecting Ollama host {host.url} for {self.eject_seconds}s: {error}")
+
+    @contextmanager
+    def lease(self, model: str, exclude: Optional[set] = None):
+        """Reserve the best host for a call on model; yields its base URL"""
+        self._maybe_refresh()
+        host = self._pick(model, exclude or set())
+        started = time.time()
+        try:
+            yield host.url
+        except BaseException as e:
+            self._release(host, model, started, e)
+            raise
+        self._release(host, model, started, None)
+
+    @asynccontextmanager
+    async def alease(self, model: str, exclude: Optional[set] = None):
+        """Async variant of lease(); host probes never block the event loop"""
+        await self._amaybe_refresh()
+        host = self._pick(model, exclude or set())
+        started = time.time()
+        try:
+            yield host.url
+        except BaseException as e:
+            self._release(host, model, started, e)
+            raise
+        self._release(host, model, started, None)
+
+    def run(self, model: str, fn: Callable[[str], Any], retry: bool = True):
+        """Call fn(base_url) on a leased host, moving to the next host after a host failure.
+
+        Pass retry=False when fn may already have delivered output (streams).
+        """
+        tried: set = set()
+        while True:
+            url = None
+            try:
+                with self.lease(model, exclude=tried) as url:
+                    return fn(url)
+            except Exception as e:
+                if url is None or not (retry and is_host_failure(e) and len(tried) + 1 < len(self.hosts)):
+                    raise
+                tried.add(url)
+                log.warning(f"Ollama host {url} failed ({e}); retrying on another host")
+
+    async def arun(self, model: str, fn: Callable[[str], Any], retry: bool = True):
+        """Async variant of run(); fn(base_url) returns an awaitable"""
+        tried: set = set()
+        while True:
+            url = None
+            try:
+                async with self.alease(model, exclude=tried) as url:
+                    return await fn(url)
+            except Exception as e:
+                if url is None or not (retry and is_host_failure(e) and len(tried) + 1 < len(self.hosts)):
+                    raise
+                tried.add(url)
+                log.warning(f"Ollama host {url} failed ({e}); retrying on another host")
+
+    # ===== Reporting =====
+    def any_up(self) -> bool:
+        return any(h.up for h in self.hosts)
+
+    def loaded_model(self) -> Optional[str]:
+        """Model of the most recent call on the primary host (the one most likely still in memory)"""
+        with self._lock:
+            return self.primary.last_model
+
+    @property
+    def probed(self) -> bool:
+        """Whether hosts have been probed at least once (before that, models and up are unknown)"""
+        with self._lock:
+            return bool(self._refreshed_at)
+
+    def hosts_with(self, model: str) -> List[str]:
+        """URLs of hosts the last probe saw up with model installed (probes first on first use)"""
+        self._maybe_refresh()
+        with self._lock:
+            return [h.url for h in self.hosts if h.up and h.has_model(model, h.models)]
+
+    def all_models(self) -> List[str]:
+        models: set = set()
+        for h in self.hosts:
+            models |= h.models
+        return sorted(models)
+
+    def utilization(self) -> List[Dict[str, Any]]:
+        """Per-host snapshot: state, load and share of slot-time spent busy since the pool started"""
+        now = time.time()
+        elapsed = max(now - self._started, 1e-6)
+        with self._lock:
+            return [
+                {
+                    "url": h.url,
+                    "up": h.up,
+                    "ejected": h.ejected_until > now,
+                    "in_flight": h.in_flight,
+                    "calls": h.calls,
+                    "failures": h.total_failures,
+                    "ejections": h.ejections,
+                    "swaps": h.swaps,
+                    "busy_seconds": round(h.busy_seconds, 2),
+                    # Against the slots of the host's current model, the same count _pick ranks it by
+                    "utilization": round(h.busy_seconds / (elapsed * self._slots(h, h.last_model)), 4),
+                    "resident_models": sorted(h.resident),
+                    "last_error": h.last_error,
+                }
+                for h in self.hosts
+            ]
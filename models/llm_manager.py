@@ -1,12 +1,31 @@
 import os
+import asyncio
+import inspect
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable
 import requests
 import json
 import subprocess
+import threading
 import time
+import concurrent.futures
+import contextvars
+import functools
 import httpx
+from requests.adapters import HTTPAdapter
 from config import ModelConfig
+from .response_cache import LLMResponseCache
+from .semantic_cache import SemanticCache
+from .host_pool import OllamaAPIError, OllamaHostPool
+from .scheduler import ModelAffinityScheduler
+from .request_queue import LLMRequestQueue
+from .autotune import TuningStore
+from .backends import LLMBackend, create_backend
+from utils.token_budget import context_window_for, get_token_counter
+from utils.json_stream import JsonStreamParser, parse_json
+from utils.telemetry import record_call, record_event
+from utils.error_handling import CircuitBreaker, HedgeError, LatencyWindow, hedged_call
+from utils.single_flight import fingerprint, single_flight
 
 try:
     # Ensure .env is loaded even if config wasn't imported yet
@@ -18,45 +37,207 @@ except Exception:
 # Logger for the module
 log = logging.getLogger(__name__)
 
+# Set by a hedged call's primary; _backend_call sets the event once its request queue slot is granted
+_slot_granted: contextvars.ContextVar = contextvars.ContextVar("llm_slot_granted", default=None)
+
 
 class LocalLLMManager:
     def __init__(self):
-        self.ollama_base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-        self.available_models = self._get_available_models()
+        # Shared keep-alive transport; built lazily on first request
+        self.pool_size = ModelConfig.OLLAMA_POOL_SIZE
+        self.connect_timeout = ModelConfig.OLLAMA_CONNECT_TIMEOUT
+        self.read_timeout = ModelConfig.OLLAMA_READ_TIMEOUT
+        self.num_parallel = max(1, ModelConfig.OLLAMA_NUM_PARALLEL)
+        # Auto-tuned runtime options per host and model (python -m models.autotune)
+        self.tuning = TuningStore()
+        # Generation calls are spread over every host in OLLAMA_HOSTS
+        self.hosts = self._build_host_pool(ModelConfig.OLLAMA_HOSTS)
+        # Runs independent calls grouped by model to avoid swapping models in and out
+        self.scheduler = ModelAffinityScheduler(self)
+        # Shared by every session: caps concurrent backend calls, in priority order,
+        # sessions taking turns (default ceiling: each host's tuned parallelism, else OLLAMA_NUM_PARALLEL)
+        self.request_queue = LLMRequestQueue(self.queue_concurrency())
+        # Where generation runs (LLM_BACKEND): Ollama over HTTP, or llama.cpp in-process
+        self.backend: LLMBackend = create_backend(ModelConfig.LLM_BACKEND, self)
+        # Circuit breaker per backend name and recent latencies per client kind, created on first use
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[tuple, LatencyWindow] = {}
+        self._resilience_lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+        # httpx clients are bound to the event loop they were first used on
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop = None
+        # Opt-in persistent response cache (LLM_CACHE_ENABLED)
+        self.response_cache = LLMResponseCache()
+        # Near-duplicate prompts answered from it too, per task threshold (LLM_SEMANTIC_CACHE_ENABLED)
+        self.semantic_cache = SemanticCache(self.response_cache)
+        # Model preloading: results keyed by model name
+        self.warmup_results: Dict[str, Dict[str, Any]] = {}
+        self._warmup_thread: Optional[threading.Thread] = None
+        self._warmup_lock = threading.Lock()
+        # Cached Ollama health; nothing is probed until first use
+        self.health_ttl = ModelConfig.OLLAMA_HEALTH_TTL
+        self._health: Dict[str, Any] = {"up": None, "models": [], "checked_at": 0.0}
+        self._health_lock = threading.Lock()
+        self._health_refreshing = False
+        # num_ctx last sent per model; only ever grows so the model isn't reloaded back and forth
+        self._num_ctx: Dict[str, int] = {}
+        self._num_ctx_lock = threading.Lock()
         # Do not cache API key; read dynamically via property below
         self._dummy = None
         # Runtime-selectable defaults (optional overrides)
         self.selected_writer_model: Optional[str] = None
         self.selected_researcher_model: Optional[str] = None
 
+    def _build_host_pool(self, urls: list) -> OllamaHostPool:
+        return OllamaHostPool(
+            urls,
+            session_getter=lambda: self.session,
+            eject_after=ModelConfig.OLLAMA_EJECT_AFTER,
+            eject_seconds=ModelConfig.OLLAMA_EJECT_SECONDS,
+            refresh_seconds=ModelConfig.OLLAMA_HEALTH_TTL,
+            slots_per_host=self.num_parallel,
+            probe_timeout=self._timeout(3),
+            slots_for=lambda url, model: self.tuning.host_parallel(url, model) or self.num_parallel,
+        )
+
+    def queue_concurrency(self) -> int:
+        """Request queue ceiling: LLM_QUEUE_CONCURRENCY, else every host's capacity summed"""
+        if ModelConfig.QUEUE_CONCURRENCY:
+            return ModelConfig.QUEUE_CONCURRENCY
+        return sum(self.tuning.host_capacity(h.url, self.num_parallel) for h in self.hosts.hosts)
+
+    @property
+    def ollama_base_url(self) -> str:
+        """Primary Ollama host; management calls (pull, delete, start/stop) go here"""
+        return self.hosts.primary.url
+
+    @ollama_base_url.setter
+    def ollama_base_url(self, url: str):
+        self.hosts = self._build_host_pool([url])
+        self.request_queue.resize(self.queue_concurrency())
+
+    def host_utilization(self) -> list:
+        """Per-host load and health (see OllamaHostPool.utilization)"""
+        return self.hosts.utilization()
+
     @property
     def perplexity_api_key(self) -> Optional[str]:
         """Read the Perplexity API key dynamically from environment."""
         return os.getenv("PERPLEXITY_API_KEY")
 
+    # ===== Transport =====
+    @property
+    def session(self) -> requests.Session:
+        """Shared HTTP session with a bounded keep-alive pool, safe to use from worker threads."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    def _build_session(self) -> requests.Session:
+        session = requests.Session()
+        # pool_block makes extra threads wait for a pooled connection instead of
+        # opening (and then discarding) throwaway sockets
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            pool_block=True,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _timeout(self, read: Optional[float] = None) -> tuple:
+        """(connect, read) timeout pair; read defaults to the configured generation timeout."""
+        return (self.connect_timeout, self.read_timeout if read is None else read)
+
+    def close(self):
+        """Close pooled connections (a new session is created on next use)."""
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """Shared httpx.AsyncClient for the running event loop (recreated if the loop changes)."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client.is_closed or self._async_client_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                ),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            )
+            self._async_client_loop = loop
+        return self._async_client
+
+    async def aclose(self):
+        """Close the async client's pooled connections."""
+        if self._async_client is not None and not self._async_client.is_closed:
+            await self._async_client.aclose()
+        self._async_client = None
+        self._async_client_loop = None
+
+    @property
+    def available_models(self) -> list:
+        """Locally installed models, from the cached health state"""
+        return self.health()["models"]
+
+    @available_models.setter
+    def available_models(self, models: list):
+        with self._health_lock:
+            self._health = {**self._health, "models": list(models or [])}
+
     def _get_available_models(self) -> list:
         """Get list of available local models"""
-        try:
-            response = requests.get(f"{self.ollama_base_url}/api/tags")
-            if response.status_code == 200:
-                models = response.json().get("models", [])
-                return [model["name"] for model in models]
-        except:
-            pass
-        return []
+        return self.refresh_health()["models"]
 
     # ===== Health helpers =====
+    def refresh_health(self) -> Dict[str, Any]:
+        """Probe every Ollama host once (bounded by the connect timeout) and update the cached health state.
+
+        "up" means at least one host answered; "models" is the union of their models.
+        """
+        self.hosts.refresh()
+        up, models = self.hosts.any_up(), self.hosts.all_models()
+        with self._health_lock:
+            self._health = {"up": up, "models": models, "checked_at": time.time()}
+            self._health_refreshing = False
+            return dict(self._health)
+
+    def health(self, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """Cached Ollama health: {"up", "models", "checked_at"}.
+
+        Only the very first call probes synchronously. After that a stale entry is
+        returned immediately and refreshed on a background thread, so UI reruns
+        never block on the network.
+        """
+        max_age = self.health_ttl if max_age is None else max_age
+        with self._health_lock:
+            snapshot = dict(self._health)
+            stale = time.time() - snapshot["checked_at"] > max_age
+            start_refresh = bool(snapshot["checked_at"]) and stale and not self._health_refreshing
+            if start_refresh:
+                self._health_refreshing = True
+        if not snapshot["checked_at"]:
+            return self.refresh_health()
+        if start_refresh:
+            threading.Thread(target=self.refresh_health, name="ollama-health", daemon=True).start()
+        return snapshot
+
     def is_ollama_up(self) -> bool:
-        try:
-            r = requests.get(f"{self.ollama_base_url}/api/tags", timeout=3)
-            return r.status_code == 200
-        except Exception:
-            return False
+        """Live probe (also refreshes the cached health state)"""
+        return self.refresh_health()["up"]
 
     def pull_model(self, model: str, timeout_seconds: int = 300) -> bool:
         """Request Ollama to pull a model; poll until ready or timeout."""
         try:
-            resp = requests.post(f"{self.ollama_base_url}/api/pull", json={"name": model}, timeout=10)
+            resp = self.session.post(f"{self.ollama_base_url}/api/pull", json={"name": model}, timeout=self._timeout(10))
             if resp.status_code not in (200, 201, 202):
                 return False
             # Poll tags until model appears
@@ -114,17 +295,141 @@ class LocalLLMManager:
     def delete_model(self, model: str) -> bool:
         """Delete a local model via Ollama API and refresh model cache."""
         try:
-            resp = requests.post(f"{self.ollama_base_url}/api/delete", json={"name": model}, timeout=10)
+            resp = self.session.post(f"{self.ollama_base_url}/api/delete", json={"name": model}, timeout=self._timeout(10))
             # Refresh cache of models
             self.available_models = self._get_available_models()
             return resp.status_code in (200, 202)
         except Exception:
             return False
 
-    def _call_ollama(self, model: str, prompt: str, system: str = "",
-                     temperature: float = 0.7, max_tokens: int = 4000,
-                     top_k: int = 40, top_p: float = 0.9) -> Dict[str, Any]:
-        """Make API call to local Ollama instance"""
+    # ===== Resilience =====
+    def breaker(self, name: str) -> CircuitBreaker:
+        """Circuit breaker for a backend ("ollama", "llama_cpp", "perplexity")"""
+        with self._resilience_lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(
+                    failure_threshold=ModelConfig.BREAKER_FAILURES,
+                    recovery_timeout=ModelConfig.BREAKER_RECOVERY_SECONDS,
+                    name=name,
+                    is_failure=_is_backend_failure,
+                    on_transition=self._on_breaker_transition,
+                )
+            return breaker
+
+    @staticmethod
+    def _on_breaker_transition(name: str, old: str, new: str, reason: str):
+        log.warning(f"Circuit breaker {name}: {old} -> {new} ({reason})")
+        record_event("circuit", backend=name, previous=old, state=new, reason=reason)
+
+    def breaker_states(self) -> Dict[str, str]:
+        with self._resilience_lock:
+            return {name: breaker.state for name, breaker in self._breakers.items()}
+
+    def latency_window(self, key: tuple) -> LatencyWindow:
+        with self._resilience_lock:
+            return self._latencies.setdefault(key, LatencyWindow())
+
+    def hedge_delay(self, key: tuple) -> Optional[float]:
+        """Seconds to wait before hedging a call of this kind, or None to not hedge"""
+        if not (ModelConfig.HEDGE_ENABLED and self.perplexity_api_key):
+            return None
+        if self.breaker("perplexity").state == "OPEN":
+            return None
+        window = self.latency_window(key)
+        if len(window) < ModelConfig.HEDGE_MIN_SAMPLES:
+            return None  # too few samples for a meaningful percentile
+        return window.percentile(ModelConfig.HEDGE_PERCENTILE)
+
+    # ===== Warm-up =====
+    def keep_alive_for(self, role: str):
+        """Ollama keep_alive for a role (e.g. "30m", or -1 to pin until unloaded)."""
+        value = os.getenv(f"{role.upper()}_KEEP_ALIVE", ModelConfig.OLLAMA_KEEP_ALIVE)
+        # Ollama reads bare numbers as seconds but rejects unitless duration strings
+        return int(value) if value.lstrip("-").isdigit() else value
+
+    def warm_up(self, roles: tuple = ("writer", "researcher")) -> Dict[str, Dict[str, Any]]:
+        """Preload the models behind the given roles so the first real call skips the load.
+
+        Asks the backend to load each model (for Ollama, an empty generate request
+        with the role's keep_alive) and records the reported load time per model.
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        for role in roles:
+            client = self.get_writer() if role == "writer" else self.get_researcher()
+            if client.model in results:
+                continue  # both roles share one model
+            entry: Dict[str, Any] = {"role": role, "ok": False, "load_seconds": None, "wall_seconds": None}
+            start = time.time()
+            try:
+                load_seconds = client.backend.load(
+                    client.model, keep_alive=client.keep_alive,
+                    # Same num_ctx as the first real call, or that call would reload the model
+                    num_ctx=self.num_ctx_for(client.model, client.max_tokens)
+                )
+                entry["wall_seconds"] = round(time.time() - start, 3)
+                entry["ok"] = True
+                entry["load_seconds"] = round(load_seconds, 3)
+            except Exception as e:
+                entry["error"] = str(e)
+            results[client.model] = entry
+            log.info(f"Warm-up {client.model} ({role}): {entry}")
+
+        with self._warmup_lock:
+            self.warmup_results.update(results)
+        return results
+
+    def start_warm_up(self, force: bool = False) -> Optional[threading.Thread]:
+        """Run warm_up() on a background thread unless the current models are already loaded.
+
+        Safe to call on every Streamlit rerun: returns the running thread, or None
+        when there is nothing to do.
+        """
+        with self._warmup_lock:
+            if self._warmup_thread is not None and self._warmup_thread.is_alive():
+                return self._warmup_thread
+            models = {self.get_writer().model, self.get_researcher().model}
+            warmed = {m for m, r in self.warmup_results.items() if r.get("ok")}
+            if not force and models <= warmed:
+                return None
+            self._warmup_thread = threading.Thread(target=self.warm_up, name="ollama-warm-up", daemon=True)
+            self._warmup_thread.start()
+            return self._warmup_thread
+
+    def num_ctx_for(self, model: str, needed_tokens: int) -> int:
+        """Context window to request for a call needing needed_tokens (prompt + output).
+
+        Ollama reloads a model whenever num_ctx changes, so the window per model
+        only grows (in ModelConfig.NUM_CTX_STEPS) and is reused for smaller calls.
+        """
+        num_ctx = context_window_for(needed_tokens)
+        tuned_max = self.tuning.max_num_ctx(model)
+        if tuned_max:
+            num_ctx = min(num_ctx, tuned_max)  # largest window that fits in memory on every host
+        with self._num_ctx_lock:
+            num_ctx = max(self._num_ctx.get(model, 0), num_ctx)
+            self._num_ctx[model] = num_ctx
+            return num_ctx
+
+    def parallel_for(self, model: str) -> int:
+        """Concurrent calls worth making for model: per host, the auto-tuned parallelism or else
+        OLLAMA_NUM_PARALLEL, summed over hosts"""
+        return self.tuning.parallel(model, [h.url for h in self.hosts.hosts], self.num_parallel)
+
+    def _tuned_payload(self, payload: Dict[str, Any], base_url: str) -> Dict[str, Any]:
+        """payload plus the auto-tuned runtime options (num_thread, num_batch) for this host and model"""
+        options = self.tuning.options(base_url, payload["model"])
+        if not options:
+            return payload
+        return {**payload, "options": {**payload.get("options", {}), **options}}
+
+    @staticmethod
+    def _generate_payload(model: str, prompt: str, system: str = "",
+                          temperature: float = 0.7, max_tokens: int = 4000,
+                          top_k: int = 40, top_p: float = 0.9,
+                          stream: bool = False, keep_alive=None, num_ctx: Optional[int] = None,
+                          format=None) -> Dict[str, Any]:
+        """Build an /api/generate request body (format: "json" or a JSON schema)"""
         payload = {
             "model": model,
             "prompt": prompt,
@@ -135,25 +440,177 @@ class LocalLLMManager:
                 "top_k": top_k,
                 "top_p": top_p
             },
-            "stream": False
+            "stream": stream
         }
+        if num_ctx:
+            payload["options"]["num_ctx"] = num_ctx
+        if format:
+            payload["format"] = format
+        if keep_alive is not None and keep_alive != "":
+            payload["keep_alive"] = keep_alive
+        return payload
 
-        try:
-            response = requests.post(
-                f"{self.ollama_base_url}/api/generate",
-                json=payload,
-                timeout=120
+    def _call_ollama(self, model: str, prompt: str, system: str = "",
+                     temperature: float = 0.7, max_tokens: int = 4000,
+                     top_k: int = 40, top_p: float = 0.9,
+                     keep_alive=None, num_ctx: Optional[int] = None) -> Dict[str, Any]:
+        """Make API call to local Ollama instance"""
+        payload = self._generate_payload(model, prompt, system, temperature, max_tokens, top_k, top_p,
+                                         keep_alive=keep_alive, num_ctx=num_ctx)
+
+        def _post(base_url: str) -> Dict[str, Any]:
+            response = self.session.post(
+                f"{base_url}/api/generate",
+                json=self._tuned_payload(payload, base_url),
+                timeout=self._timeout()
             )
             if response.status_code == 200:
                 return response.json()
-            else:
-                raise Exception(f"Ollama API error: {response.status_code}")
-        except Exception as e:
-            raise e  # Let the invoke method handle fallback logic
+            raise OllamaAPIError(response.status_code)
 
+        # Errors propagate; the invoke method handles fallback logic
+        return self.hosts.run(model, _post)
 
-    def _call_perplexity(self, prompt: str, system: str = "", max_tokens: int = 800) -> tuple[str, Dict]:
-        """Minimal Perplexity chat completion used as fallback when Ollama is unavailable."""
+    def _call_ollama_chat(self, model: str, messages: list,
+                          temperature: float = 0.7, max_tokens: int = 4000,
+                          top_k: int = 40, top_p: float = 0.9,
+                          keep_alive=None, num_ctx: Optional[int] = None) -> Dict[str, Any]:
+        """Non-streaming /api/chat call; the reply text is returned under "response" like _call_ollama"""
+        payload = self._generate_payload(model, "", "", temperature, max_tokens, top_k, top_p,
+                                         keep_alive=keep_alive, num_ctx=num_ctx)
+        del payload["prompt"], payload["system"]
+        payload["messages"] = messages
+
+        def _post(base_url: str) -> Dict[str, Any]:
+            response = self.session.post(
+                f"{base_url}/api/chat",
+                json=self._tuned_payload(payload, base_url),
+                timeout=self._timeout()
+            )
+            if response.status_code != 200:
+                raise OllamaAPIError(response.status_code)
+            return response.json()
+
+        data = self.hosts.run(model, _post)
+        data["response"] = (data.pop("message", None) or {}).get("content", "")
+        return data
+
+    def _stream_ollama(self, model: str, prompt: str, system: str = "",
+                       temperature: float = 0.7, max_tokens: int = 4000,
+                       top_k: int = 40, top_p: float = 0.9,
+                       on_token: Optional[Callable[[str], Any]] = None,
+                       keep_alive=None, num_ctx: Optional[int] = None,
+                       messages: Optional[list] = None, format=None) -> Dict[str, Any]:
+        """Stream an Ollama generation (NDJSON), calling on_token for every text chunk.
+
+        Returning False from on_token stops generation; the connection is closed so
+        Ollama aborts the request. The result has the same shape as _call_ollama
+        (full "response" text plus the final chunk's stats), with "stopped_early" set.
+        With messages, the chat history is streamed through /api/chat instead.
+        """
+        payload = self._generate_payload(model, prompt, system, temperature, max_tokens, top_k, top_p,
+                                         stream=True, keep_alive=keep_alive, num_ctx=num_ctx, format=format)
+        endpoint = "/api/generate"
+        if messages is not None:
+            del payload["prompt"], payload["system"]
+            payload["messages"] = messages
+            endpoint = "/api/chat"
+        parts = []
+        final: Dict[str, Any] = {}
+        stopped_early = False
+
+        # No retry on another host: tokens may already have reached on_token
+        with self.hosts.lease(model) as base_url, self.session.post(
+            f"{base_url}{endpoint}",
+            json=self._tuned_payload(payload, base_url),
+            timeout=self._timeout(),
+            stream=True
+        ) as response:
+            if response.status_code != 200:
+                raise OllamaAPIError(response.status_code)
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise Exception(f"Ollama API error: {chunk['error']}")
+                text = chunk.get("response") or (chunk.get("message") or {}).get("content", "")
+                if text:
+                    parts.append(text)
+                    if on_token is not None and on_token(text) is False:
+                        stopped_early = True
+                        break
+                if chunk.get("done"):
+                    final = chunk
+                    break
+
+        final = {k: v for k, v in final.items() if k not in ("response", "context", "message")}
+        final["response"] = "".join(parts)
+        final["stopped_early"] = stopped_early
+        return final
+
+
+    async def _acall_ollama(self, model: str, prompt: str, system: str = "",
+                            temperature: float = 0.7, max_tokens: int = 4000,
+                            top_k: int = 40, top_p: float = 0.9,
+                            keep_alive=None, num_ctx: Optional[int] = None) -> Dict[str, Any]:
+        """Async variant of _call_ollama"""
+        payload = self._generate_payload(model, prompt, system, temperature, max_tokens, top_k, top_p,
+                                         keep_alive=keep_alive, num_ctx=num_ctx)
+        async def _post(base_url: str) -> Dict[str, Any]:
+            response = await self.async_client.post(f"{base_url}/api/generate",
+                                                     json=self._tuned_payload(payload, base_url))
+            if response.status_code == 200:
+                return response.json()
+            raise OllamaAPIError(response.status_code)
+
+        return await self.hosts.arun(model, _post)
+
+    async def _astream_ollama(self, model: str, prompt: str, system: str = "",
+                              temperature: float = 0.7, max_tokens: int = 4000,
+                              top_k: int = 40, top_p: float = 0.9,
+                              on_token: Optional[Callable[[str], Any]] = None,
+                              keep_alive=None, num_ctx: Optional[int] = None) -> Dict[str, Any]:
+        """Async variant of _stream_ollama; on_token may be a plain function or a coroutine function"""
+        payload = self._generate_payload(model, prompt, system, temperature, max_tokens, top_k, top_p,
+                                         stream=True, keep_alive=keep_alive, num_ctx=num_ctx)
+        parts = []
+        final: Dict[str, Any] = {}
+        stopped_early = False
+
+        async with self.hosts.alease(model) as base_url:
+            async with self.async_client.stream(
+                "POST", f"{base_url}/api/generate", json=self._tuned_payload(payload, base_url)
+            ) as response:
+                if response.status_code != 200:
+                    raise OllamaAPIError(response.status_code)
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise Exception(f"Ollama API error: {chunk['error']}")
+                    text = chunk.get("response", "")
+                    if text:
+                        parts.append(text)
+                        if on_token is not None:
+                            keep_going = on_token(text)
+                            if inspect.isawaitable(keep_going):
+                                keep_going = await keep_going
+                            if keep_going is False:
+                                stopped_early = True
+                                break
+                    if chunk.get("done"):
+                        final = chunk
+                        break
+
+        final = {k: v for k, v in final.items() if k not in ("response", "context")}
+        final["response"] = "".join(parts)
+        final["stopped_early"] = stopped_early
+        return final
+
+    def _perplexity_request(self, prompt: str, system: str = "", max_tokens: int = 800) -> tuple[str, Dict, Dict]:
+        """Build (url, headers, payload) for a Perplexity chat completion"""
         url = "https://api.perplexity.ai/chat/completions"
         headers = {
             "Authorization": f"Bearer {self.perplexity_api_key}",
@@ -168,10 +625,27 @@ class LocalLLMManager:
             "messages": messages,
             "max_tokens": max_tokens,
         }
-        resp = requests.post(url, headers=headers, json=payload, timeout=60)
+        return url, headers, payload
+
+    def _call_perplexity(self, prompt: str, system: str = "", max_tokens: int = 800) -> tuple[str, Dict]:
+        """Minimal Perplexity chat completion used as fallback when Ollama is unavailable."""
+        url, headers, payload = self._perplexity_request(prompt, system, max_tokens)
+        resp = self.session.post(url, headers=headers, json=payload, timeout=self._timeout(60))
+        if resp.status_code != 200:
+            raise Exception(f"Perplexity API error: {resp.status_code} {resp.text}")
+        return self._parse_perplexity(resp.json())
+
+    async def _acall_perplexity(self, prompt: str, system: str = "", max_tokens: int = 800) -> tuple[str, Dict]:
+        """Async variant of _call_perplexity"""
+        url, headers, payload = self._perplexity_request(prompt, system, max_tokens)
+        resp = await self.async_client.post(url, headers=headers, json=payload,
+                                             timeout=httpx.Timeout(60, connect=self.connect_timeout))
         if resp.status_code != 200:
             raise Exception(f"Perplexity API error: {resp.status_code} {resp.text}")
-        data = resp.json()
+        return self._parse_perplexity(resp.json())
+
+    @staticmethod
+    def _parse_perplexity(data: Dict) -> tuple[str, Dict]:
         content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
         
         # Extract token usage if available
@@ -202,6 +676,37 @@ class LocalLLMManager:
         )
         return LocalLLMClient(researcher_model, "researcher", self)
 
+    def get_for_task(self, task: str):
+        """Client for a task class ("draft", "critique", "classify", "summarize").
+
+        Uses the class's model and budget from ModelConfig.TASK_CLASSES, falling back
+        to the base role's model unless the class model is known to be installed
+        (per the host pool's or the cached health check's last probe; never probes).
+        """
+        spec = ModelConfig.TASK_CLASSES.get(task)
+        if spec is None:
+            raise ValueError(f"Unknown task class: {task}")
+        base = self.get_writer() if spec["role"] == "writer" else self.get_researcher()
+        model = spec.get("model")
+        if model and not self._model_installed(model):
+            log.warning(f"Model {model} for task '{task}' is not known to be installed; using {base.model}")
+            model = None
+        client = LocalLLMClient(model or base.model, spec["role"], self, task=task)
+        if spec.get("max_tokens"):
+            client.max_tokens = spec["max_tokens"]
+        if spec.get("temperature") is not None:
+            client.temperature = spec["temperature"]
+        return client
+
+    def _model_installed(self, model: str) -> bool:
+        if self.hosts.probed:
+            models = self.hosts.all_models()
+        else:
+            with self._health_lock:
+                models = list(self._health["models"])
+        # Nothing known yet (or no host up): False, so callers use the base model, which is always set up
+        return model in models or f"{model}:latest" in models
+
     def set_default_models(self, writer: Optional[str] = None, researcher: Optional[str] = None):
         """Set runtime default models for writer/researcher."""
         if writer:
@@ -210,11 +715,67 @@ class LocalLLMManager:
             self.selected_researcher_model = researcher
 
 
+class Response:
+    """LangChain-like response: generated text plus response_metadata."""
+
+    def __init__(self, content, metadata, parsed=None):
+        self.content = content
+        self.response_metadata = metadata
+        # Validated object for structured (invoke_json) calls
+        self.parsed = parsed
+
+
+def _traced(method):
+    """Record each call's timings in the active telemetry ledger (see utils.telemetry)"""
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            started = time.perf_counter()
+            response = await method(self, *args, **kwargs)
+            record_call(self.model, self.role, response.response_metadata, time.perf_counter() - started,
+                        task=self.task)
+            return response
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        response = method(self, *args, **kwargs)
+        record_call(self.model, self.role, response.response_metadata, time.perf_counter() - started,
+                    task=self.task)
+        return response
+    return wrapper
+
+
+def _is_backend_failure(error: BaseException) -> bool:
+    """Errors that count against a backend's circuit (not e.g. a 404 for a model that isn't pulled)"""
+    return not isinstance(error, OllamaAPIError) or error.status_code >= 500
+
+
+def _split_messages(messages) -> tuple[str, str]:
+    """Convert LangChain-style (role, text) tuples into (system, prompt)."""
+    if isinstance(messages, list):
+        system_msg = ""
+        human_msg = ""
+        for msg in messages:
+            if msg[0] == "system":
+                system_msg = msg[1]
+            elif msg[0] == "human":
+                human_msg = msg[1]
+        return system_msg, human_msg
+    return "", str(messages)
+
+
 class LocalLLMClient:
-    def __init__(self, model: str, role: str, manager: LocalLLMManager):
+    def __init__(self, model: str, role: str, manager: LocalLLMManager, task: Optional[str] = None,
+                 backend: Optional[LLMBackend] = None):
         self.model = model
         self.role = role
         self.manager = manager
+        # Runs the generation; the manager's configured backend unless given (e.g. by benchmarks)
+        self.backend = backend or manager.backend
+        # Task class this client was routed for (see LocalLLMManager.get_for_task)
+        self.task = task
         # Load default parameters from config
         self.temperature = float(os.getenv(f"{role.upper()}_TEMPERATURE", 
                                           "0.7" if role == "writer" else "0.3"))
@@ -222,51 +783,191 @@ class LocalLLMClient:
                                        "4000" if role == "writer" else "2000"))
         self.top_k = int(os.getenv(f"{role.upper()}_TOP_K", "40"))
         self.top_p = float(os.getenv(f"{role.upper()}_TOP_P", "0.9"))
+        self.keep_alive = manager.keep_alive_for(role)
 
-    def invoke(self, messages):
-        """Invoke the local LLM with messages"""
-        # Convert LangChain message format to prompt
-        if isinstance(messages, list):
-            system_msg = ""
-            human_msg = ""
-            for msg in messages:
-                if msg[0] == "system":
-                    system_msg = msg[1]
-                elif msg[0] == "human":
-                    human_msg = msg[1]
-            prompt = human_msg
-            system = system_msg
-        else:
-            prompt = str(messages)
-            system = ""
+    def _generation_kwargs(self, *prompt_texts: str) -> Dict[str, Any]:
+        """Ollama call parameters; with prompt texts, also a num_ctx sized to fit them plus the output"""
+        kwargs = {
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "top_k": self.top_k,
+            "top_p": self.top_p,
+            "keep_alive": self.keep_alive,
+        }
+        if prompt_texts:
+            counter = get_token_counter(self.model)
+            # Small allowance for the chat template's role markers
+            prompt_tokens = sum(counter.count(t) + 8 for t in prompt_texts)
+            kwargs["num_ctx"] = self.manager.num_ctx_for(self.model, prompt_tokens + self.max_tokens)
+        return kwargs
+
+    @property
+    def _latency_key(self) -> tuple:
+        # Latency depends on the model and on the kind of call (output budget), hence task/role
+        return self.backend.name, self.model, self.task or self.role
+
+    def _backend_call(self, method: str, **kwargs) -> Dict[str, Any]:
+        """Call the backend through its circuit breaker, then the request queue.
+
+        An open circuit fails fast with CircuitOpenError instead of queueing.
+        """
+        def _queued() -> Dict[str, Any]:
+            with self.manager.request_queue.slot() as waited:
+                # A hedge's delay starts now: latency samples don't include the queue wait either
+                slot_granted = _slot_granted.get()
+                if slot_granted is not None:
+                    slot_granted.set()
+                started = time.perf_counter()
+                response = getattr(self.backend, method)(**kwargs)
+                if method in ("generate", "chat"):  # streams may stop early, so their latency says little
+                    self.manager.latency_window(self._latency_key).add(time.perf_counter() - started)
+            response["queue_wait_ms"] = round(waited * 1000, 1)
+            return response
+
+        return self.manager.breaker(self.backend.name).call(_queued)
+
+    async def _abackend_call(self, method: str, **kwargs) -> Dict[str, Any]:
+        """Async variant of _backend_call"""
+        async def _queued() -> Dict[str, Any]:
+            async with self.manager.request_queue.aslot() as waited:
+                started = time.perf_counter()
+                response = await getattr(self.backend, method)(**kwargs)
+                if method == "agenerate":
+                    self.manager.latency_window(self._latency_key).add(time.perf_counter() - started)
+            response["queue_wait_ms"] = round(waited * 1000, 1)
+            return response
+
+        return await self.manager.breaker(self.backend.name).acall(_queued)
+
+    def _hedged(self, local: Callable[[], "Response"], prompt: str, system: str) -> "Response":
+        """Run local(); if it outlasts the usual latency (see hedge_delay), also ask Perplexity.
+
+        The delay counts from when local() gets its request queue slot, like the
+        latency samples it is compared against, so time spent queued never
+        triggers a hedge. The first answer wins; the other call finishes in the
+        background.
+        """
+        delay = self.manager.hedge_delay(self._latency_key)
+        if delay is None:
+            return local()
+        fired = []
+        slot_granted = threading.Event()
+
+        def _primary() -> "Response":
+            token = _slot_granted.set(slot_granted)
+            try:
+                return local()
+            finally:
+                _slot_granted.reset(token)
+                slot_granted.set()  # also when it failed (or was served from cache) without a slot
 
         try:
-            response = self.manager._call_ollama(
-                model=self.model,
-                prompt=prompt,
-                system=system,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                top_k=self.top_k,
-                top_p=self.top_p
-            )
+            response, winner = hedged_call(_primary, lambda: self._call_secondary(prompt, system), delay,
+                                           on_hedge=lambda: fired.append(True), started=slot_granted)
+        except HedgeError:
+            record_event("hedge", backend=self.backend.name, model=self.model, delay_ms=round(delay * 1000, 1),
+                         winner="none")
+            raise
+        if fired:
+            record_event("hedge", backend=self.backend.name, model=self.model, delay_ms=round(delay * 1000, 1),
+                         winner="perplexity" if winner == "secondary" else self.backend.name)
+        return response
+
+    def _cache_lookup(self, system: str, prompt: str, use_cache: bool, **extra):
+        """Return (cache_key, cached Response or None); key is None when caching is off"""
+        cache = self.manager.response_cache
+        if not (use_cache and cache.enabled):
+            return None, None
+        params = self._generation_kwargs()
+        model = params.pop("model")
+        params.pop("keep_alive", None)  # residency, not output
+        params.pop("num_ctx", None)
+        key = cache.make_key(model, system, prompt, **params, **extra)
+        cached = cache.get(key)
+        status = {"status": "hit"}
+        if cached is None:
+            # Semantic tier: a near-identical prompt with the same model, system prompt and parameters
+            scope = cache.make_key(model, system, "", **params, **extra)
+            cached, similarity = self.manager.semantic_cache.lookup(key, scope, self.task or self.role, prompt)
+            if cached is None:
+                return key, None
+            status = {"status": "semantic_hit", "similarity": round(similarity, 4)}
+        metadata = {
+            "model": self.model,
+            # Nothing was generated, so nothing is billed to the run
+            "token_usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            "cache": {**status, **cache.stats(), **self.manager.semantic_cache.stats()}
+        }
+        return key, Response(cached["content"], metadata)
+
+    def _cache_store(self, key: Optional[str], content: str, metadata: Dict) -> Dict:
+        """Persist a fresh generation (if caching is on) and annotate its metadata"""
+        cache = self.manager.response_cache
+        if key is None:
+            metadata["cache"] = {"status": "off", **cache.stats()}
+            return metadata
+        if content:
+            cache.set(key, {"content": content, "token_usage": metadata.get("token_usage", {})})
+        metadata["cache"] = {"status": "miss", **cache.stats()}
+        # Best similarity the semantic lookup saw: how near this miss came to a hit
+        similarity = self.manager.semantic_cache.remember(key, store=bool(content))
+        if similarity is not None:
+            metadata["cache"]["similarity"] = round(similarity, 4)
+        return metadata
+
+    @_traced
+    def invoke(self, messages, use_cache: bool = True):
+        """Invoke the local LLM with messages.
+
+        When the response cache is enabled, identical requests are answered from
+        disk; pass use_cache=False for creative calls that should always regenerate.
+        Identical requests already in flight on another thread are coalesced: the
+        caller waits for that call and shares its answer (cache status "coalesced").
+        """
+        # Convert LangChain message format to prompt
+        system, prompt = _split_messages(messages)
+        cache_key, cached = self._cache_lookup(system, prompt, use_cache)
+        if cached is not None:
+            return cached
+        if not use_cache:
+            return self._invoke_uncached(system, prompt, cache_key)
+
+        key = fingerprint(self.model, system, prompt, self.temperature, self.max_tokens, self.top_k, self.top_p)
+        response, shared = single_flight.do("llm", key, lambda: self._invoke_uncached(system, prompt, cache_key))
+        return self._coalesced(response) if shared else response
+
+    @staticmethod
+    def _coalesced(response: Response) -> Response:
+        """Copy of another caller's Response; nothing was generated for this caller, so nothing is billed"""
+        metadata = {
+            **response.response_metadata,
+            "token_usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            "timings": {k: 0.0 for k in response.response_metadata.get("timings", {})},
+            "cache": {**response.response_metadata.get("cache", {}), "status": "coalesced"},
+        }
+        return Response(response.content, metadata, parsed=response.parsed)
+
+    def _invoke_uncached(self, system: str, prompt: str, cache_key: Optional[str]) -> Response:
+        def _local() -> Response:
+            response = self._backend_call("generate", prompt=prompt, system=system,
+                                          **self._generation_kwargs(system, prompt))
             
             # Extract token counts from response
-            token_usage = self._extract_token_usage(response)
-            
-            # Create response object similar to LangChain
-            class Response:
-                def __init__(self, content, metadata):
-                    self.content = content
-                    self.response_metadata = metadata
+            token_usage = self._extract_token_usage(response, system + prompt)
 
             metadata = {
                 "model": self.model,
-                "token_usage": token_usage
+                "token_usage": token_usage,
+                "prompt_eval": self._prompt_eval_stats(response),
+                "timings": self._timings(response)
             }
+            content = response.get("response", "")
 
-            return Response(response.get("response", ""), metadata)
-            
+            return Response(content, self._cache_store(cache_key, content, metadata))
+
+        try:
+            return self._hedged(_local, prompt, system)
         except httpx.ConnectError as e:
             log.error(f"Connection error when calling local LLM: {str(e)}")
             raise Exception(f"Failed to connect to local LLM service: {str(e)}")
@@ -275,31 +976,318 @@ class LocalLLMClient:
             raise Exception(f"Local LLM request timed out: {str(e)}")
         except Exception as e:
             log.error(f"Error when calling local LLM: {str(e)}")
-            # Fallback to Perplexity if available
-            if self.manager.perplexity_api_key:
-                try:
-                    content, token_usage = self.manager._call_perplexity(
-                        prompt=prompt, 
-                        system=system, 
-                        max_tokens=self.max_tokens
-                    )
-                    
-                    class Response:
-                        def __init__(self, content, metadata):
-                            self.content = content
-                            self.response_metadata = metadata
-                    
-                    metadata = {
-                        "model": "perplexity",
-                        "token_usage": token_usage
-                    }
-                    
-                    return Response(content, metadata)
-                except Exception as pe:
-                    raise Exception(f"Failed to call local LLM and Perplexity fallback: {pe}")
-            raise Exception(f"Failed to call local LLM: {str(e)}")
-
-    def _extract_token_usage(self, response: Dict) -> Dict:
+            return self._perplexity_fallback(prompt, system, e)
+
+    def invoke_many(self, batch: list, max_concurrency: Optional[int] = None, use_cache: bool = True) -> list:
+        """Invoke independent prompts concurrently, returning results in input order.
+
+        Concurrency is capped at the model's parallel slots summed over hosts
+        (see parallel_for). A failed prompt does not abort the others: its slot holds the Exception
+        instead of a Response, so callers should check with isinstance.
+        """
+        if not batch:
+            return []
+        parallel = self.manager.parallel_for(self.model)
+        limit = min(max_concurrency or parallel, parallel, len(batch))
+
+        def _invoke_one(messages):
+            try:
+                return self.invoke(messages, use_cache=use_cache)
+            except Exception as e:
+                log.error(f"Batched LLM call failed: {str(e)}")
+                return e
+
+        if limit <= 1:
+            return [_invoke_one(messages) for messages in batch]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=limit) as executor:
+            # Each worker runs in a copy of the caller's context so its calls reach the caller's ledger
+            futures = [executor.submit(contextvars.copy_context().run, _invoke_one, messages) for messages in batch]
+            return [future.result() for future in futures]
+
+    @_traced
+    def stream(self, messages, on_token: Optional[Callable[[str], Any]] = None):
+        """Invoke the local LLM with streaming output.
+
+        on_token is called with each text chunk as it arrives; return False from it
+        to stop generation early. Returns the same Response as invoke() once the
+        stream ends (response_metadata["stopped_early"] tells whether it was cut short).
+        """
+        system, prompt = _split_messages(messages)
+        delivered = []
+
+        def _relay(text: str):
+            delivered.append(text)
+            return on_token(text) if on_token is not None else None
+
+        try:
+            response = self._backend_call(
+                "stream",
+                prompt=prompt,
+                system=system,
+                on_token=_relay,
+                **self._generation_kwargs(system, prompt)
+            )
+
+            metadata = {
+                "model": self.model,
+                "token_usage": self._extract_token_usage(response, system + prompt),
+                "prompt_eval": self._prompt_eval_stats(response),
+                "timings": self._timings(response),
+                "stopped_early": response.get("stopped_early", False)
+            }
+
+            return Response(response.get("response", ""), metadata)
+
+        except Exception as e:
+            log.error(f"Error when streaming from local LLM: {str(e)}")
+            if delivered:
+                # Partial output already reached the caller; don't splice in another model's answer
+                raise Exception(f"Local LLM stream failed after partial output: {str(e)}")
+            result = self._perplexity_fallback(prompt, system, e)
+            # Perplexity is not streamed; deliver its answer as a single chunk
+            if on_token is not None and result.content:
+                on_token(result.content)
+            return result
+
+    @_traced
+    async def ainvoke(self, messages, use_cache: bool = True):
+        """Async invoke; independent calls can be awaited together (e.g. with asyncio.gather)"""
+        system, prompt = _split_messages(messages)
+        cache_key, cached = self._cache_lookup(system, prompt, use_cache)
+        if cached is not None:
+            return cached
+
+        try:
+            response = await self._abackend_call("agenerate", prompt=prompt, system=system,
+                                                 **self._generation_kwargs(system, prompt))
+
+            metadata = {
+                "model": self.model,
+                "token_usage": self._extract_token_usage(response, system + prompt),
+                "prompt_eval": self._prompt_eval_stats(response),
+                "timings": self._timings(response)
+            }
+            content = response.get("response", "")
+
+            return Response(content, self._cache_store(cache_key, content, metadata))
+
+        except Exception as e:
+            log.error(f"Error when calling local LLM: {str(e)}")
+            return await self._aperplexity_fallback(prompt, system, e)
+
+    @_traced
+    async def astream(self, messages, on_token: Optional[Callable[[str], Any]] = None):
+        """Async variant of stream(); on_token may be a plain function or a coroutine function"""
+        system, prompt = _split_messages(messages)
+        delivered = []
+
+        async def _relay(text: str):
+            delivered.append(text)
+            result = on_token(text) if on_token is not None else None
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+
+        try:
+            response = await self._abackend_call(
+                "astream",
+                prompt=prompt,
+                system=system,
+                on_token=_relay,
+                **self._generation_kwargs(system, prompt)
+            )
+
+            metadata = {
+                "model": self.model,
+                "token_usage": self._extract_token_usage(response, system + prompt),
+                "prompt_eval": self._prompt_eval_stats(response),
+                "timings": self._timings(response),
+                "stopped_early": response.get("stopped_early", False)
+            }
+
+            return Response(response.get("response", ""), metadata)
+
+        except Exception as e:
+            log.error(f"Error when streaming from local LLM: {str(e)}")
+            if delivered:
+                raise Exception(f"Local LLM stream failed after partial output: {str(e)}")
+            result = await self._aperplexity_fallback(prompt, system, e)
+            if on_token is not None and result.content:
+                await _relay(result.content)
+            return result
+
+    @_traced
+    def chat(self, messages: list):
+        """Invoke with a full chat history ([{"role", "content"}, ...]) via /api/chat.
+
+        Used by LLMSession so consecutive steps share the evaluated prefix; the
+        Perplexity fallback sees the history flattened into one prompt.
+        """
+        texts = [m["content"] for m in messages]
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        prompt = "\n\n".join(m["content"] for m in messages if m["role"] != "system")
+
+        def _local() -> Response:
+            response = self._backend_call("chat", messages=messages, **self._generation_kwargs(*texts))
+
+            metadata = {
+                "model": self.model,
+                "token_usage": self._extract_token_usage(response, "".join(texts)),
+                "prompt_eval": self._prompt_eval_stats(response),
+                "timings": self._timings(response)
+            }
+
+            return Response(response.get("response", ""), metadata)
+
+        try:
+            return self._hedged(_local, prompt, system)
+        except Exception as e:
+            log.error(f"Error when calling local LLM chat: {str(e)}")
+            return self._perplexity_fallback(prompt, system, e)
+
+    @_traced
+    def invoke_json(self, messages, schema=None, use_cache: bool = True):
+        """Invoke with output constrained to JSON, optionally matching a pydantic schema.
+
+        The schema is sent as Ollama's `format`, and generation is stopped as soon as
+        the top-level object closes. Returns a Response whose .parsed holds the
+        validated dict; raises ValueError if no valid object could be recovered
+        (e.g. from a Perplexity fallback answer, which is not constrained).
+        """
+        system, prompt = _split_messages(messages)
+        fmt = schema.model_json_schema() if schema is not None else "json"
+        cache_key, cached = self._cache_lookup(system, prompt, use_cache, format=fmt)
+        if cached is not None:
+            cached.parsed = self._validate_json(cached.content, schema)
+            return cached
+
+        try:
+            response = self._stream_json(fmt, prompt=prompt, system=system,
+                                         **self._generation_kwargs(system, prompt))
+        except Exception as e:
+            log.error(f"Error when calling local LLM for JSON: {str(e)}")
+            result = self._perplexity_fallback(prompt, system, e)
+            result.parsed = self._validate_json(result.content, schema)
+            return result
+
+        parsed = self._validate_json(response.content, schema)
+        self._cache_store(cache_key, response.content, response.response_metadata)
+        response.parsed = parsed
+        return response
+
+    @_traced
+    def chat_json(self, messages: list, schema=None):
+        """chat() with JSON-constrained output; see invoke_json"""
+        texts = [m["content"] for m in messages]
+        fmt = schema.model_json_schema() if schema is not None else "json"
+        try:
+            response = self._stream_json(fmt, prompt="", messages=messages, **self._generation_kwargs(*texts))
+        except Exception as e:
+            log.error(f"Error when calling local LLM chat for JSON: {str(e)}")
+            system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+            prompt = "\n\n".join(m["content"] for m in messages if m["role"] != "system")
+            response = self._perplexity_fallback(prompt, system, e)
+        response.parsed = self._validate_json(response.content, schema)
+        return response
+
+    def _stream_json(self, fmt, **call_kwargs) -> Response:
+        """Stream a format-constrained generation and cut it off once the JSON value is closed"""
+        parser = JsonStreamParser()
+        response = self._backend_call(
+            "stream",
+            format=fmt,
+            on_token=lambda text: False if parser.feed(text) else None,
+            **call_kwargs
+        )
+        prompt_text = "".join(m["content"] for m in call_kwargs.get("messages") or []) \
+            or call_kwargs.get("system", "") + call_kwargs.get("prompt", "")
+        metadata = {
+            "model": self.model,
+            "token_usage": self._extract_token_usage(response, prompt_text),
+            "prompt_eval": self._prompt_eval_stats(response),
+            "timings": self._timings(response),
+            "stopped_early": response.get("stopped_early", False)
+        }
+        return Response(parser.text or response.get("response", ""), metadata)
+
+    @staticmethod
+    def _validate_json(content: str, schema=None):
+        """Parse model output leniently and validate it against the schema (as a plain dict)"""
+        data = parse_json(content)
+        if schema is None:
+            return data
+        try:
+            return schema.model_validate(data).model_dump()
+        except Exception as e:
+            raise ValueError(f"Model output does not match {schema.__name__}: {e}")
+
+    def start_session(self, system: str, shared_context: str = "") -> "LLMSession":
+        """Start a multi-step session whose calls reuse the evaluated prompt prefix"""
+        return LLMSession(self, system, shared_context)
+
+    @staticmethod
+    def _timings(response: Dict) -> Dict:
+        """Ollama's per-request durations (reported in ns) in milliseconds, plus time spent in the request queue"""
+        return {
+            **{
+                f"{name}_ms": round(response.get(f"{name}_duration", 0) / 1e6, 1)
+                for name in ("total", "load", "prompt_eval", "eval")
+            },
+            "queue_ms": response.get("queue_wait_ms", 0.0),
+        }
+
+    @staticmethod
+    def _prompt_eval_stats(response: Dict) -> Dict:
+        """Tokens Ollama actually evaluated for the prompt (cached prefix tokens are skipped) and the time taken"""
+        return {
+            "tokens": response.get("prompt_eval_count", 0),
+            "ms": round(response.get("prompt_eval_duration", 0) / 1e6, 1)
+        }
+
+    def _call_secondary(self, prompt: str, system: str) -> Response:
+        """Perplexity answer (through its circuit breaker) for fallback and hedging"""
+        content, token_usage = self.manager.breaker("perplexity").call(
+            self.manager._call_perplexity,
+            prompt=prompt, 
+            system=system, 
+            max_tokens=self.max_tokens
+        )
+        
+        metadata = {
+            "model": "perplexity",
+            "token_usage": token_usage
+        }
+        
+        return Response(content, metadata)
+
+    def _perplexity_fallback(self, prompt: str, system: str, error: Exception):
+        """Answer via Perplexity if configured, otherwise re-raise the local failure"""
+        if isinstance(error, HedgeError) and error.secondary_error is not None:
+            # Perplexity was already asked as the hedge and failed too
+            raise Exception(f"Failed to call local LLM and Perplexity fallback: {error.secondary_error}")
+        if self.manager.perplexity_api_key:
+            try:
+                return self._call_secondary(prompt, system)
+            except Exception as pe:
+                raise Exception(f"Failed to call local LLM and Perplexity fallback: {pe}")
+        raise Exception(f"Failed to call local LLM: {str(error)}")
+
+    async def _aperplexity_fallback(self, prompt: str, system: str, error: Exception):
+        """Async variant of _perplexity_fallback"""
+        if self.manager.perplexity_api_key:
+            try:
+                content, token_usage = await self.manager.breaker("perplexity").acall(
+                    self.manager._acall_perplexity,
+                    prompt=prompt,
+                    system=system,
+                    max_tokens=self.max_tokens
+                )
+                return Response(content, {"model": "perplexity", "token_usage": token_usage})
+            except Exception as pe:
+                raise Exception(f"Failed to call local LLM and Perplexity fallback: {pe}")
+        raise Exception(f"Failed to call local LLM: {str(error)}")
+
+    def _extract_token_usage(self, response: Dict, prompt: str = "") -> Dict:
         """Extract token usage from Ollama response"""
         # Try to get actual token counts from response metadata
         ollama_stats = response.get("prompt_eval_count", 0) + response.get("eval_count", 0)
@@ -310,14 +1298,65 @@ class LocalLLMClient:
                 "total_tokens": ollama_stats
             }
         else:
-            # Fallback to word count estimation
-            response_text = response.get("response", "")
+            # No stats (e.g. a stream cut short): count with the model's tokenizer
+            counter = get_token_counter(self.model)
+            prompt_tokens = counter.count(prompt)
+            completion_tokens = counter.count(response.get("response", ""))
             return {
-                "prompt_tokens": 0,  # Would need to pass prompt to calculate this
-                "completion_tokens": len(response_text.split()),
-                "total_tokens": len(response_text.split())
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
             }
 
 
+class LLMSession:
+    """Multi-step conversation whose calls share one evaluated prompt prefix.
+
+    The system prompt and the large shared blocks (summary, research, section
+    brief) lead the history and never change; each step only appends turns.
+    Ollama keeps the KV cache of the previous request, so a step re-evaluates
+    just its new turn as long as consecutive steps run on the same model.
+    Per-step prompt-eval cost is recorded in `steps`.
+    """
+
+    def __init__(self, client: LocalLLMClient, system: str, shared_context: str = ""):
+        self.client = client
+        self.shared_context = shared_context
+        self.messages = [{"role": "system", "content": system}]
+        self.steps: list = []
+
+    def _user_turn(self, prompt: str) -> Dict[str, str]:
+        # Shared blocks go first in the first user turn so every request starts with the same tokens
+        if len(self.messages) == 1 and self.shared_context:
+            prompt = f"{self.shared_context}\n\n{prompt}"
+        return {"role": "user", "content": prompt}
+
+    def add_turn(self, prompt: str, reply: str):
+        """Record an exchange produced outside the session (no model call)"""
+        self.messages.append(self._user_turn(prompt))
+        self.messages.append({"role": "assistant", "content": reply})
+
+    def invoke(self, prompt: str, client: Optional[LocalLLMClient] = None, step: str = ""):
+        """Send the next turn (optionally on a different role's client) and append the reply"""
+        client = client or self.client
+        return self._record(client, step, lambda messages: client.chat(messages), prompt)
+
+    def invoke_json(self, prompt: str, schema=None, client: Optional[LocalLLMClient] = None, step: str = ""):
+        """invoke() with JSON-constrained output; the validated dict is on response.parsed"""
+        client = client or self.client
+        return self._record(client, step, lambda messages: client.chat_json(messages, schema=schema), prompt)
+
+    def _record(self, client: LocalLLMClient, step: str, call: Callable, prompt: str):
+        messages = self.messages + [self._user_turn(prompt)]
+        response = call(messages)
+        self.messages = messages + [{"role": "assistant", "content": response.content}]
+        self.steps.append({
+            "step": step or f"step {len(self.steps) + 1}",
+            "model": response.response_metadata.get("model", client.model),
+            **{f"prompt_eval_{k}": v for k, v in response.response_metadata.get("prompt_eval", {}).items()}
+        })
+        return response
+
+
 # Global instance
 local_llm_manager = LocalLLMManager()
\ No newline at end of file
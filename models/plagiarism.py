@@ -1,10 +1,11 @@
 import hashlib
-import json
 import logging
 import re
 from typing import Dict, List, Set, Optional
 from .llm_manager import local_llm_manager
 from config import PLAGIARISM_THRESHOLD
+from utils.token_budget import truncate_to_tokens
+from .schemas import PlagiarismAnalysis
 
 # Logger for the module
 log = logging.getLogger(__name__)
@@ -13,7 +14,6 @@ log = logging.getLogger(__name__)
 class PlagiarismDetector:
     def __init__(self, llm_manager=None, threshold: Optional[int] = None):
         self.llm_manager = llm_manager or local_llm_manager
-        self.llm = self.llm_manager.get_researcher()
         self.threshold = threshold if threshold is not None else PLAGIARISM_THRESHOLD
 
     def analyze_content(self, content: str, existing_fingerprints: Set[str]) -> Dict:
@@ -51,11 +51,13 @@ class PlagiarismDetector:
 
     def _ai_plagiarism_check(self, content: str) -> Dict:
         """AI-powered plagiarism analysis with enhanced detection"""
+        # Short JSON verdict: routed to the small classification model
+        llm = self.llm_manager.get_for_task("classify")
         prompt = f"""
         Analyze this content for plagiarism risk with detailed evaluation.
 
         CONTENT:
-        {content[:3000]}
+        {truncate_to_tokens(content, 750, llm.model)}
 
         Provide analysis in JSON format strictly as:
         {{
@@ -81,20 +83,11 @@ class PlagiarismDetector:
         81-100: Very high risk - extensive plagiarism detected
         """
         try:
-            response = self.llm.invoke([
+            response = llm.invoke_json([
                 ("system", "You are a plagiarism detection expert. Output valid JSON only. Be thorough and precise in your analysis."),
                 ("human", prompt),
-            ])
-            data = json.loads(response.content)
-            # Basic shape guard
-            if not isinstance(data, dict):
-                return {"risk_score": 0, "flagged_phrases": [], "confidence": "low", "issues": [], "suggestions": []}
-            data.setdefault("risk_score", 0)
-            data.setdefault("flagged_phrases", [])
-            data.setdefault("confidence", "low")
-            data.setdefault("issues", [])
-            data.setdefault("suggestions", [])
-            return data
+            ], schema=PlagiarismAnalysis)
+            return response.parsed
         except Exception as e:
             print(f"AI plagiarism check failed: {e}")
             return {"risk_score": 0, "flagged_phrases": [], "confidence": "low", "issues": [], "suggestions": []}
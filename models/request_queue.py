@@ -0,0 +1,186 @@
+"""Process-wide admission queue for LLM backend calls.
+
+Every Streamlit session shares local_llm_manager, so without a queue two users
+generating at once pile their requests onto Ollama together. Each backend call
+takes a slot here first. At most `max_concurrency` calls run at once, and the rest wait
+in priority order, then with sessions taking turns round-robin within a
+priority, so one session's long batch of drafts cannot starve another
+session's requests. Workflow generation is the only caller today, so there is
+one priority class, "background"; a class for calls someone is waiting on
+(e.g. editor actions) goes ahead of it in PRIORITIES once such a caller exists.
+
+Callers tag their calls with llm_request_context(session=..., priority=...);
+the tags are context variables, so they follow the calls into worker threads
+started with contextvars.copy_context() (invoke_many, the scheduler).
+"""
+
+import asyncio
+import collections
+import contextvars
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Deque, Dict, Optional
+
+from utils.error_handling import LatencyWindow
+
+PRIORITIES = ("background",)  # highest first
+
+_request_context: contextvars.ContextVar = contextvars.ContextVar(
+    "llm_request_context", default=("default", "background")
+)
+
+
+@contextmanager
+def llm_request_context(session: Optional[str] = None, priority: Optional[str] = None):
+    """Tag LLM calls made in this context with a session and priority class"""
+    current_session, current_priority = _request_context.get()
+    priority = priority or current_priority
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority: {priority}")
+    token = _request_context.set((session or current_session, priority))
+    try:
+        yield
+    finally:
+        _request_context.reset(token)
+
+
+class _Ticket:
+    def __init__(self, session: str, priority: str, grant):
+        self.session = session
+        self.priority = priority
+        self.enqueued = time.perf_counter()
+        self.grant = grant  # called (under the queue lock) when the ticket gets a slot
+        self.granted = False
+
+
+class LLMRequestQueue:
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        # Per priority: session -> its waiting tickets, and the order sessions take turns in
+        self._waiting: Dict[str, Dict[str, Deque[_Ticket]]] = {p: {} for p in PRIORITIES}
+        self._turns: Dict[str, Deque[str]] = {p: collections.deque() for p in PRIORITIES}
+        self._waits = {p: LatencyWindow(500) for p in PRIORITIES}
+        self._served = {p: 0 for p in PRIORITIES}
+
+    # ===== Scheduling (called with the lock held) =====
+    def _enqueue(self, ticket: _Ticket):
+        sessions = self._waiting[ticket.priority]
+        if ticket.session not in sessions:
+            sessions[ticket.session] = collections.deque()
+            self._turns[ticket.priority].append(ticket.session)
+        sessions[ticket.session].append(ticket)
+
+    def _dispatch(self):
+        """Grant free slots: highest priority first, sessions round-robin within a priority"""
+        for priority in PRIORITIES:
+            turns, sessions = self._turns[priority], self._waiting[priority]
+            while turns and self._in_flight < self.max_concurrency:
+                session = turns.popleft()
+                ticket = sessions[session].popleft()
+                if sessions[session]:
+                    turns.append(session)
+                else:
+                    del sessions[session]
+                self._in_flight += 1
+                ticket.granted = True
+                self._waits[priority].add(time.perf_counter() - ticket.enqueued)
+                self._served[priority] += 1
+                ticket.grant()
+
+    def _cancel(self, ticket: _Ticket):
+        """Withdraw a waiting ticket, or give back its slot if it was granted meanwhile"""
+        if ticket.granted:
+            self._in_flight -= 1
+            self._dispatch()
+            return
+        queue = self._waiting[ticket.priority].get(ticket.session)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self._waiting[ticket.priority][ticket.session]
+                self._turns[ticket.priority].remove(ticket.session)
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._dispatch()
+
+    def resize(self, max_concurrency: int):
+        """Change the ceiling; a larger one lets waiting calls start right away"""
+        with self._lock:
+            self.max_concurrency = max(1, max_concurrency)
+            self._dispatch()
+
+    # ===== Slots =====
+    @contextmanager
+    def slot(self):
+        """Wait for a slot for the current session and priority; yields the seconds spent waiting"""
+        session, priority = _request_context.get()
+        event = threading.Event()
+        ticket = _Ticket(session, priority, event.set)
+        with self._lock:
+            self._enqueue(ticket)
+            self._dispatch()
+        try:
+            event.wait()
+        except BaseException:
+            with self._lock:
+                self._cancel(ticket)
+            raise
+        try:
+            yield time.perf_counter() - ticket.enqueued
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        """Async variant of slot(); waiting does not block the event loop"""
+        session, priority = _request_context.get()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def _grant():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        ticket = _Ticket(session, priority, _grant)
+        with self._lock:
+            self._enqueue(ticket)
+            self._dispatch()
+        try:
+            await future
+        except BaseException:
+            with self._lock:
+                self._cancel(ticket)
+            raise
+        try:
+            yield time.perf_counter() - ticket.enqueued
+        finally:
+            self._release()
+
+    # ===== Reporting =====
+    def stats(self) -> Dict[str, Any]:
+        """Running and waiting calls, waiting sessions, and recent wait times (ms) per priority"""
+        with self._lock:
+            depth = {p: sum(len(q) for q in self._waiting[p].values()) for p in PRIORITIES}
+            sessions = {s for p in PRIORITIES for s in self._waiting[p]}
+            in_flight = self._in_flight
+            served = dict(self._served)
+
+        def _ms(seconds: Optional[float]) -> float:
+            return round((seconds or 0.0) * 1000, 1)
+
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": in_flight,
+            "depth": sum(depth.values()),
+            "depth_by_priority": depth,
+            "sessions_waiting": len(sessions),
+            "served_by_priority": served,
+            "wait_ms": {
+                p: {"p50": _ms(self._waits[p].percentile(50)), "p95": _ms(self._waits[p].percentile(95))}
+                for p in PRIORITIES
+            },
+        }
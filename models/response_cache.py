@@ -0,0 +1,100 @@
+import hashlib
+import json
+import logging
+import threading
+from typing import Optional, Dict, Any
+from config import LLMCacheConfig
+
+# Logger for the module
+log = logging.getLogger(__name__)
+
+
+class LLMResponseCache:
+    """Content-addressed on-disk cache for LLM generations.
+
+    Entries are keyed by a SHA-256 digest of the model, the generation
+    parameters, the system prompt and the prompt, so the key is stable across
+    processes. Storage is a diskcache.Cache with a size limit (LRU eviction)
+    and a per-entry TTL; the directory is opened lazily on first use.
+    """
+
+    def __init__(self, directory: str = None, size_limit_mb: int = None,
+                 ttl_seconds: int = None, enabled: bool = None):
+        self.directory = directory or LLMCacheConfig.DIRECTORY
+        self.size_limit_mb = size_limit_mb if size_limit_mb is not None else LLMCacheConfig.SIZE_LIMIT_MB
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else LLMCacheConfig.TTL_SECONDS
+        self.enabled = LLMCacheConfig.ENABLED if enabled is None else enabled
+        self._cache = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, system: str, prompt: str, **params) -> str:
+        """Stable digest of everything that determines a generation"""
+        material = json.dumps(
+            {"model": model, "system": system, "prompt": prompt, "params": params},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _open(self):
+        if self._cache is None:
+            with self._lock:
+                if self._cache is None:
+                    try:
+                        import diskcache  # type: ignore
+                        self._cache = diskcache.Cache(
+                            self.directory,
+                            size_limit=self.size_limit_mb * 1024 * 1024,
+                            eviction_policy="least-recently-used",
+                        )
+                    except Exception as e:
+                        log.warning(f"LLM response cache unavailable, disabling: {e}")
+                        self.enabled = False
+        return self._cache
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled or self._open() is None:
+            return None
+        try:
+            value = self._cache.get(key)
+        except Exception as e:
+            log.warning(f"LLM cache read failed: {e}")
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """Like get, without counting a hit or miss (for the semantic tier's lookups)"""
+        if not self.enabled or self._open() is None:
+            return None
+        try:
+            return self._cache.get(key)
+        except Exception as e:
+            log.warning(f"LLM cache read failed: {e}")
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]):
+        if not self.enabled or self._open() is None:
+            return
+        try:
+            self._cache.set(key, value, expire=self.ttl_seconds or None)
+        except Exception as e:
+            log.warning(f"LLM cache write failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        if self._open() is not None:
+            self._cache.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
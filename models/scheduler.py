@@ -0,0 +1,102 @@
+"""Model-affinity scheduling of independent LLM calls.
+
+When the writer and researcher models differ and the Ollama host only has
+memory for one of them, every switch between them is a full model load.
+Callers hand the scheduler a list of independent calls, each tagged with its
+model; the scheduler runs them in model-homogeneous groups, starting with the
+model that is already loaded, and returns results in submission order.
+
+Swaps are counted per host by OllamaHostPool (a call whose model differs from
+the host's previous call); stats() adds how many swaps grouping avoided
+compared with running each batch in submission order.
+"""
+
+import concurrent.futures
+import contextvars
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+
+def count_swaps(models: List[str], loaded: Optional[str] = None) -> int:
+    """Model changes when running models in this order, starting with loaded in memory"""
+    swaps = 0
+    for model in models:
+        if loaded and model != loaded:
+            swaps += 1
+        loaded = model
+    return swaps
+
+
+class ModelAffinityScheduler:
+    def __init__(self, manager):
+        self.manager = manager
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "calls": 0, "swaps_planned": 0, "swaps_avoided": 0}
+
+    def loaded_model(self) -> Optional[str]:
+        return self.manager.hosts.loaded_model()
+
+    def group_order(self, models: List[str]) -> List[str]:
+        """Distinct models in run order: the loaded model first, then by first submission"""
+        order = list(dict.fromkeys(models))
+        loaded = self.loaded_model()
+        if loaded in order:
+            order.remove(loaded)
+            order.insert(0, loaded)
+        return order
+
+    def run(self, calls: List[Tuple[str, Callable[[], Any]]], max_concurrency: Optional[int] = None) -> List[Any]:
+        """Run independent (model, fn) calls grouped by model; results come back in input order.
+
+        Calls for one model run concurrently up to the server's parallel slots
+        (or the model's auto-tuned parallelism).
+        As with LocalLLMClient.invoke_many, a failed call does not abort the
+        others: its slot holds the Exception instead of a result.
+        """
+        if not calls:
+            return []
+        models = [model for model, _ in calls]
+        order = self.group_order(models)
+        loaded = self.loaded_model()
+        planned = count_swaps(order, loaded)
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["calls"] += len(calls)
+            self._stats["swaps_planned"] += planned
+            self._stats["swaps_avoided"] += max(0, count_swaps(models, loaded) - planned)
+
+        results: List[Any] = [None] * len(calls)
+
+        def _run_one(index: int):
+            try:
+                results[index] = calls[index][1]()
+            except Exception as e:
+                log.error(f"Scheduled LLM call failed: {str(e)}")
+                results[index] = e
+
+        for model in order:
+            indices = [i for i, m in enumerate(models) if m == model]
+            parallel = self.manager.parallel_for(model)
+            limit = max(1, min(max_concurrency or parallel, parallel))
+            if limit <= 1 or len(indices) == 1:
+                for i in indices:
+                    _run_one(i)
+                continue
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(limit, len(indices))) as executor:
+                # Workers run in a copy of the caller's context so their calls reach the caller's ledger
+                futures = [executor.submit(contextvars.copy_context().run, _run_one, i) for i in indices]
+                concurrent.futures.wait(futures)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Swaps observed per host since start, plus batches run here and the swaps grouping avoided"""
+        hosts = {h["url"]: h["swaps"] for h in self.manager.host_utilization()}
+        with self._lock:
+            return {**self._stats, "swaps": sum(hosts.values()), "swaps_by_host": hosts}
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {"batches": 0, "calls": 0, "swaps_planned": 0, "swaps_avoided": 0}
@@ -0,0 +1,48 @@
+"""Response schemas for structured (JSON) LLM calls.
+
+Passed to LocalLLMClient.invoke_json, which sends the JSON schema as Ollama's
+`format` so the model can only produce matching output.
+"""
+
+from typing import List
+from pydantic import BaseModel, Field
+
+
+class ResearchQueries(BaseModel):
+    research_queries: List[str] = Field(default_factory=list)
+    competitor_queries: List[str] = Field(default_factory=list)
+
+
+class BlogSection(BaseModel):
+    id: str
+    title: str
+    description: str = ""
+
+
+class BlogStructure(BaseModel):
+    title: str = ""
+    sections: List[BlogSection] = Field(default_factory=list)
+
+
+class SeoKeywords(BaseModel):
+    primary_keywords: List[str] = Field(default_factory=list)
+    secondary_keywords: List[str] = Field(default_factory=list)
+
+
+class SnippetRanking(BaseModel):
+    indices: List[int] = Field(default_factory=list)
+
+
+class CriticFeedback(BaseModel):
+    score: int = 5
+    strengths: List[str] = Field(default_factory=list)
+    weaknesses: List[str] = Field(default_factory=list)
+    suggestions: List[str] = Field(default_factory=list)
+
+
+class PlagiarismAnalysis(BaseModel):
+    risk_score: int = 0
+    flagged_phrases: List[str] = Field(default_factory=list)
+    confidence: str = "low"
+    issues: List[str] = Field(default_factory=list)
+    suggestions: List[str] = Field(default_factory=list)
@@ -0,0 +1,275 @@
+"""Semantic (near-duplicate) tier behind the exact LLM response cache.
+
+Many prompts differ from an earlier one only in whitespace, a truncated tail or
+a rephrased query. On an exact-cache miss, the prompt is embedded with a small
+local model and compared with earlier prompts that share everything else
+(model, system prompt, generation parameters, output format); if the best
+cosine similarity reaches the task's threshold (LLMCacheConfig.SEMANTIC_THRESHOLDS)
+the stored answer is returned.
+
+The index lives next to the exact cache as two memory-mapped .npy files: a
+(capacity, dim) float32 matrix of L2-normalized prompt vectors and a per-slot
+record (scope digest, exact-cache key, task, last use). When it is full, the
+least recently used slot is overwritten. Answers themselves stay in the exact
+cache, so its TTL and size limit apply to semantic hits too.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from config import LLMCacheConfig, ModelConfig
+from .response_cache import LLMResponseCache
+
+log = logging.getLogger(__name__)
+
+_SLOT_DTYPE = np.dtype([("scope", "S64"), ("key", "S64"), ("task", "S24"), ("last_used", "f8")])
+
+
+class PromptEmbedder:
+    """Sentence-embedding model (MiniLM by default) run in-process on CPU.
+
+    Prompts longer than one window are embedded window by window and the
+    vectors averaged, so a change near the end of a long prompt still moves
+    the embedding.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, window: int = 256):
+        self.model_name = model_name or LLMCacheConfig.SEMANTIC_EMBED_MODEL
+        self.window = window
+        self._tokenizer = None
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                from transformers import AutoModel, AutoTokenizer  # heavy; only on first use
+
+                local_only = not ModelConfig.TOKENIZER_ALLOW_DOWNLOAD
+                self._tokenizer = AutoTokenizer.from_pretrained(self.model_name, local_files_only=local_only)
+                self._model = AutoModel.from_pretrained(self.model_name, local_files_only=local_only).eval()
+        return self._tokenizer, self._model
+
+    def __call__(self, text: str) -> np.ndarray:
+        import torch
+
+        tokenizer, model = self._load()
+        ids = tokenizer.encode(text, add_special_tokens=False) or [tokenizer.unk_token_id]
+        step = self.window - 2  # room for the special tokens
+        windows = [tokenizer.build_inputs_with_special_tokens(ids[i:i + step]) for i in range(0, len(ids), step)]
+        width = max(len(w) for w in windows)
+        input_ids = torch.tensor([w + [tokenizer.pad_token_id] * (width - len(w)) for w in windows])
+        mask = torch.tensor([[1] * len(w) + [0] * (width - len(w)) for w in windows])
+        with torch.inference_mode():
+            hidden = model(input_ids=input_ids, attention_mask=mask).last_hidden_state
+        # Mean pooling per window, then a length-weighted mean over windows
+        lengths = mask.sum(1, keepdim=True)
+        pooled = torch.nn.functional.normalize((hidden * mask.unsqueeze(-1)).sum(1) / lengths, dim=-1)
+        vector = ((pooled * lengths).sum(0) / lengths.sum()).numpy().astype(np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+
+class SemanticCache:
+    def __init__(self, exact: LLMResponseCache, directory: str = None, capacity: int = None,
+                 thresholds: Dict[str, float] = None, enabled: bool = None,
+                 embedder: Optional[Callable[[str], np.ndarray]] = None):
+        self.exact = exact
+        self.directory = directory or os.path.join(exact.directory, "semantic")
+        self.capacity = capacity or LLMCacheConfig.SEMANTIC_CAPACITY
+        self.thresholds = dict(LLMCacheConfig.SEMANTIC_THRESHOLDS if thresholds is None else thresholds)
+        self.enabled = LLMCacheConfig.SEMANTIC_ENABLED if enabled is None else enabled
+        self.embedder = embedder or PromptEmbedder()
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None  # memmap (capacity, dim)
+        self._slots: Optional[np.ndarray] = None  # memmap (capacity,) of _SLOT_DTYPE
+        self._by_scope: Dict[bytes, list] = {}
+        self._by_key: Dict[bytes, int] = {}
+        # Lookups that missed, by exact key, until the fresh answer is stored (see remember)
+        self._pending: "OrderedDict[str, tuple]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def active(self) -> bool:
+        return self.enabled and self.exact.enabled
+
+    def threshold(self, task: str) -> Optional[float]:
+        """Minimum cosine similarity for a semantic hit on this task (or role); None disables the tier"""
+        return self.thresholds.get(task)
+
+    # ===== Index =====
+    def _open(self, dim: int):
+        """Map the index files, recreating them if the embedding model, dimension or capacity changed"""
+        if self._vectors is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        meta_path = os.path.join(self.directory, "meta.json")
+        vectors_path = os.path.join(self.directory, "vectors.npy")
+        slots_path = os.path.join(self.directory, "slots.npy")
+        meta = {"embed_model": getattr(self.embedder, "model_name", "custom"), "dim": dim, "capacity": self.capacity}
+        try:
+            with open(meta_path) as f:
+                reuse = json.load(f) == meta
+            if reuse:
+                self._vectors = np.lib.format.open_memmap(vectors_path, mode="r+")
+                self._slots = np.lib.format.open_memmap(slots_path, mode="r+")
+        except Exception:
+            self._vectors = None
+        if self._vectors is None:
+            log.info(f"Creating semantic cache index in {self.directory} ({self.capacity} x {dim})")
+            self._vectors = np.lib.format.open_memmap(vectors_path, mode="w+", dtype=np.float32,
+                                                      shape=(self.capacity, dim))
+            self._slots = np.lib.format.open_memmap(slots_path, mode="w+", dtype=_SLOT_DTYPE,
+                                                    shape=(self.capacity,))
+            with open(meta_path, "w") as f:
+                json.dump(meta, f)
+        for slot in np.flatnonzero(self._slots["last_used"] > 0):
+            self._index(int(slot))
+
+    def _index(self, slot: int):
+        record = self._slots[slot]
+        self._by_scope.setdefault(bytes(record["scope"]), []).append(slot)
+        self._by_key[bytes(record["key"])] = slot
+
+    def _drop(self, slot: int):
+        record = self._slots[slot]
+        rows = self._by_scope.get(bytes(record["scope"]), [])
+        if slot in rows:
+            rows.remove(slot)
+        self._by_key.pop(bytes(record["key"]), None)
+        self._slots[slot] = (b"", b"", b"", 0.0)
+
+    def _free_slot(self) -> int:
+        """An empty slot, or the least recently used one (evicted)"""
+        last_used = self._slots["last_used"]
+        if len(self._by_key) < self.capacity:
+            return int(np.flatnonzero(last_used == 0)[0])
+        slot = int(np.argmin(last_used))
+        self._drop(slot)
+        return slot
+
+    # ===== Lookup / store =====
+    def _embed(self, prompt: str) -> Optional[np.ndarray]:
+        try:
+            # Whitespace-only differences shouldn't cost similarity
+            return self.embedder(" ".join(prompt.split()))
+        except Exception as e:
+            log.warning(f"Semantic cache embedding unavailable, disabling: {e}")
+            self.enabled = False
+            return None
+
+    def lookup(self, key: str, scope: str, task: str, prompt: str) -> Tuple[Optional[Dict[str, Any]], Optional[float]]:
+        """(stored answer or None, best similarity among prompts in the same scope or None).
+
+        key is the exact-cache key of this request and scope the digest of
+        everything but the prompt; on a miss, remember(key) indexes the answer.
+        """
+        threshold = self.threshold(task)
+        if not self.active or threshold is None:
+            return None, None
+        vector = self._embed(prompt)
+        if vector is None:
+            return None, None
+
+        best, best_key = None, None
+        with self._lock:
+            self._open(len(vector))
+            rows = self._by_scope.get(scope.encode(), [])
+            if rows:
+                similarities = self._vectors[rows] @ vector
+                i = int(np.argmax(similarities))
+                best, best_key = float(similarities[i]), bytes(self._slots[rows[i]]["key"])
+
+        hit = None
+        if best is not None and best >= threshold:
+            hit = self.exact.peek(best_key.decode())
+            with self._lock:
+                slot = self._by_key.get(best_key)
+                if slot is not None:
+                    if hit is None:
+                        self._drop(slot)  # the answer expired from the exact cache
+                    else:
+                        self._slots["last_used"][slot] = time.time()
+        if hit is None:
+            with self._lock:
+                self._pending[key] = (scope, task, vector, best)
+                while len(self._pending) > 256:
+                    self._pending.popitem(last=False)
+        self._count(task, best, hit is not None)
+        return hit, best
+
+    def remember(self, key: str, store: bool = True) -> Optional[float]:
+        """Index the prompt of a missed lookup now that its answer is in the exact cache.
+
+        Returns the best similarity that lookup saw, 0.0 if nothing in its scope
+        was indexed yet (for reporting near misses); None if no lookup ran.
+        Pass store=False when nothing was cached (e.g. an empty answer).
+        """
+        with self._lock:
+            pending = self._pending.pop(key, None)
+            if pending is None:
+                return None
+            scope, task, vector, best = pending
+            if store and self._vectors is not None:
+                slot = self._by_key.get(key.encode())
+                if slot is None:
+                    slot = self._free_slot()
+                    self._slots[slot] = (scope.encode(), key.encode(), task.encode()[:24], time.time())
+                    self._index(slot)
+                self._vectors[slot] = vector
+                self._slots["last_used"][slot] = time.time()
+        return best if best is not None else 0.0
+
+    # ===== Reporting =====
+    def _count(self, task: str, similarity: Optional[float], hit: bool):
+        with self._lock:
+            stats = self._stats.setdefault(task, {"lookups": 0, "hits": 0, "hit_similarity": 0.0,
+                                                  "best_miss_similarity": 0.0})
+            stats["lookups"] += 1
+            if hit:
+                stats["hits"] += 1
+                stats["hit_similarity"] += similarity
+            elif similarity is not None:
+                stats["best_miss_similarity"] = max(stats["best_miss_similarity"], similarity)
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals over all tasks: lookups, hits, hit rate and the number of indexed prompts"""
+        with self._lock:
+            lookups = sum(s["lookups"] for s in self._stats.values())
+            hits = sum(s["hits"] for s in self._stats.values())
+            return {
+                "semantic_lookups": lookups,
+                "semantic_hits": hits,
+                "semantic_hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "semantic_entries": len(self._by_key),
+            }
+
+    def stats_by_task(self) -> Dict[str, Dict[str, float]]:
+        """Per task: lookups, hits, hit rate, mean similarity of hits and the closest miss (for tuning thresholds)"""
+        with self._lock:
+            return {
+                task: {
+                    "threshold": self.thresholds.get(task),
+                    "lookups": s["lookups"],
+                    "hits": s["hits"],
+                    "hit_rate": round(s["hits"] / s["lookups"], 4) if s["lookups"] else 0.0,
+                    "mean_hit_similarity": round(s["hit_similarity"] / s["hits"], 4) if s["hits"] else None,
+                    "best_miss_similarity": round(s["best_miss_similarity"], 4),
+                }
+                for task, s in self._stats.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            if self._slots is not None:
+                self._slots[:] = np.zeros(len(self._slots), dtype=_SLOT_DTYPE)
+            self._by_scope.clear()
+            self._by_key.clear()
+            self._pending.clear()
+            self._stats.clear()
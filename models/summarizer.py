@@ -1,110 +1,189 @@
 import os
 import logging
-from typing import Optional
-from transformers import pipeline
+import threading
+from typing import List, Optional, Tuple
 from .llm_manager import local_llm_manager
+from .summary_cache import SummaryCache
 from config import SummarizationConfig
+from utils.chunking import content_defined_chunks
+from utils.extractive import extractive_summary
+from utils.telemetry import record_event
+from utils.token_budget import truncate_to_tokens
 
 # Logger for the module
 log = logging.getLogger(__name__)
 
-# Simple in-module cache to avoid import errors if external caching is not available
-_SUMMARY_CACHE = {}
+# Shared by every session and persisted across runs (see models/summary_cache.py)
+summary_cache = SummaryCache()
 
-def get_cached_summary(content: str, query: str):
-    key = (hash(content), query)
-    return _SUMMARY_CACHE.get(key)
 
-def set_cached_summary(content: str, query: str, summary: str):
-    key = (hash(content), query)
-    _SUMMARY_CACHE[key] = summary
+def get_cached_summary(content: str, query: str, model: str = ""):
+    return summary_cache.get(SummaryCache.make_key(content, query, model))
+
+
+def set_cached_summary(content: str, query: str, summary: str, model: str = ""):
+    summary_cache.set(SummaryCache.make_key(content, query, model), summary)
 
 
 class HybridSummarizer:
     def __init__(self):
         self.hf_model = None
-        self.local_llm = local_llm_manager.get_researcher()
+        self.local_llm = local_llm_manager.get_for_task("summarize")
         self.fast_local_llm = local_llm_manager.get_writer()
         # Load thresholds from config
         self.fast_threshold = getattr(SummarizationConfig, 'FAST_THRESHOLD', 800)
         self.llm_threshold = getattr(SummarizationConfig, 'LLM_THRESHOLD', 1500)
+        self.chunk_size = SummarizationConfig.CHUNK_SIZE
+        self.map_concurrency = SummarizationConfig.MAP_CONCURRENCY
+        self.target_length = SummarizationConfig.TARGET_LENGTH
+        self.max_reduce_depth = SummarizationConfig.MAX_REDUCE_DEPTH
+        self.hf_batch_size = SummarizationConfig.HF_BATCH_SIZE
+        self.max_content_length = SummarizationConfig.MAX_CONTENT_LENGTH
+        self.extractive_length = SummarizationConfig.EXTRACTIVE_LENGTH
+        self._chunk_lock = threading.Lock()
+        self._chunk_stats = {"calls": 0, "chunks": 0, "reused": 0, "last_reuse_rate": 0.0}
 
     def _initialize_hf_model(self):
         """Lazy load HF model to avoid slow startup"""
         if self.hf_model is None:
             try:
+                # Imported here: transformers (and torch) add seconds to app startup
+                from transformers import pipeline
+
                 self.hf_model = pipeline(
                     "summarization",
-                    model="facebook/bart-large-cnn",  # Fixed model name
+                    model=SummarizationConfig.HF_MODEL,
                     device=-1  # Use CPU (better for Apple Silicon compatibility)
                 )
             except Exception as e:
                 print(f"Warning: Could not load HF summarization model: {e}")
                 self.hf_model = None
+                return
+
+            if SummarizationConfig.HF_QUANTIZE:
+                try:
+                    import torch
+
+                    self.hf_model.model = torch.ao.quantization.quantize_dynamic(
+                        self.hf_model.model, {torch.nn.Linear}, dtype=torch.qint8
+                    )
+                except Exception as e:
+                    log.warning(f"Dynamic quantization failed, keeping the float model: {e}")
 
     def summarize(self, content: str, query: str, state: dict) -> str:
         """Smart summarization using local resources"""
-        # Check cache first
-        cached = get_cached_summary(content, query)
+        # Check cache first (keyed on the summarizing model too: a new model means new summaries)
+        cached = get_cached_summary(content, query, self.local_llm.model)
         if cached:
             return cached
 
         # Choose summarization method based on content length and available resources
         # Fixed logic: use fast model for very short text, LLM for medium, chunking for long
         if len(content) < self.fast_threshold:
-            summary = self._fast_summarize(content, query)
+            summary, from_model = self._fast_summarize(content, query)
         elif len(content) < self.llm_threshold:
-            summary = self._local_llm_summarize(content, query, state)
+            summary, from_model = self._local_llm_summarize(content, query, state)
         else:
             # For very long content, use chunking strategy
-            summary = self._chunked_summarize(content, query, state)
+            summary, from_model = self._chunked_summarize(content, query, state)
 
-        # Cache result
-        set_cached_summary(content, query, summary)
+        # Cache result, unless it is an extractive fallback (the next call should try the model again)
+        if from_model:
+            set_cached_summary(content, query, summary, self.local_llm.model)
         return summary
 
-    def _fast_summarize(self, content: str, query: str) -> str:
+    def summarize_many(self, contents: list, query: str, state: dict) -> list:
+        """Summarize several texts in one pass, returning summaries in input order.
+
+        Each text takes the same route summarize() would give it, but the routes
+        are batched: short texts share HF pipeline batches, medium ones run as
+        concurrent LLM calls, and long ones go through the chunked map-reduce.
+        """
+        model = self.local_llm.model
+        summaries = [get_cached_summary(content, query, model) for content in contents]
+        fast, medium, long = [], [], []
+        for i, content in enumerate(contents):
+            if summaries[i]:
+                continue
+            if len(content) < self.fast_threshold:
+                fast.append(i)
+            elif len(content) < self.llm_threshold:
+                medium.append(i)
+            else:
+                long.append(i)
+
+        cacheable = []
+        fast_summaries, from_model = self._fast_summarize_many([contents[i] for i in fast], query)
+        for i, summary in zip(fast, fast_summaries):
+            summaries[i] = summary
+        if from_model:
+            cacheable += fast
+        if medium:
+            results = self.local_llm.invoke_many(
+                [self._summary_messages(contents[i], query) for i in medium],
+                max_concurrency=self.map_concurrency,
+            )
+            for i, result in zip(medium, results):
+                if isinstance(result, Exception) or not result.content.strip():
+                    summaries[i] = self._extractive_summarize(contents[i], query)
+                else:
+                    summaries[i] = result.content.strip()
+                    cacheable.append(i)
+        for i in long:
+            summaries[i], from_model = self._chunked_summarize(contents[i], query, state)
+            if from_model:
+                cacheable.append(i)
+
+        for i in cacheable:
+            set_cached_summary(contents[i], query, summaries[i], model)
+        return summaries
+
+    def _fast_summarize(self, content: str, query: str) -> Tuple[str, bool]:
         """Fast summarization for short content using HF or simple extraction"""
+        summaries, from_model = self._fast_summarize_many([content], query)
+        return summaries[0], from_model
+
+    def _fast_summarize_many(self, contents: list, query: str) -> Tuple[List[str], bool]:
+        """Batched HF summarization, falling back to simple extraction.
+
+        Inputs are sorted by length before batching so each padded batch holds
+        texts of similar length, then the outputs are put back in input order.
+        Returns (summaries, from_model); from_model is False for the fallback.
+        """
+        if not contents:
+            return [], True
         try:
-            # Try HF model first
-            self._initialize_hf_model()  # FIXED: self_initialize -> self._initialize
+            self._initialize_hf_model()
             if self.hf_model is not None:
-                summary = self.hf_model(
-                    f"Relevant to '{query}': {content[:1024]}",
+                order = sorted(range(len(contents)), key=lambda i: len(contents[i]), reverse=True)
+                outputs = self.hf_model(
+                    [f"Relevant to '{query}': {contents[i][:1024]}" for i in order],
+                    batch_size=self.hf_batch_size,
+                    truncation=True,
                     max_length=150,
                     min_length=50,
                     do_sample=False
-                )[0]['summary_text']
-                return summary
+                )
+                summaries = [None] * len(contents)
+                for i, output in zip(order, outputs):
+                    summaries[i] = output['summary_text']
+                return summaries, True
         except Exception as e:
-            print(f"HF summarization failed: {e}")  # FIXED: printf -> print
+            print(f"HF summarization failed: {e}")
 
         # Fallback: simple extraction-based summarization
-        return self._extractive_summarize(content, query)
+        return [self._extractive_summarize(content, query) for content in contents], False
 
     def _extractive_summarize(self, content: str, query: str) -> str:
-        """Simple extractive summarization as fallback"""
-        sentences = content.split('. ')
-        if len(sentences) <= 3:
-            return content[:500] + "..."
-
-        # Simple heuristic: take first, middle, and last sentences
-        important_sentences = [
-            sentences[0],
-            sentences[len(sentences) // 2],
-            sentences[-1]
-        ]
+        """Model-free fallback: central, query-relevant sentences (see utils/extractive.py)"""
+        return extractive_summary(content[:self.max_content_length], query, max_chars=self.extractive_length)
 
-        summary = '. '.join(important_sentences) + '.'
-        return summary[:500] + "..." if len(summary) > 500 else summary
-
-    def _local_llm_summarize(self, content: str, query: str, state: dict) -> str:
-        """High-quality summarization using local LLM"""
+    def _summary_messages(self, content: str, query: str) -> list:
         prompt = f"""
         Create a concise technical summary relevant to '{query}':
 
         CONTENT:
-        {content[:6000]}
+        {truncate_to_tokens(content, 1500, self.local_llm.model)}
 
         Instructions:
         - Focus on key technical concepts and findings
@@ -113,122 +192,199 @@ class HybridSummarizer:
         - Extract the most relevant information for technical blog research
         - Use clear, concise language
         """
+        return [
+            ("system",
+             "You are a technical research assistant. Create accurate, concise summaries focusing on key technical insights."),
+            ("human", prompt)
+        ]
 
-        try:
-            response = self.local_llm.invoke([
-                ("system",
-                 "You are a technical research assistant. Create accurate, concise summaries focusing on key technical insights."),
-                ("human", prompt)
-            ])
-
-            # Token usage is now handled by the LLM manager
-            # The response should already contain token usage information
-            return response.content.strip()
-
-        except Exception as e:
-            print(f"Local LLM summarization failed: {e}")
-            return self._extractive_summarize(content, query)
-
-    def _chunked_summarize(self, content: str, query: str, state: dict) -> str:
-        """Handle very long content by summarizing in chunks"""
-        chunk_size = 4000
-        chunks = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
-
-        if len(chunks) == 1:
-            return self._local_llm_summarize(content, query, state)
-
-        # Summarize each chunk
-        chunk_summaries = []
-        for i, chunk in enumerate(chunks[:3]):  # Limit to first 3 chunks to avoid excessive processing
-            chunk_summary = self._fast_summarize(chunk, query)
-            chunk_summaries.append(f"Part {i + 1}: {chunk_summary}")
-
-        # Combine chunk summaries
-        combined_summaries = "\n\n".join(chunk_summaries)
-
-        # Create final summary from chunk summaries
-        final_prompt = f"""
+    def _combine_messages(self, summaries: list, query: str) -> list:
+        combined_summaries = "\n\n".join(f"Part {i + 1}: {summary}" for i, summary in enumerate(summaries))
+        prompt = f"""
         Combine these partial summaries into one coherent technical summary relevant to '{query}':
 
         PARTIAL SUMMARIES:
         {combined_summaries}
 
         Create a unified summary that captures the main technical points.
+        Keep it under {self.target_length} characters.
         """
+        return [
+            ("system", "You are a technical editor. Combine partial summaries into a coherent whole."),
+            ("human", prompt)
+        ]
 
+    def _local_llm_summarize(self, content: str, query: str, state: dict) -> Tuple[str, bool]:
+        """High-quality summarization using local LLM; (summary, from_model) like _fast_summarize"""
         try:
-            response = self.local_llm.invoke([
-                ("system", "You are a technical editor. Combine partial summaries into a coherent whole."),
-                ("human", final_prompt)
-            ])
+            response = self.local_llm.invoke(self._summary_messages(content, query))
 
             # Token usage is now handled by the LLM manager
             # The response should already contain token usage information
-            return response.content.strip()
+            return response.content.strip(), True
 
         except Exception as e:
-            print(f"Chunked summarization failed: {e}")
-            return combined_summaries[:1000] + "..."
+            print(f"Local LLM summarization failed: {e}")
+            return self._extractive_summarize(content, query), False
+
+    def _chunked_summarize(self, content: str, query: str, state: dict) -> str:
+        """Map-reduce over the whole document.
+
+        Chunks are content-defined (see utils/chunking.py) and each one's summary
+        is cached on its own, so after an edit only the changed chunks are
+        summarized again, all of them concurrently. The partial summaries are
+        then combined in a tree, each level's groups in parallel, until a single
+        summary fits the target length. Returns (summary, from_model), where
+        from_model is False when any chunk or combine step fell back to extraction.
+        """
+        chunks = content_defined_chunks(content, self.chunk_size)
+        if len(chunks) == 1:
+            return self._local_llm_summarize(content, query, state)
+
+        summaries, mapped = self._map_chunks(chunks, query)
+        summary, reduced = self._reduce_summaries(summaries, query)
+        return summary, mapped and reduced
+
+    def _map_chunks(self, chunks: list, query: str) -> Tuple[List[str], bool]:
+        # Chunk summaries are keyed apart from whole-text summaries, which take other routes for short text
+        chunk_model = f"{self.local_llm.model}:chunk"
+        summaries = [get_cached_summary(chunk, query, chunk_model) for chunk in chunks]
+        missing = [i for i, summary in enumerate(summaries) if not summary]
+        self._record_chunk_reuse(len(chunks), len(chunks) - len(missing))
+        if not missing:
+            return summaries, True
+
+        results = self.local_llm.invoke_many(
+            [self._summary_messages(chunks[i], query) for i in missing],
+            max_concurrency=self.map_concurrency,
+        )
+        from_model = True
+        for i, result in zip(missing, results):
+            if isinstance(result, Exception) or not result.content.strip():
+                # One failed chunk shouldn't drop its part of the document (nor be cached)
+                summaries[i] = self._extractive_summarize(chunks[i], query)
+                from_model = False
+            else:
+                summaries[i] = result.content.strip()
+                set_cached_summary(chunks[i], query, summaries[i], chunk_model)
+        return summaries, from_model
+
+    def _record_chunk_reuse(self, chunks: int, reused: int):
+        with self._chunk_lock:
+            self._chunk_stats["calls"] += 1
+            self._chunk_stats["chunks"] += chunks
+            self._chunk_stats["reused"] += reused
+            self._chunk_stats["last_reuse_rate"] = round(reused / chunks, 4)
+        record_event("summary_chunks", chunks=chunks, reused=reused, reuse_rate=round(reused / chunks, 4))
+        log.info(f"Chunked summary: reused {reused}/{chunks} chunk summaries")
+
+    def chunk_reuse_stats(self) -> dict:
+        """Chunked summaries since start: calls, chunks, chunks whose cached summary was reused, and rates"""
+        with self._chunk_lock:
+            stats = dict(self._chunk_stats)
+        stats["reuse_rate"] = round(stats["reused"] / stats["chunks"], 4) if stats["chunks"] else 0.0
+        return stats
+
+    def _group_summaries(self, summaries: list) -> list:
+        """Consecutive runs of summaries that fit one combine prompt (CHUNK_SIZE chars)"""
+        groups, current, size = [], [], 0
+        for summary in summaries:
+            if current and size + len(summary) > self.chunk_size:
+                groups.append(current)
+                current, size = [], 0
+            current.append(summary)
+            size += len(summary)
+        if current:
+            groups.append(current)
+        return groups
+
+    def _reduce_summaries(self, summaries: list, query: str) -> Tuple[str, bool]:
+        depth, from_model = 0, True
+        while len(summaries) > 1 or len(summaries[0]) > self.target_length:
+            if depth >= self.max_reduce_depth:
+                log.warning(f"Summary reduce stopped at depth {depth} with {len(summaries)} parts")
+                break
+            groups = self._group_summaries(summaries)
+            # A lone summary that already fits is carried up to the next level unchanged
+            pending = [i for i, group in enumerate(groups)
+                       if len(group) > 1 or len(group[0]) > self.target_length]
+            results = self.local_llm.invoke_many(
+                [self._combine_messages(groups[i], query) for i in pending],
+                max_concurrency=self.map_concurrency,
+            )
+            reduced = [group[0] for group in groups]
+            for i, result in zip(pending, results):
+                if isinstance(result, Exception) or not result.content.strip():
+                    reduced[i] = self._extractive_summarize(" ".join(groups[i]), query)
+                    from_model = False
+                else:
+                    reduced[i] = result.content.strip()
+            summaries = reduced
+            depth += 1
+
+        return "\n\n".join(summaries), from_model
 
 
 # The _track_token_usage method is no longer needed as token tracking is handled by the LLM manager
 # This method can be removed in a future refactoring
 
+    # Per source: fields holding the text, field the summary goes to, length below which the text is kept as is
+    _RESULT_FIELDS = {
+        "web": (("content", "snippet"), "content_summary", 300),
+        "documents": (("text", "content"), "text_summary", 400),
+    }
+
     def summarize_research_results(self, research_context: dict, query: str, state: dict) -> dict:
-        """Summarize entire research context for drafting"""
+        """Summarize entire research context for drafting (web and document results in one batch)"""
         summarized_research = {}
+        batched = {}
 
         for source, results in research_context.items():
             if not results:
                 continue
 
-            if source == "arxiv":
-                # Arxiv papers already have summaries
-                summarized_research[source] = results
-            elif source == "web":
-                summarized_research[source] = self._summarize_web_results(results, query, state)
-            elif source == "documents":
-                summarized_research[source] = self._summarize_document_results(results, query, state)
+            if source in self._RESULT_FIELDS:
+                batched[source] = results
             else:
+                # Arxiv papers already have summaries
                 summarized_research[source] = results
 
+        summarized_research.update(self._summarize_results(batched, query, state))
         return summarized_research
 
+    def _summarize_results(self, batched: dict, query: str, state: dict) -> dict:
+        """Summarize the top 5 results of each source through a single summarize_many call"""
+        contents = {}
+        for source, results in batched.items():
+            text_fields = self._RESULT_FIELDS[source][0]
+            contents[source] = [next((r.get(f) for f in text_fields if r.get(f)), '') for r in results[:5]]
+
+        pending = [(source, i) for source, texts in contents.items()
+                   for i, text in enumerate(texts) if len(text) > self._RESULT_FIELDS[source][2]]
+        summaries = dict(zip(pending, self.summarize_many([contents[s][i] for s, i in pending], query, state)))
+
+        summarized = {}
+        for source, texts in contents.items():
+            summary_field = self._RESULT_FIELDS[source][1]
+            summarized[source] = []
+            for i, (result, content) in enumerate(zip(batched[source], texts)):
+                if (source, i) in summaries:
+                    summarized[source].append({
+                        **result,
+                        summary_field: summaries[(source, i)],
+                        'original_length': len(content)
+                    })
+                else:
+                    summarized[source].append({**result, summary_field: content})
+        return summarized
+
     def _summarize_web_results(self, web_results: list, query: str, state: dict) -> list:
         """Summarize web search results"""
-        summarized = []
-
-        for result in web_results[:5]:  # Limit to top 5
-            content = result.get('content', '') or result.get('snippet', '')
-            if len(content) > 300:
-                summary = self.summarize(content, query, state)
-                summarized.append({
-                    **result,
-                    'content_summary': summary,
-                    'original_length': len(content)
-                })
-            else:
-                summarized.append({**result, 'content_summary': content})
-
-        return summarized
+        return self._summarize_results({"web": web_results}, query, state)["web"]
 
     def _summarize_document_results(self, doc_results: list, query: str, state: dict) -> list:
         """Summarize document search results"""
-        summarized = []
-
-        for doc in doc_results[:5]:  # Limit to top 5
-            content = doc.get('text', '') or doc.get('content', '')
-            if len(content) > 400:
-                summary = self.summarize(content, query, state)
-                summarized.append({
-                    **doc,
-                    'text_summary': summary,
-                    'original_length': len(content)
-                })
-            else:
-                summarized.append({**doc, 'text_summary': content})
-
-        return summarized
+        return self._summarize_results({"documents": doc_results}, query, state)["documents"]
 
 
 # Global instance
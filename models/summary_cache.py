@@ -0,0 +1,154 @@
+"""Two-tier cache for HybridSummarizer results.
+
+Keys are a SHA-256 digest of the content, the query and the summarizing
+model, so they are stable across processes (unlike hash(), which is salted
+per process) and don't collide in practice. Lookups go to a sharded in-memory
+LRU first (one lock per shard, so research worker threads rarely contend),
+then to a diskcache directory shared by every run and session. A disk hit is
+promoted into memory.
+
+Both tiers are bounded (entry count in memory, megabytes on disk) and expire
+entries after SummarizationConfig.CACHE_TTL_SECONDS.
+"""
+
+import collections
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from config import SummarizationConfig
+
+log = logging.getLogger(__name__)
+
+
+class _Shard:
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.entries: "collections.OrderedDict[str, tuple]" = collections.OrderedDict()  # key -> (summary, expires_at)
+        self.lock = threading.Lock()
+
+
+class SummaryCache:
+    def __init__(self, directory: str = None, max_entries: int = None, size_limit_mb: int = None,
+                 ttl_seconds: int = None, shards: int = None, persist: bool = None):
+        self.directory = directory or SummarizationConfig.CACHE_DIR
+        max_entries = max_entries or SummarizationConfig.CACHE_MAX_ENTRIES
+        self.size_limit_mb = size_limit_mb or SummarizationConfig.CACHE_SIZE_MB
+        self.ttl_seconds = SummarizationConfig.CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.persist = SummarizationConfig.CACHE_PERSIST if persist is None else persist
+        count = max(1, shards or SummarizationConfig.CACHE_SHARDS)
+        self._shards = [_Shard(-(-max_entries // count)) for _ in range(count)]
+        self._disk = None
+        self._disk_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    @staticmethod
+    def make_key(content: str, query: str, model: str = "") -> str:
+        material = json.dumps({"content": content, "query": query, "model": model}, ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[int(key[:8], 16) % len(self._shards)]
+
+    def _count(self, name: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def _open_disk(self):
+        if self._disk is None and self.persist:
+            with self._disk_lock:
+                if self._disk is None and self.persist:
+                    try:
+                        import diskcache  # type: ignore
+                        self._disk = diskcache.Cache(
+                            self.directory,
+                            size_limit=self.size_limit_mb * 1024 * 1024,
+                            eviction_policy="least-recently-used",
+                        )
+                    except Exception as e:
+                        log.warning(f"Summary disk cache unavailable, using memory only: {e}")
+                        self.persist = False
+        return self._disk
+
+    # ===== Memory tier =====
+    def _memory_get(self, key: str) -> Optional[str]:
+        shard = self._shard(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is None:
+                return None
+            summary, expires_at = entry
+            if not expires_at or expires_at >= time.time():
+                shard.entries.move_to_end(key)
+                return summary
+            del shard.entries[key]
+        self._count("expirations")
+        return None
+
+    def _memory_set(self, key: str, summary: str, expires_at: float):
+        shard = self._shard(key)
+        evicted = 0
+        with shard.lock:
+            shard.entries[key] = (summary, expires_at)
+            shard.entries.move_to_end(key)
+            while len(shard.entries) > shard.capacity:
+                shard.entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self._count("evictions", evicted)
+
+    # ===== Public API =====
+    def get(self, key: str) -> Optional[str]:
+        summary = self._memory_get(key)
+        if summary is not None:
+            self._count("memory_hits")
+            return summary
+        disk = self._open_disk()
+        if disk is not None:
+            try:
+                summary, expires_at = disk.get(key, expire_time=True)
+            except Exception as e:
+                log.warning(f"Summary cache read failed: {e}")
+                summary, expires_at = None, None
+            if summary is not None:
+                self._memory_set(key, summary, expires_at or 0.0)
+                self._count("disk_hits")
+                return summary
+        self._count("misses")
+        return None
+
+    def set(self, key: str, summary: str):
+        if not summary:
+            return
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else 0.0
+        self._memory_set(key, summary, expires_at)
+        disk = self._open_disk()
+        if disk is not None:
+            try:
+                disk.set(key, summary, expire=self.ttl_seconds or None)
+            except Exception as e:
+                log.warning(f"Summary cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and in-memory LRU evictions/expirations since start, plus current sizes"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        stats["memory_entries"] = sum(len(s.entries) for s in self._shards)
+        disk = self._disk
+        stats["disk_mb"] = round(disk.volume() / (1024 * 1024), 2) if disk is not None else 0.0
+        return stats
+
+    def clear(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+        if self._open_disk() is not None:
+            self._disk.clear()
+        with self._stats_lock:
+            self._stats = {k: 0 for k in self._stats}
@@ -3,9 +3,11 @@ from utils.formatting import format_research_for_drafting
 from utils.token_tracking import track_token_usage
 from models.llm_manager import local_llm_manager
 from models.summarizer import summarizer
+from utils.token_budget import pack_sections, truncate_to_tokens
+from models.schemas import BlogStructure, CriticFeedback, SnippetRanking
+from config import ModelConfig
 from typing import Dict, List
-import json
-import re
+import functools
 
 
 def blog_structuring_node(state: EnhancedBlogState) -> EnhancedBlogState:
@@ -43,7 +45,7 @@ def blog_structuring_node(state: EnhancedBlogState) -> EnhancedBlogState:
     Create a cohesive blog structure that tells a complete story for {audience.lower()}.
 
     CONTENT SUMMARY:
-    {state.content_summary[:2000]}
+    {truncate_to_tokens(state.content_summary, 500, writer_llm.model)}
 
     RESEARCH INSIGHTS:
     {research_insights}{questions_context}
@@ -70,34 +72,14 @@ def blog_structuring_node(state: EnhancedBlogState) -> EnhancedBlogState:
     """
 
     try:
-        response = writer_llm.invoke([
+        response = writer_llm.invoke_json([
             ("system",
              "You are a technical content strategist. Return ONLY a JSON object with key 'sections'. No prose, no code fences."),
             ("human", prompt)
-        ])
+        ], schema=BlogStructure)
 
         updated_state = track_token_usage(state, response)
-        raw = response.content or ""
-        try:
-            structure = json.loads(raw)
-        except Exception:
-            # Try to extract JSON block from free-form text
-            json_block = None
-            if "```" in raw:
-                # Prefer fenced code blocks first
-                parts = re.findall(r"```(?:json)?\s*(\{[\s\S]*?\})\s*```", raw)
-                if parts:
-                    json_block = parts[0]
-            if not json_block:
-                # Fallback: take substring between first '{' and last '}'
-                start = raw.find('{')
-                end = raw.rfind('}')
-                if start != -1 and end != -1 and end > start:
-                    json_block = raw[start:end+1]
-            if json_block:
-                structure = json.loads(json_block)
-            else:
-                raise
+        structure = response.parsed
 
         sections = structure.get("sections", [])
         blog_title = structure.get("title", "")
@@ -133,16 +115,134 @@ def section_drafting_node(state: EnhancedBlogState) -> EnhancedBlogState:
         return state.update(next_action="completion")
 
     section = state.current_section
-    writer_llm = local_llm_manager.get_writer()
-    researcher_llm = local_llm_manager.get_researcher()
+    writer_llm = local_llm_manager.get_for_task("draft")
+    critic_llm = local_llm_manager.get_for_task("critique")
+    ranker_llm = local_llm_manager.get_for_task("classify")
+    if use_model_affinity(writer_llm, critic_llm):
+        # Already drafted by the batched pass of an earlier section
+        if section.get("id") in state.section_drafts:
+            return state.update(next_action="plagiarism_check")
+        return draft_remaining_sections(state, writer_llm, critic_llm, ranker_llm)
 
     # Create optimized prompt with research context
     research_context = state.research_context or {}
     
     # Select best 1-2 research snippets for intentional integration
-    selected_research = select_best_research_snippets(research_context, section, researcher_llm)
+    selected_research = select_best_research_snippets(research_context, section, ranker_llm)
     formatted_research = format_research_with_integration_instructions(selected_research, section)
 
+    # Draft, critique and refinement run as one session (the critique on its own when
+    # it uses another model): the section brief leads every request, so Ollama only
+    # evaluates each step's new instructions
+    session = start_section_session(section, formatted_research, writer_llm, state)
+
+    # Generate initial draft
+    response = session.invoke(build_draft_prompt(section, state), step="draft")
+
+    updated_state = track_token_usage(state, response)
+    initial_draft = (response.content or "").strip() or _empty_draft(section)
+
+    # Iterative Self-Correction Loop (Critic Node)
+    refined_draft = apply_self_correction_loop(initial_draft, section, formatted_research, writer_llm, critic_llm, updated_state, session=session)
+
+    # Update section drafts
+    section_id = section["id"]
+    updated_drafts = state.section_drafts.copy()
+    updated_drafts[section_id] = refined_draft
+
+    return updated_state.update(
+        section_drafts=updated_drafts,
+        next_action="plagiarism_check"
+    )
+
+
+def use_model_affinity(writer_llm, critic_llm) -> bool:
+    """Whether to draft sections phase by phase (opt-in, see ModelConfig.MODEL_AFFINITY)"""
+    mode = ModelConfig.MODEL_AFFINITY
+    if mode == "auto":
+        return writer_llm.model != critic_llm.model
+    return mode in ("on", "true", "1", "yes")
+
+
+def draft_remaining_sections(state: EnhancedBlogState, writer_llm, critic_llm, ranker_llm) -> EnhancedBlogState:
+    """Draft the current and all later sections in model-homogeneous phases.
+
+    Snippet rankings, drafts, critiques and refinements each run as one group
+    through the model-affinity scheduler, so a post costs a few model swaps
+    instead of several per section. The price is that later sections see the
+    earlier sections' first drafts, not the refined ones, in their narrative
+    context, which is why this mode is opt-in.
+    """
+    sections = state.sections or []
+    current_idx = next((i for i, s in enumerate(sections) if s.get("id") == state.current_section.get("id")), 0)
+    pending = [s for s in sections[current_idx:] if s.get("id") not in state.section_drafts] or [state.current_section]
+    scheduler = local_llm_manager.scheduler
+    research_context = state.research_context or {}
+
+    # Rankings (classify model)
+    selections = scheduler.run([
+        (ranker_llm.model, functools.partial(select_best_research_snippets, research_context, section, ranker_llm))
+        for section in pending
+    ])
+    research = [
+        format_research_with_integration_instructions([] if isinstance(selected, Exception) else selected, section)
+        for section, selected in zip(pending, selections)
+    ]
+
+    # Drafts (writer), in order: each section's narrative context includes the drafts before it
+    updated_state = state
+    drafts = dict(state.section_drafts)
+    sessions = []
+    for section, formatted_research in zip(pending, research):
+        session = start_section_session(section, formatted_research, writer_llm, state)
+        prompt = build_draft_prompt(section, state.update(section_drafts=drafts), narrative_llm=writer_llm)
+        try:
+            response = session.invoke(prompt, step="draft")
+            updated_state = track_token_usage(updated_state, response)
+            drafts[section["id"]] = (response.content or "").strip() or _empty_draft(section)
+        except Exception as e:
+            print(f"Section drafting failed: {e}")
+            drafts[section["id"]] = _empty_draft(section)
+            session.add_turn("Write this section.", drafts[section["id"]])
+        sessions.append(session)
+
+    # Critiques (critique model)
+    seo_feedback = [keyword_density_feedback(drafts[section["id"]], state) for section in pending]
+    critiques = scheduler.run([
+        (critic_llm.model, functools.partial(critique_draft, session, critic_llm, feedback))
+        for session, feedback in zip(sessions, seo_feedback)
+    ])
+
+    # Refinements (writer)
+    refine = [
+        (section, session, build_refinement_prompt(critique.parsed, feedback))
+        for section, session, critique, feedback in zip(pending, sessions, critiques, seo_feedback)
+        if not isinstance(critique, Exception) and needs_refinement(critique.parsed, feedback)
+    ]
+    refined = scheduler.run([
+        (writer_llm.model, functools.partial(session.invoke, prompt, step="refine"))
+        for _, session, prompt in refine
+    ])
+    for (section, _, _), response in zip(refine, refined):
+        if isinstance(response, Exception):
+            print(f"Self-correction loop failed: {response}")
+            continue
+        updated_state = track_token_usage(updated_state, response)
+        if (response.content or "").strip():
+            drafts[section["id"]] = response.content.strip()
+
+    return updated_state.update(
+        section_drafts=drafts,
+        next_action="plagiarism_check"
+    )
+
+
+def _empty_draft(section: Dict) -> str:
+    return f"### {section['title']}\n\n_The writer model returned no content. Please try again or adjust your research focus._"
+
+
+def build_draft_prompt(section: Dict, state: EnhancedBlogState, narrative_llm=None) -> str:
+    """Initial draft instructions for a section: style, narrative context, key questions and SEO"""
     # Build style context
     tone = state.tone or "Professional"
     audience = state.target_audience or "Developers"
@@ -175,24 +275,15 @@ def section_drafting_node(state: EnhancedBlogState) -> EnhancedBlogState:
     
     if current_idx > 0:
         # Handle context window overflow
-        narrative_context = build_narrative_context_with_summarization(sections[:current_idx], state)
+        narrative_context = build_narrative_context_with_summarization(sections[:current_idx], state, llm=narrative_llm)
         narrative_context += f"\n\nBuild on these topics naturally. Reference previous concepts where relevant."
     
     if current_idx < len(sections) - 1:
         next_section = sections[current_idx + 1]
         narrative_context += f"\n\nNEXT SECTION: {next_section.get('title', '')}\nSet up a smooth transition to this topic."
 
-    # Initial draft prompt
-    prompt = f"""
-Write a cohesive blog section that fits into the larger narrative.
-
-SECTION: {section['title']}
-PURPOSE: {section['description']}{narrative_context}
-
-CONTENT CONTEXT:
-{state.content_summary[:1500] if state.content_summary else 'No content summary available'}
-
-{formatted_research}{questions_context}{seo_instructions}
+    return f"""
+Write a cohesive blog section that fits into the larger narrative.{narrative_context}{questions_context}{seo_instructions}
 
 STYLE: {style_guidance}
 
@@ -207,30 +298,25 @@ DO NOT:
 OUTPUT ONLY THE SECTION CONTENT.
     """
 
-    # Generate initial draft
-    response = writer_llm.invoke([
-        ("system", f"You are a technical writer creating a cohesive blog post for {audience.lower()}. Write in a {tone.lower()} tone. Each section should build on previous ones naturally. Avoid repetition. Output markdown-formatted content only."),
-        ("human", prompt)
-    ])
-
-    updated_state = track_token_usage(state, response)
-    initial_draft = (response.content or "").strip()
-    
-    if not initial_draft:
-        initial_draft = f"### {section['title']}\n\n_The writer model returned no content. Please try again or adjust your research focus._"
-
-    # Iterative Self-Correction Loop (Critic Node)
-    refined_draft = apply_self_correction_loop(initial_draft, section, formatted_research, writer_llm, researcher_llm, updated_state)
+def start_section_session(section: Dict, formatted_research: str, writer_llm, state: EnhancedBlogState):
+    """Open an LLM session for one section with the shared brief (summary, research, title, purpose) first"""
+    tone = state.tone or "Professional"
+    audience = state.target_audience or "Developers"
+    system = (f"You are a technical writer creating a cohesive blog post for {audience.lower()}. "
+              f"Write in a {tone.lower()} tone. Each section should build on previous ones naturally. Avoid repetition.")
+    # Summary is kept (up to its own cap) before research fills the rest of the brief
+    packed = pack_sections([
+        ("summary", truncate_to_tokens(state.content_summary or "", 375, writer_llm.model), 0),
+        ("research", formatted_research, 1),
+    ], 1500, writer_llm.model)
+    brief = f"""SECTION: {section.get('title', '')}
+PURPOSE: {section.get('description', '')}
 
-    # Update section drafts
-    section_id = section["id"]
-    updated_drafts = state.section_drafts.copy()
-    updated_drafts[section_id] = refined_draft
+CONTENT CONTEXT:
+{packed["summary"] or 'No content summary available'}
 
-    return updated_state.update(
-        section_drafts=updated_drafts,
-        next_action="plagiarism_check"
-    )
+{packed["research"]}"""
+    return writer_llm.start_session(system=system, shared_context=brief)
 
 
 def select_best_research_snippets(research_context: Dict, section: Dict, researcher_llm) -> List[Dict]:
@@ -269,20 +355,18 @@ SNIPPETS:
         content = snippet.get('content', '')[:200] + "..." if len(snippet.get('content', '')) > 200 else snippet.get('content', '')
         ranking_prompt += f"{i+1}. {content}\n"
     
-    ranking_prompt += "\nReturn ONLY a JSON array with the indices (1-based) of the 2 most relevant snippets, e.g., [1, 3]"
+    ranking_prompt += '\nReturn ONLY a JSON object with the indices (1-based) of the 2 most relevant snippets, e.g., {"indices": [1, 3]}'
     
     try:
-        response = researcher_llm.invoke([
-            ("system", "You are a research analyst. Rank research snippets by relevance. Return ONLY a JSON array with indices."),
+        response = researcher_llm.invoke_json([
+            ("system", "You are a research analyst. Rank research snippets by relevance. Return ONLY a JSON object with indices."),
             ("human", ranking_prompt)
-        ])
+        ], schema=SnippetRanking)
         
-        # Try to parse the response
-        content = response.content.strip()
-        if content.startswith('[') and content.endswith(']'):
-            indices = json.loads(content)
-            # Convert to 0-based indices and get snippets
-            selected = [all_snippets[i-1] for i in indices if 1 <= i <= len(all_snippets)][:2]
+        # Convert to 0-based indices and get snippets
+        indices = response.parsed["indices"]
+        selected = [all_snippets[i-1] for i in indices if 1 <= i <= len(all_snippets)][:2]
+        if selected:
             return selected
     except Exception as e:
         print(f"Research snippet ranking failed: {e}")
@@ -335,8 +419,12 @@ def determine_integration_instruction(content: str, section: Dict) -> str:
         return "Incorporate this information to support key concepts"
 
 
-def build_narrative_context_with_summarization(previous_sections: List[Dict], state: EnhancedBlogState) -> str:
-    """Build narrative context with summarization to handle context window overflow"""
+def build_narrative_context_with_summarization(previous_sections: List[Dict], state: EnhancedBlogState, llm=None) -> str:
+    """Build narrative context with summarization to handle context window overflow.
+
+    llm, when given, summarizes instead of the HybridSummarizer (batched drafting
+    passes the writer so the summary doesn't load another model mid-phase).
+    """
     if not previous_sections:
         return ""
     
@@ -370,8 +458,14 @@ def build_narrative_context_with_summarization(previous_sections: List[Dict], st
             summary_prompt += f"\n{section.get('title', '')}:\n{draft_content[:800]}...\n"
     
     try:
-        # Use the HybridSummarizer to create a condensed summary
-        summary = summarizer.summarize(summary_prompt, "blog post context", state.dict())
+        if llm is not None:
+            summary = llm.invoke([
+                ("system", "You are a technical editor. Summarize concisely in under 200 words."),
+                ("human", summary_prompt)
+            ]).content.strip()
+        else:
+            # Use the HybridSummarizer to create a condensed summary
+            summary = summarizer.summarize(summary_prompt, "blog post context", state.dict())
         return f"\n\nSUMMARY OF PREVIOUS SECTIONS:\n{summary}"
     except Exception as e:
         print(f"Summarization failed: {e}")
@@ -380,17 +474,46 @@ def build_narrative_context_with_summarization(previous_sections: List[Dict], st
         return f"\n\nPREVIOUS SECTIONS COVERED:\n" + "\n".join(f"- {t}" for t in prev_titles if t)
 
 
-def apply_self_correction_loop(initial_draft: str, section: Dict, formatted_research: str, writer_llm, researcher_llm, state: EnhancedBlogState) -> str:
-    """Apply iterative self-correction loop to refine the draft"""
+def apply_self_correction_loop(initial_draft: str, section: Dict, formatted_research: str, writer_llm, researcher_llm, state: EnhancedBlogState, session=None) -> str:
+    """Apply iterative self-correction loop to refine the draft.
+
+    The refinement, and the critic when it runs on the writer's model, continue
+    the drafting session (the draft and the section brief are already in its
+    history); without one, a session is seeded with the initial draft.
+    """
     current_draft = initial_draft
+    if session is None:
+        session = start_section_session(section, formatted_research, writer_llm, state)
+        session.add_turn("Write this section.", current_draft)
+    
+    seo_feedback = keyword_density_feedback(current_draft, state)
+    
+    try:
+        critic_response = critique_draft(session, researcher_llm, seo_feedback)
+        feedback = critic_response.parsed
+        
+        # If score is low or there's SEO feedback, apply refinement
+        if needs_refinement(feedback, seo_feedback):
+            refinement_response = session.invoke(build_refinement_prompt(feedback, seo_feedback), step="refine")
+            
+            refined_draft = (refinement_response.content or "").strip()
+            if refined_draft:
+                return refined_draft
+    except Exception as e:
+        print(f"Self-correction loop failed: {e}")
     
-    # Check keyword density if SEO targets are available
+    # Return original draft if refinement failed
+    return current_draft
+
+
+def keyword_density_feedback(draft: str, state: EnhancedBlogState) -> str:
+    """SEO feedback when keyword density misses its targets; empty without SEO targets"""
     seo_feedback = ""
     if state.seo_targets:
         primary_keywords = [kw.get("keyword", "") for kw in state.seo_targets.get("primary_keywords", [])]
         secondary_keywords = [kw.get("keyword", "") for kw in state.seo_targets.get("secondary_keywords", [])]
         
-        density_analysis = analyze_keyword_density(current_draft, primary_keywords, secondary_keywords)
+        density_analysis = analyze_keyword_density(draft, primary_keywords, secondary_keywords)
         
         # Check if density meets targets (1.5-2.5% for primary, 0.5-1.0% for secondary)
         primary_density = density_analysis.get("primary_density", 0)
@@ -401,19 +524,28 @@ def apply_self_correction_loop(initial_draft: str, section: Dict, formatted_rese
         
         if secondary_density < 0.5 or secondary_density > 1.0:
             seo_feedback += f"\nSEO FEEDBACK: Secondary keyword density is {secondary_density}%. Target range is 0.5-1.0%. "
-    
-    # Critic Node - Review the draft
-    critic_prompt = f"""
-Review this blog section draft and provide constructive feedback:
+    return seo_feedback
 
-SECTION TITLE: {section.get('title', '')}
-SECTION PURPOSE: {section.get('description', '')}
 
-DRAFT:
-{current_draft[:2000]}...
+def critique_draft(session, critic_llm, seo_feedback: str = ""):
+    """Critic Node - review the session's latest draft; feedback dict is on response.parsed.
 
-RESEARCH CONTEXT:
-{formatted_research}{seo_feedback}
+    On the writer's model the critique continues the writer's session, whose
+    prefix is already evaluated. Another model can't reuse that prefix (and
+    shouldn't review under the writer's system prompt), so it gets a session of
+    its own with the same brief and the draft quoted in the prompt.
+    """
+    if critic_llm.model == session.client.model:
+        critic_session = session
+        review = "Now act as a critical reviewer of technical content. Review the draft above"
+    else:
+        draft = next((m["content"] for m in reversed(session.messages) if m["role"] == "assistant"), "")
+        critic_session = critic_llm.start_session(
+            system="You are a critical reviewer of technical content.", shared_context=session.shared_context
+        )
+        review = f"DRAFT:\n{draft}\n\nReview the draft above"
+    critic_prompt = f"""
+{review} against the section brief and research context, and provide constructive, actionable feedback.{seo_feedback}
 
 Provide feedback on:
 1. How well the draft addresses the section's purpose
@@ -431,40 +563,16 @@ Return ONLY a JSON object with this structure:
   "suggestions": ["specific improvement suggestions"]
 }}
 """
-    
-    try:
-        critic_response = researcher_llm.invoke([
-            ("system", "You are a critical reviewer of technical content. Provide detailed, actionable feedback."),
-            ("human", critic_prompt)
-        ])
-        
-        # Parse critic feedback
-        feedback_content = critic_response.content.strip()
-        feedback = None
-        
-        # Try to extract JSON from the response
-        if feedback_content.startswith('{') and feedback_content.endswith('}'):
-            try:
-                feedback = json.loads(feedback_content)
-            except:
-                # Try to find JSON block
-                json_match = re.search(r'\{[^}]+\}', feedback_content)
-                if json_match:
-                    try:
-                        feedback = json.loads(json_match.group())
-                    except:
-                        pass
-        
-        if feedback and isinstance(feedback, dict):
-            score = feedback.get('score', 5)
-            
-            # If score is low or there's SEO feedback, apply refinement
-            if score < 8 or seo_feedback:
-                refinement_prompt = f"""
-Improve this blog section based on the feedback provided:
+    return critic_session.invoke_json(critic_prompt, schema=CriticFeedback, client=critic_llm, step="critic")
+
 
-ORIGINAL DRAFT:
-{current_draft}
+def needs_refinement(feedback: Dict, seo_feedback: str = "") -> bool:
+    return bool(feedback) and (feedback.get('score', 5) < 8 or bool(seo_feedback))
+
+
+def build_refinement_prompt(feedback: Dict, seo_feedback: str = "") -> str:
+    return f"""
+Now return to the writer role and improve the draft above based on this feedback:
 
 FEEDBACK:
 Score: {feedback.get('score', 5)}/10
@@ -472,29 +580,10 @@ Strengths: {', '.join(feedback.get('strengths', []))}
 Weaknesses: {', '.join(feedback.get('weaknesses', []))}
 Suggestions: {', '.join(feedback.get('suggestions', []))}{seo_feedback}
 
-RESEARCH CONTEXT:
-{formatted_research}
-
-SECTION TITLE: {section.get('title', '')}
-SECTION PURPOSE: {section.get('description', '')}
-
-Write an improved version that addresses the feedback while maintaining the core content.
-Include better integration of SEO keywords naturally throughout the content.
+Write an improved version that addresses the feedback while maintaining the core content and the section brief.
+Include better integration of SEO keywords naturally throughout the content, without keyword stuffing.
+OUTPUT ONLY THE IMPROVED SECTION CONTENT in markdown.
 """
-                
-                refinement_response = writer_llm.invoke([
-                    ("system", "You are a technical writer improving content based on feedback. Maintain the core message while addressing issues. Naturally integrate SEO keywords without keyword stuffing."),
-                    ("human", refinement_prompt)
-                ])
-                
-                refined_draft = (refinement_response.content or "").strip()
-                if refined_draft:
-                    return refined_draft
-    except Exception as e:
-        print(f"Self-correction loop failed: {e}")
-    
-    # Return original draft if refinement failed
-    return current_draft
 
 
 def analyze_keyword_density(content: str, primary_keywords: list, secondary_keywords: list) -> dict:
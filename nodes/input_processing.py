@@ -159,7 +159,7 @@ def summarize_general_document(content: str) -> str:
 def extract_content_intent_and_constraints(source_code: str, research_focus: str) -> Dict[str, Any]:
     """Extract comprehensive content intent, style preferences, and constraints from the initial prompt"""
     try:
-        researcher_llm = local_llm_manager.get_researcher()
+        researcher_llm = local_llm_manager.get_for_task("classify")
         prompt = f"""
 Analyze this request and extract the complete content intent, style preferences, and constraints:
 
@@ -84,7 +84,7 @@ Avoid clichés and generic phrases. Make every sentence count."""
     response = writer_llm.invoke([
         ("system", system_message),
         ("human", prompt)
-    ])
+    ], use_cache=False)
     
     updated_state = track_token_usage(state, response)
     
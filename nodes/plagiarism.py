@@ -2,6 +2,7 @@ from state import EnhancedBlogState
 from utils.token_tracking import track_token_usage
 from models.plagiarism import plagiarism_detector
 from models.llm_manager import local_llm_manager
+from utils.token_budget import truncate_to_tokens
 import random
 import re
 from typing import Dict, Any
@@ -133,11 +134,12 @@ def rewrite_section_node(state: EnhancedBlogState) -> EnhancedBlogState:
     # Create detailed rewrite instructions
     rewrite_instructions = _generate_rewrite_instructions(original, feedback, ai_analysis, local_similarity)
 
+    writer_llm = local_llm_manager.get_writer()
     prompt = f"""
 You are a technical writer tasked with revising content to eliminate plagiarism while maintaining accuracy and quality.
 
 ### ORIGINAL CONTENT:
-{original[:3000]}
+{truncate_to_tokens(original, 750, writer_llm.model)}
 
 ### REVISION INSTRUCTIONS:
 {rewrite_instructions}
@@ -152,11 +154,10 @@ You are a technical writer tasked with revising content to eliminate plagiarism
 ### OUTPUT ONLY THE REVISED CONTENT:
 """
 
-    writer_llm = local_llm_manager.get_writer()
     response = writer_llm.invoke([
         ("system", "You are an expert technical writer skilled in plagiarism prevention and content revision."),
         ("human", prompt)
-    ])
+    ], use_cache=False)  # a cached rewrite would just reproduce the flagged text
     updated_state = track_token_usage(state, response)
 
     # Update revision history
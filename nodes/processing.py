@@ -1,6 +1,7 @@
 from state import EnhancedBlogState
 from utils.token_tracking import track_token_usage
 from models.llm_manager import local_llm_manager
+from utils.token_budget import pack_sections, truncate_to_tokens
 
 
 def process_code_node(state: EnhancedBlogState) -> EnhancedBlogState:
@@ -8,8 +9,8 @@ def process_code_node(state: EnhancedBlogState) -> EnhancedBlogState:
     if not state.source_code:
         return state.update(next_action="research_coordinator")
 
-    content = state.source_code[:10000]
     writer_llm = local_llm_manager.get_writer()
+    content = truncate_to_tokens(state.source_code, 2500, writer_llm.model)
 
     response = writer_llm.invoke([
         ("system", "You're a senior developer. Provide technical analysis in 3-5 key points."),
@@ -30,8 +31,8 @@ def process_docs_node(state: EnhancedBlogState) -> EnhancedBlogState:
     if not state.documents:
         return state.update(next_action="research_coordinator")
 
-    docs_text = "\n\n".join(state.documents[:3])[:10000]
     researcher_llm = local_llm_manager.get_researcher()
+    docs_text = truncate_to_tokens("\n\n".join(state.documents[:3]), 2500, researcher_llm.model)
 
     response = researcher_llm.invoke([
         ("system", "You're a research analyst. Extract core concepts."),
@@ -51,10 +52,14 @@ def process_both_node(state: EnhancedBlogState) -> EnhancedBlogState:
     if not state.source_code or not state.documents:
         return state.update(next_action="research_coordinator")
 
-    documents_content = "\n\n".join(state.documents)[:5000]
-    combined = "## SOURCE CODE\n" + state.source_code[:5000] + "\n\n### DOCUMENTS\n" + documents_content
-
     researcher_llm = local_llm_manager.get_researcher()
+    # Code first; documents get whatever budget the code leaves
+    packed = pack_sections([
+        ("code", state.source_code, 0),
+        ("docs", "\n\n".join(state.documents), 1),
+    ], 2500, researcher_llm.model)
+    combined = "## SOURCE CODE\n" + packed["code"] + "\n\n### DOCUMENTS\n" + packed["docs"]
+
     response = researcher_llm.invoke([
         ("system", "You're a technical integrator. Find connections between code and docs."),
         ("human", f"Create unified technical overview:\n{combined}")
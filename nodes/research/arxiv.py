@@ -5,6 +5,7 @@ from typing import Dict, List, Any
 from models.summarizer import summarizer
 from state import EnhancedBlogState
 from config import EMERGENTMIND_API_KEY, EMERGENTMIND_DAILY_LIMIT
+from utils.single_flight import coalesce
 
 
 # Global variable to track daily usage
@@ -13,16 +14,22 @@ _emergentmind_usage_count = 0
 
 def execute_arxiv_search(query: str, state: EnhancedBlogState) -> list:
     """Enhanced arXiv search with EmergentMind API integration and fallback to traditional search."""
+    return _search_arxiv(query)
+
+
+@coalesce("research", key=lambda query: query)
+def _search_arxiv(query: str) -> list:
+    """Coalesced across callers (and sessions), so nothing here may use any one caller's state"""
     # Try EmergentMind API first if available and within limits
     if _should_use_emergentmind():
-        emergent_results = _search_emergentmind_arxiv(query, state)
+        emergent_results = _search_emergentmind_arxiv(query)
         if emergent_results:
             global _emergentmind_usage_count
             _emergentmind_usage_count += 1
             return emergent_results
     
     # Fallback to traditional arxiv search
-    return _search_traditional_arxiv(query, state)
+    return _search_traditional_arxiv(query)
 
 
 def _should_use_emergentmind() -> bool:
@@ -34,7 +41,7 @@ def _should_use_emergentmind() -> bool:
     )
 
 
-def _search_emergentmind_arxiv(query: str, state: EnhancedBlogState) -> list:
+def _search_emergentmind_arxiv(query: str) -> list:
     """Search arXiv via EmergentMind API for enhanced results."""
     try:
         url = "https://api.emergentmind.com/v1/papers/search"
@@ -65,7 +72,7 @@ def _search_emergentmind_arxiv(query: str, state: EnhancedBlogState) -> list:
             # Process and enhance results
             results = []
             for paper in papers[:3]:  # Limit to top 3 results
-                enhanced_paper = _enhance_emergentmind_paper(paper, query, state)
+                enhanced_paper = _enhance_emergentmind_paper(paper, query)
                 results.append(enhanced_paper)
             
             return results
@@ -84,7 +91,7 @@ def _generate_enhanced_arxiv_query(query: str) -> str:
     return f"{query} high-impact research paper with significant citations and practical applications"
 
 
-def _enhance_emergentmind_paper(paper: Dict, query: str, state: EnhancedBlogState) -> Dict:
+def _enhance_emergentmind_paper(paper: Dict, query: str) -> Dict:
     """Enhance EmergentMind paper data with additional processing."""
     try:
         # Extract key information
@@ -96,7 +103,7 @@ def _enhance_emergentmind_paper(paper: Dict, query: str, state: EnhancedBlogStat
         summary = summarizer.summarize(
             content=abstract,
             query=query,
-            state=state.dict() if hasattr(state, "dict") else {}
+            state={}
         )
         
         # Extract additional metadata
@@ -176,7 +183,7 @@ def _calculate_paper_quality_score(paper: Dict) -> int:
     return min(100, max(0, score))
 
 
-def _search_traditional_arxiv(query: str, state: EnhancedBlogState) -> list:
+def _search_traditional_arxiv(query: str) -> list:
     """Traditional arXiv search as fallback."""
     try:
         import arxiv  # lightweight client
@@ -186,18 +193,20 @@ def _search_traditional_arxiv(query: str, state: EnhancedBlogState) -> list:
 
     try:
         search = arxiv.Search(query=query, max_results=3, sort_by=arxiv.SortCriterion.Relevance)
-        results = []
-        for result in search.results():
-            try:
-                abstract = result.summary or ""
-                summary = summarizer.summarize(
-                    content=abstract,
-                    query=query,
-                    state=state.dict() if hasattr(state, "dict") else {}
-                )
-            except Exception:
-                summary = (result.summary or "")[:300] + "..."
+        papers = list(search.results())
+        abstracts = [result.summary or "" for result in papers]
+        try:
+            # Abstracts are short, so they are summarized together in HF pipeline batches
+            summaries = summarizer.summarize_many(
+                abstracts,
+                query=query,
+                state={}
+            )
+        except Exception:
+            summaries = [abstract[:300] + "..." for abstract in abstracts]
 
+        results = []
+        for result, summary in zip(papers, summaries):
             authors = [a.name for a in (result.authors or [])]
             published = getattr(result, "published", None)
             url = getattr(result, "entry_id", None) or getattr(result, "pdf_url", None) or ""
@@ -2,8 +2,8 @@ from state import EnhancedBlogState
 from utils.token_tracking import track_token_usage
 from models.llm_manager import local_llm_manager
 from config import RESEARCH_QUERY_COUNT, RESEARCH_MAX_TOKENS
-import json
-import re
+from utils.token_budget import truncate_to_tokens
+from models.schemas import ResearchQueries
 
 
 def research_coordinator_node(state: EnhancedBlogState) -> EnhancedBlogState:
@@ -28,7 +28,8 @@ def research_coordinator_node(state: EnhancedBlogState) -> EnhancedBlogState:
 
 def optimize_research_queries(state: EnhancedBlogState, total_tokens: int) -> list:
     """Generate focused research queries based on content"""
-    content_preview = state.content_summary[:1500] if state.content_summary else ""
+    researcher_llm = local_llm_manager.get_researcher()
+    content_preview = truncate_to_tokens(state.content_summary or "", 375, researcher_llm.model)
 
     # Determine input type to prioritize appropriate sources
     input_type = _determine_input_type(state)
@@ -41,35 +42,17 @@ def optimize_research_queries(state: EnhancedBlogState, total_tokens: int) -> li
         raise Exception("Required research dependencies are not properly initialized. Please check your configuration.")
     
     try:
-        researcher_llm = local_llm_manager.get_researcher()
-        response = researcher_llm.invoke([
+        response = researcher_llm.invoke_json([
             ("system",
              "You are a research strategist. Create focused, actionable research queries. Output valid JSON only."),
             ("human", prompt)
-        ])
+        ], schema=ResearchQueries)
         
         # Track token usage (now handled by LLM manager)
         if hasattr(response, 'response_metadata') and 'token_usage' in response.response_metadata:
             state.token_usage = _update_token_usage(state.token_usage, response.response_metadata['token_usage'])
 
-        raw = response.content or ""
-        try:
-            result = json.loads(raw)
-        except Exception:
-            json_block = None
-            if "```" in raw:
-                parts = re.findall(r"```(?:json)?\s*(\{[\s\S]*?\})\s*```", raw)
-                if parts:
-                    json_block = parts[0]
-            if not json_block:
-                start = raw.find('{')
-                end = raw.rfind('}')
-                if start != -1 and end != -1 and end > start:
-                    json_block = raw[start:end+1]
-            if json_block:
-                result = json.loads(json_block)
-            else:
-                raise
+        result = response.parsed
         # Extract both research queries and competitor queries
         research_queries = result.get("research_queries", []) or []
         competitor_queries = result.get("competitor_queries", []) or []
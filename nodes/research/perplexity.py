@@ -3,16 +3,24 @@ import os
 import re
 import hashlib
 from typing import List, Dict, Any
+from utils.single_flight import coalesce
 
 
 def execute_perplexity_search(query: str, state=None) -> list:
     """Use Perplexity API for high-quality web search with enhanced validation and filtering"""
+    results, status = _search_perplexity(query)
+    # Applied per caller: a coalesced search is shared by callers with different states
+    if status and state:
+        state.research_status = status
+    return results
+
+
+@coalesce("research", key=lambda query: query)
+def _search_perplexity(query: str) -> tuple:
+    """Run the search; returns (results, research status to set or None)"""
     api_key = os.environ.get("PERPLEXITY_API_KEY")
     if not api_key:
-        # Update state if provided
-        if state:
-            state.research_status = "Perplexity_Failed"
-        return []
+        return [], "Perplexity_Failed"
 
     try:
         url = "https://api.perplexity.ai/chat/completions"
@@ -59,22 +67,18 @@ def execute_perplexity_search(query: str, state=None) -> list:
                 # Enrich with metadata
                 enriched_results = enrich_results_with_metadata(filtered_results, query)
                 
-                return enriched_results
+                return enriched_results, None
             else:
                 text = response.text[:160].replace("\n", " ") if hasattr(response, 'text') else ""
                 print(f"Perplexity API error for model '{model_name}': {response.status_code} {text}")
                 last_error = (response.status_code, text)
 
         # If all models failed
-        if state:
-            state.research_status = "Perplexity_Failed"
-        return []
+        return [], "Perplexity_Failed"
 
     except Exception as e:
         print(f"Perplexity search error: {e}")
-        if state:
-            state.research_status = "Perplexity_Failed"
-        return []
+        return [], "Perplexity_Failed"
 
 
 def parse_perplexity_response(content: str, query: str) -> list:
@@ -1,11 +1,14 @@
 from state import EnhancedBlogState
 import os
 import concurrent.futures
+import contextvars
 from .arxiv import execute_arxiv_search
 from .github import execute_github_search
 from .substack import execute_substack_search
 from .perplexity import execute_perplexity_search
 from utils.research_organizer import organize_research_results
+from utils.single_flight import count_collapses
+from utils.telemetry import record_event
 
 
 def research_node(state: EnhancedBlogState) -> EnhancedBlogState:
@@ -16,39 +19,45 @@ def research_node(state: EnhancedBlogState) -> EnhancedBlogState:
     research_plan = state.research_plan or {}
     all_results = {}
 
-    # Execute high priority research first
-    high_priority_queries = research_plan.get("high_priority", [])
+    # Worker threads run in copies of this context, so their collapsed searches are counted here
+    with count_collapses() as collapses:
+        # Execute high priority research first
+        high_priority_queries = research_plan.get("high_priority", [])
 
-    for query_plan in high_priority_queries:
-        query = query_plan["query"]
-        sources = query_plan["sources"]
-
-        query_results = execute_parallel_research(query, sources, state)
-        all_results[query] = query_results
-
-        # Check token usage after each high-priority query
-        if should_stop_research(state):
-            break
-
-    # Only proceed with medium priority if we have capacity
-    if not should_stop_research(state):
-        medium_priority_queries = research_plan.get("medium_priority", [])
-        for query_plan in medium_priority_queries[:2]:  # Limit to 2 medium priority
+        for query_plan in high_priority_queries:
             query = query_plan["query"]
             sources = query_plan["sources"]
 
             query_results = execute_parallel_research(query, sources, state)
             all_results[query] = query_results
 
+            # Check token usage after each high-priority query
             if should_stop_research(state):
                 break
 
+        # Only proceed with medium priority if we have capacity
+        if not should_stop_research(state):
+            medium_priority_queries = research_plan.get("medium_priority", [])
+            for query_plan in medium_priority_queries[:2]:  # Limit to 2 medium priority
+                query = query_plan["query"]
+                sources = query_plan["sources"]
+
+                query_results = execute_parallel_research(query, sources, state)
+                all_results[query] = query_results
+
+                if should_stop_research(state):
+                    break
+
     # Organize results by source for easier consumption
     organized_results = organize_research_results(all_results)
 
     # Merge with existing research context
     existing_context = state.research_context or {}
     merged_context = {**existing_context, **organized_results}
+    # Searches served by an identical one already in flight (e.g. "web" and "perplexity" for the same query);
+    # an event, not a research_context key, since that maps each source to its results
+    if collapses.count("research"):
+        record_event("coalesced_searches", count=collapses.count("research"))
 
     # Check if any research failed
     research_status = getattr(state, 'research_status', 'completed')
@@ -60,6 +69,11 @@ def research_node(state: EnhancedBlogState) -> EnhancedBlogState:
     )
 
 
+def _submit(executor, fn, *args):
+    # Run in a copy of the caller's context so LLM calls made by the search land in the node's ledger
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
 def execute_parallel_research(query: str, sources: list, state: EnhancedBlogState) -> dict:
     """Execute research across multiple sources in parallel"""
     results = {}
@@ -69,19 +83,19 @@ def execute_parallel_research(query: str, sources: list, state: EnhancedBlogStat
 
         for source in sources:
             if source == "web":
-                future = executor.submit(execute_web_search, query, state)
+                future = _submit(executor, execute_web_search, query, state)
                 future_to_source[future] = "web"
             elif source == "arxiv":
-                future = executor.submit(execute_arxiv_search, query, state)
+                future = _submit(executor, execute_arxiv_search, query, state)
                 future_to_source[future] = "arxiv"
             elif source == "github":
-                future = executor.submit(execute_github_search, query, state)
+                future = _submit(executor, execute_github_search, query, state)
                 future_to_source[future] = "github"
             elif source == "substack":
-                future = executor.submit(execute_substack_search, query, state)
+                future = _submit(executor, execute_substack_search, query, state)
                 future_to_source[future] = "substack"
             elif source == "perplexity" and os.environ.get("PERPLEXITY_API_KEY"):
-                future = executor.submit(execute_perplexity_search, query, state)
+                future = _submit(executor, execute_perplexity_search, query, state)
                 future_to_source[future] = "perplexity"
 
         # Collect results with per-future timeout to avoid dropping remaining futures
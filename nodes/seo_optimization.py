@@ -2,8 +2,8 @@ from state import EnhancedBlogState
 from models.llm_manager import local_llm_manager
 from models.summarizer import summarizer
 from utils.token_tracking import track_token_usage
-import json
-import re
+from utils.token_budget import truncate_to_tokens
+from models.schemas import SeoKeywords
 import os
 import requests
 
@@ -35,7 +35,7 @@ def seo_optimization_node(state: EnhancedBlogState) -> EnhancedBlogState:
 def _generate_seo_keywords(state: EnhancedBlogState) -> dict:
     """Generate primary and secondary keywords using LLM analysis"""
     try:
-        researcher_llm = local_llm_manager.get_researcher()
+        researcher_llm = local_llm_manager.get_for_task("classify")
         
         # Get blog structure and content preview
         sections = state.sections or []
@@ -48,7 +48,7 @@ def _generate_seo_keywords(state: EnhancedBlogState) -> dict:
 Analyze this blog post structure and content to generate SEO keywords:
 
 CONTENT SUMMARY:
-{content_summary[:1000]}
+{truncate_to_tokens(content_summary, 250, researcher_llm.model)}
 
 BLOG STRUCTURE:
 {structure_overview}
@@ -62,28 +62,14 @@ Return ONLY a JSON object with this structure:
 }}
 """
         
-        response = researcher_llm.invoke([
+        response = researcher_llm.invoke_json([
             ("system", "You are an SEO expert. Generate relevant keywords for technical content. Return ONLY valid JSON."),
             ("human", prompt)
-        ])
-        
-        # Parse response
-        content = response.content.strip()
-        if content.startswith('{') and content.endswith('}'):
-            try:
-                keywords = json.loads(content)
-                return keywords
-            except:
-                pass
-        
-        # Fallback extraction
-        json_match = re.search(r'\{[^}]+\}', content)
-        if json_match:
-            try:
-                keywords = json.loads(json_match.group())
-                return keywords
-            except:
-                pass
+        ], schema=SeoKeywords)
+        
+        keywords = response.parsed
+        if keywords["primary_keywords"] or keywords["secondary_keywords"]:
+            return keywords
         
         # Ultimate fallback
         return {
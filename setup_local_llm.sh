@@ -10,6 +10,7 @@ echo "Setting up Local LLM on Apple Silicon..."
 ollama pull llama3.1:8b
 ollama pull llama3.1:70b  # For higher quality when needed
 ollama pull mistral:7b
+ollama pull llama3.2:3b  # Small model for classify tasks (TASK_CLASSIFY_MODEL)
 
 echo "Local LLM setup complete!"
 echo "Available models:"
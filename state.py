@@ -39,6 +39,10 @@ class EnhancedBlogState(BaseModel):
 
     # Resources
     token_usage: Dict[str, int] = Field(default_factory=dict)
+    # Per-call LLM telemetry (see utils.telemetry)
+    llm_calls: List[Dict[str, Any]] = Field(default_factory=list)
+    # Circuit breaker transitions and hedged requests during the run
+    llm_events: List[Dict[str, Any]] = Field(default_factory=list)
     free_tier_credits: int = 100
     content_fingerprints: Set[str] = Field(default_factory=set)
 
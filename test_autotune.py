@@ -0,0 +1,74 @@
+"""
+Test script for Ollama runtime auto-tuning
+Runs the tuner against a stand-in Ollama server with a simulated speed and
+memory profile, and checks that the options it picks are applied per host.
+"""
+
+import os
+import sys
+
+from test_ollama_pool import StandInOllama, make_manager
+
+
+def test_autotune_picks_and_applies_options():
+    """The tuner finds the fastest num_thread/num_batch and the largest num_ctx under the ceiling"""
+    import math
+    import tempfile
+    from models.autotune import OllamaAutoTuner, TuningStore
+    from models.llm_manager import LocalLLMClient
+
+    host = StandInOllama(["m1"], resident=["m1"]).start()
+    # Simulated host: fastest at 4 threads and batch 512; the KV cache grows with num_ctx
+    host.stats = lambda o: {
+        "eval_count": 96,
+        "prompt_eval_duration": int(0.5e9),
+        "eval_duration": int(96 / (20 - 2 * abs(o.get("num_thread", 4) - 4)
+                                   - abs(math.log2(o.get("num_batch", 512) / 512))) * 1e9),
+    }
+    host.size_gb = lambda o: 4 + o.get("num_ctx", 2048) / 8192
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            manager = make_manager([host.url])
+            manager.tuning = TuningStore(os.path.join(directory, "autotune.json"), enabled=True)
+            tuner = OllamaAutoTuner(manager, host.url, "m1", memory_gb=4.6, threads=[2, 4, 8], runs=1,
+                                    report=lambda line: None)
+            profile = tuner.run()
+            assert (profile["num_thread"], profile["num_batch"], profile["num_ctx"]) == (4, 512, 4096), profile
+            manager.tuning.save(host.url, "m1", profile)
+
+            # Reloaded from disk and applied to calls routed to this host
+            manager.tuning = TuningStore(os.path.join(directory, "autotune.json"), enabled=True)
+            LocalLLMClient("m1", "writer", manager).invoke("hello", use_cache=False)
+            assert host.last_options.get("num_thread") == 4 and host.last_options.get("num_batch") == 512
+            assert manager.num_ctx_for("m1", 100_000) <= 4096
+            assert manager.parallel_for("m1") == profile["parallel"]
+            assert manager.queue_concurrency() == profile["parallel"]
+        print(f"✓ Tuned num_thread=4 num_batch=512 num_ctx=4096 parallel={profile['parallel']}; applied per host")
+    finally:
+        host.stop()
+
+
+def main():
+    """Run all tests"""
+    print("Running auto-tuning tests...")
+    print("============================")
+
+    tests = [
+        test_autotune_picks_and_applies_options,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+        print()
+
+    print(f"Tests passed: {passed}/{len(tests)}")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Test script for content-defined chunking
+Checks that chunks cover the whole text within their size bounds, and that a
+local edit only changes the chunks around it.
+"""
+
+import random
+import sys
+
+
+def make_document(paragraphs=40, seed=7):
+    rng = random.Random(seed)
+    words = ("cache model token latency queue host summary chunk prompt batch "
+             "decode context window memory thread session request").split()
+    text = []
+    for _ in range(paragraphs):
+        sentences = [" ".join(rng.choice(words) for _ in range(rng.randint(6, 16))).capitalize() + "."
+                     for _ in range(rng.randint(3, 7))]
+        text.append(" ".join(sentences))
+    return "\n\n".join(text)
+
+
+def test_chunks_cover_text_within_bounds():
+    """Every word lands in exactly one chunk; chunks stay within max_chars and end on a sentence"""
+    from utils.chunking import content_defined_chunks
+
+    text = make_document()
+    chunks = content_defined_chunks(text, max_chars=800)
+    assert len(chunks) > 5, len(chunks)
+    assert " ".join(chunks).split() == text.split()
+    assert all(len(c) <= 800 for c in chunks), [len(c) for c in chunks]
+    assert all(len(c) >= 800 // 4 for c in chunks[:-1]), [len(c) for c in chunks]
+    assert all(c.endswith(".") for c in chunks), [c[-20:] for c in chunks]
+    print(f"✓ {len(chunks)} chunks of {min(map(len, chunks))}-{max(map(len, chunks))} chars cover the text")
+
+
+def test_local_edit_keeps_other_chunks():
+    """Editing one sentence in the middle leaves the chunks away from it unchanged"""
+    from utils.chunking import content_defined_chunks
+
+    text = make_document()
+    middle = text.index(". ", len(text) // 2) + 2
+    edited = text[:middle] + "An inserted sentence about memory bandwidth. " + text[middle:]
+    before = content_defined_chunks(text, max_chars=800)
+    after = content_defined_chunks(edited, max_chars=800)
+    changed = len(set(after) - set(before))
+    assert before != after
+    assert changed <= 3, (changed, len(after))
+    assert before[0] == after[0] and before[-1] == after[-1]
+    print(f"✓ Edit changed {changed} of {len(after)} chunks")
+
+
+def test_split_sentences():
+    """Sentences end at ., ! or ? followed by a capital, a digit or an opening quote"""
+    from utils.chunking import split_sentences
+
+    text = 'Load the model. Is it resident? Yes! "Quoted" start. Version 3.1 is used. e.g. not here.'
+    assert split_sentences(text) == [
+        "Load the model.", "Is it resident?", "Yes!", '"Quoted" start.', "Version 3.1 is used. e.g. not here."
+    ], split_sentences(text)
+    print("✓ Sentences split at their ends only")
+
+
+def main():
+    """Run all tests"""
+    print("Running chunking tests...")
+    print("=========================")
+
+    tests = [
+        test_chunks_cover_text_within_bounds,
+        test_local_edit_keeps_other_chunks,
+        test_split_sentences,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+        print()
+
+    print(f"Tests passed: {passed}/{len(tests)}")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Test script for LLM backend resilience
+Checks that consecutive Ollama failures open the circuit breaker and move calls
+to Perplexity, and that a call running past its usual latency is hedged.
+Ollama is simulated by the stand-in server from test_ollama_pool.py.
+"""
+
+import os
+import sys
+import time
+
+from test_ollama_pool import StandInOllama, make_manager
+
+
+def test_circuit_breaker_and_hedging():
+    """Consecutive failures open Ollama's circuit; slow calls are hedged to Perplexity"""
+    from config import ModelConfig
+    from models.llm_manager import LocalLLMClient
+    from utils.telemetry import record_llm_calls
+
+    host = StandInOllama(["m1"], resident=["m1"]).start()
+    saved = os.environ.get("PERPLEXITY_API_KEY"), ModelConfig.HEDGE_ENABLED
+    os.environ["PERPLEXITY_API_KEY"] = "test"
+    try:
+        manager = make_manager([host.url])
+        manager.hosts.eject_after = 100  # let the breaker, not host ejection, react
+        # Stand-in for the Perplexity API
+        manager._call_perplexity = lambda prompt, system="", max_tokens=800: (
+            "from perplexity", {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2})
+        client = LocalLLMClient("m1", "writer", manager)
+
+        with record_llm_calls("test") as (_, events):
+            host.fail_with = 503
+            for i in range(5):
+                assert client.invoke(f"q{i}", use_cache=False).content == "from perplexity"
+            assert manager.breaker_states()["ollama"] == "OPEN", manager.breaker_states()
+            assert events and events[0]["kind"] == "circuit" and events[0]["state"] == "OPEN", events
+
+            # Fresh breaker, healthy host: build up latency samples, then one slow call
+            manager._breakers.clear()
+            host.fail_with = None
+            ModelConfig.HEDGE_ENABLED = True
+            for i in range(ModelConfig.HEDGE_MIN_SAMPLES):
+                assert "ok from" in client.invoke(f"fast{i}", use_cache=False).content
+            host.delay = 1.0
+            started = time.time()
+            assert client.invoke("slow", use_cache=False).content == "from perplexity"
+            assert time.time() - started < 0.9
+            assert events[-1]["kind"] == "hedge" and events[-1]["winner"] == "perplexity", events[-1]
+        print("✓ Circuit opened after failures; slow call hedged to Perplexity")
+    finally:
+        if saved[0] is None:
+            os.environ.pop("PERPLEXITY_API_KEY", None)
+        else:
+            os.environ["PERPLEXITY_API_KEY"] = saved[0]
+        ModelConfig.HEDGE_ENABLED = saved[1]
+        host.stop()
+
+
+def test_queue_wait_does_not_trigger_hedge():
+    """A call that waits for a busy request queue is not hedged: the delay starts once it holds a slot"""
+    import threading
+    from config import ModelConfig
+    from models.llm_manager import LocalLLMClient
+    from models.request_queue import LLMRequestQueue
+    from utils.telemetry import record_llm_calls
+
+    host = StandInOllama(["m1"], resident=["m1"]).start()
+    saved = os.environ.get("PERPLEXITY_API_KEY"), ModelConfig.HEDGE_ENABLED
+    os.environ["PERPLEXITY_API_KEY"] = "test"
+    ModelConfig.HEDGE_ENABLED = True
+    try:
+        manager = make_manager([host.url])
+        manager.request_queue = LLMRequestQueue(max_concurrency=1)
+        secondary_calls = []
+        manager._call_perplexity = lambda prompt, system="", max_tokens=800: (
+            secondary_calls.append(prompt) or "from perplexity",
+            {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2})
+        client = LocalLLMClient("m1", "writer", manager)
+        for i in range(ModelConfig.HEDGE_MIN_SAMPLES):
+            client.invoke(f"fast{i}", use_cache=False)
+        assert manager.hedge_delay(client._latency_key) < 0.3
+
+        with record_llm_calls("test") as (_, events):
+            with manager.request_queue.slot():  # saturate the queue
+                result = {}
+                caller = threading.Thread(target=lambda: result.update(r=client.invoke("queued", use_cache=False)))
+                caller.start()
+                time.sleep(0.6)  # well past the hedge delay, all of it queued
+            caller.join(timeout=5)
+        assert "ok from" in result["r"].content, result
+        assert not secondary_calls and not [e for e in events if e["kind"] == "hedge"], events
+        assert result["r"].response_metadata["timings"]["queue_ms"] >= 500
+        print("✓ Queued call waited 0.6s for a slot without hedging")
+    finally:
+        if saved[0] is None:
+            os.environ.pop("PERPLEXITY_API_KEY", None)
+        else:
+            os.environ["PERPLEXITY_API_KEY"] = saved[0]
+        ModelConfig.HEDGE_ENABLED = saved[1]
+        host.stop()
+
+
+def main():
+    """Run all tests"""
+    print("Running circuit breaker and hedging tests...")
+    print("============================================")
+
+    tests = [
+        test_circuit_breaker_and_hedging,
+        test_queue_wait_does_not_trigger_hedge,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+        print()
+
+    print(f"Tests passed: {passed}/{len(tests)}")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
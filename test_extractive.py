@@ -0,0 +1,87 @@
+"""
+Test script for the extractive (TF-IDF + TextRank) summarizer
+Checks that central and query-relevant sentences are picked, that the summary
+keeps document order and fits the length budget, and that near-duplicates are
+skipped.
+"""
+
+import sys
+
+DOCUMENT = (
+    "Ollama keeps a model in memory between requests to avoid reloading it. "
+    "Reloading a large model from disk can take several seconds per request. "
+    "Keeping the model in memory trades memory for lower latency on every request. "
+    "The weather was pleasant on the day of the release. "
+    "A quantized model needs less memory and loads from disk faster. "
+    "Request batching improves throughput when many requests arrive together. "
+    "Lunch was served in the garden after the talk."
+)
+
+
+def test_textrank_prefers_central_sentences():
+    """Sentences sharing terms with the rest outrank off-topic ones; order and budget are kept"""
+    from utils.chunking import split_sentences
+    from utils.extractive import extractive_summary
+
+    sentences = split_sentences(DOCUMENT)
+    summary = extractive_summary(DOCUMENT, max_chars=240)
+    picked = split_sentences(summary)
+    assert len(summary) <= 240, len(summary)
+    assert len(picked) >= 2 and all(s in sentences for s in picked), picked
+    assert [sentences.index(s) for s in picked] == sorted(sentences.index(s) for s in picked)
+    assert not any("weather" in s or "Lunch" in s for s in picked), picked
+    print(f"✓ Picked {len(picked)} central sentences in document order ({len(summary)} chars)")
+
+
+def test_query_steers_selection():
+    """The query pulls in the sentences that match it"""
+    from utils.extractive import extractive_summary
+
+    summary = extractive_summary(DOCUMENT, query="batching throughput", max_chars=120)
+    assert "Request batching improves throughput" in summary, summary
+    summary = extractive_summary(DOCUMENT, query="quantized", max_chars=120)
+    assert "quantized model" in summary, summary
+    print("✓ Query terms decide between equally central sentences")
+
+
+def test_redundant_and_short_inputs():
+    """Near-duplicates are skipped; short text is returned whole, a single long sentence truncated"""
+    from utils.extractive import extractive_summary
+
+    repeated = ("The cache stores summaries on disk. " * 3 +
+                "The cache stores summaries on disk! A queue orders the requests. " * 2)
+    summary = extractive_summary(repeated, max_chars=80)
+    assert summary.count("The cache stores summaries on disk") == 1, summary
+
+    assert extractive_summary("Short text.  Kept   whole.", max_chars=100) == "Short text. Kept whole."
+    long_sentence = "word " * 100
+    assert extractive_summary(long_sentence, max_chars=50) == long_sentence.strip()[:50] + "..."
+    print("✓ Duplicates skipped, short and single-sentence inputs handled")
+
+
+def main():
+    """Run all tests"""
+    print("Running extractive summarizer tests...")
+    print("======================================")
+
+    tests = [
+        test_textrank_prefers_central_sentences,
+        test_query_steers_selection,
+        test_redundant_and_short_inputs,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+        print()
+
+    print(f"Tests passed: {passed}/{len(tests)}")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
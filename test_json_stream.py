@@ -0,0 +1,81 @@
+"""
+Test script for streaming JSON extraction from LLM output
+Checks that the stream parser stops at the end of the first top-level value
+(ignoring brackets inside strings), and that parse_json repairs fenced,
+prose-wrapped, trailing-comma and cut-off output.
+"""
+
+import sys
+
+
+def test_stream_parser_stops_at_value_end():
+    """feed() reports completion once the first top-level value closes, across chunk boundaries"""
+    from utils.json_stream import JsonStreamParser
+
+    parser = JsonStreamParser()
+    chunks = ['Sure! {"score": 7, "note": "use {braces} and \\"quotes\\"', '", "tags": ["a", ', '"b"]}', "\n\nDone."]
+    results = [parser.feed(chunk) for chunk in chunks]
+    assert results == [False, False, True, True], results
+    assert parser.text == '{"score": 7, "note": "use {braces} and \\"quotes\\"", "tags": ["a", "b"]}', parser.text
+    assert parser.closed_text() == parser.text
+    print("✓ Stream stopped at the closing brace")
+
+
+def test_closed_text_of_partial_value():
+    """A cut-off value is closed: open string, then the open brackets in order"""
+    import json
+    from utils.json_stream import JsonStreamParser
+
+    parser = JsonStreamParser()
+    parser.feed('{"items": [{"name": "fir')
+    assert not parser.complete
+    assert json.loads(parser.closed_text()) == {"items": [{"name": "fir"}]}, parser.closed_text()
+
+    parser = JsonStreamParser()
+    parser.feed('{"items": [1, 2,')
+    assert json.loads(parser.closed_text()) == {"items": [1, 2]}, parser.closed_text()
+    print("✓ Partial objects closed into valid JSON")
+
+
+def test_parse_json_repairs():
+    """Fences, leading prose, trailing commas and truncation are repaired; no JSON raises ValueError"""
+    from utils.json_stream import parse_json
+
+    assert parse_json('```json\n{"a": 1}\n```') == {"a": 1}
+    assert parse_json('Here is the result: [1, 2, 3] as requested') == [1, 2, 3]
+    assert parse_json('{"a": [1, 2,], "b": 3,}') == {"a": [1, 2], "b": 3}
+    assert parse_json('{"keywords": ["latency", "thro') == {"keywords": ["latency", "thro"]}
+    try:
+        parse_json("no structured output here")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    print("✓ parse_json recovered fenced, wrapped, trailing-comma and cut-off output")
+
+
+def main():
+    """Run all tests"""
+    print("Running JSON stream tests...")
+    print("============================")
+
+    tests = [
+        test_stream_parser_stops_at_value_end,
+        test_closed_text_of_partial_value,
+        test_parse_json_repairs,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+        print()
+
+    print(f"Tests passed: {passed}/{len(tests)}")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
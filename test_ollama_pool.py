@@ -0,0 +1,244 @@
+"""
+Test script for multi-host Ollama routing
+Runs several local stand-in Ollama servers and checks that LocalLLMManager
+routes to the right host, balances load, ejects failing hosts and recovers them,
+and that the model-affinity scheduler groups calls by model. The stand-in
+server is shared with the other LLM test scripts.
+"""
+
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StandInOllama:
+    """Minimal Ollama API: /api/tags, /api/ps, /api/generate (non-streaming)"""
+
+    def __init__(self, models, resident=(), delay=0.0):
+        self.models = list(models)
+        self.resident = list(resident)
+        self.delay = delay
+        self.fail_with = None  # HTTP status to return for generate calls
+        self.stats = None  # options -> extra response fields (durations), to simulate a speed profile
+        self.size_gb = None  # options -> resident size reported by /api/ps
+        self.last_options = {}
+        self.generate_calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        self.server = None
+        self.port = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send(200, {"models": [{"name": m} for m in stand_in.models]})
+                elif self.path == "/api/ps":
+                    size = stand_in.size_gb(stand_in.last_options) * 1e9 if stand_in.size_gb else 0
+                    self._send(200, {"models": [{"name": m, "size": size} for m in stand_in.resident]})
+                else:
+                    self._send(404, {})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if stand_in.fail_with:
+                    self._send(stand_in.fail_with, {"error": "unavailable"})
+                    return
+                with stand_in._lock:
+                    stand_in.generate_calls += 1
+                    stand_in.last_options = body.get("options") or {}
+                    stand_in.in_flight += 1
+                    stand_in.peak_in_flight = max(stand_in.peak_in_flight, stand_in.in_flight)
+                time.sleep(stand_in.delay)
+                with stand_in._lock:
+                    stand_in.in_flight -= 1
+                extra = stand_in.stats(body.get("options") or {}) if stand_in.stats else {}
+                self._send(200, {"model": body.get("model"), "response": f"ok from {stand_in.port}",
+                                 "done": True, "prompt_eval_count": 3, "eval_count": 3, **extra})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_manager(urls, eject_seconds=30.0):
+    from models.llm_manager import LocalLLMManager
+
+    manager = LocalLLMManager()
+    manager.hosts = manager._build_host_pool(urls)
+    manager.hosts.eject_seconds = eject_seconds
+    return manager
+
+
+def generate(manager, model="m1"):
+    return manager._call_ollama(model=model, prompt="hello", max_tokens=8)
+
+
+def test_routes_to_resident_model():
+    """Calls go to a host that already has the model loaded"""
+    a = StandInOllama(["m1", "m2"], resident=["m1"]).start()
+    b = StandInOllama(["m1", "m2"], resident=["m2"]).start()
+    try:
+        manager = make_manager([a.url, b.url])
+        for _ in range(3):
+            generate(manager, "m2")
+        assert b.generate_calls == 3 and a.generate_calls == 0, (a.generate_calls, b.generate_calls)
+        print("✓ Routed to the host with the model resident")
+    finally:
+        a.stop()
+        b.stop()
+
+
+def test_least_loaded_balancing():
+    """Concurrent calls for a model resident everywhere are spread across hosts"""
+    hosts = [StandInOllama(["m1"], resident=["m1"], delay=0.2).start() for _ in range(3)]
+    try:
+        manager = make_manager([h.url for h in hosts])
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            list(executor.map(lambda _: generate(manager), range(6)))
+        counts = [h.generate_calls for h in hosts]
+        assert counts == [2, 2, 2], counts
+        utilization = manager.host_utilization()
+        assert all(u["calls"] == 2 and u["busy_seconds"] > 0 for u in utilization), utilization
+        print(f"✓ Load spread evenly across hosts: {counts}")
+    finally:
+        for h in hosts:
+            h.stop()
+
+
+def test_load_on_every_host():
+    """Preloading a model loads it on each host that has it installed"""
+    from models.backends import OllamaBackend
+
+    hosts = [StandInOllama(["m1"]).start(), StandInOllama(["m1"]).start(), StandInOllama(["m2"]).start()]
+    try:
+        manager = make_manager([h.url for h in hosts])
+        OllamaBackend(manager).load("m1", keep_alive="10m")
+        counts = [h.generate_calls for h in hosts]
+        assert counts == [1, 1, 0], counts
+        print(f"✓ Model loaded on every host that has it: {counts}")
+    finally:
+        for h in hosts:
+            h.stop()
+
+
+def test_eject_and_recover():
+    """A failing host is ejected, calls move to the others, and it comes back after the cool-down"""
+    a = StandInOllama(["m1"], resident=["m1"]).start()
+    b = StandInOllama(["m1"], resident=["m1"]).start()
+    try:
+        manager = make_manager([a.url, b.url], eject_seconds=2.0)
+        a.fail_with = 503
+        for _ in range(6):
+            assert "ok from" in generate(manager)["response"]  # failures are retried on b
+        report = {u["url"]: u for u in manager.host_utilization()}
+        assert report[a.url]["ejected"] and report[a.url]["ejections"] >= 1, report[a.url]
+        calls_while_ejected = a.generate_calls
+        assert calls_while_ejected == 0
+
+        a.fail_with = None
+        time.sleep(2.1)
+        for _ in range(4):
+            generate(manager)
+        report = {u["url"]: u for u in manager.host_utilization()}
+        assert not report[a.url]["ejected"] and a.generate_calls > 0, report[a.url]
+        print("✓ Failing host ejected, then recovered after cool-down")
+    finally:
+        a.stop()
+        b.stop()
+
+
+def test_unreachable_host():
+    """A host that is down is skipped without failing calls"""
+    down = StandInOllama(["m1"], resident=["m1"]).start()
+    up = StandInOllama(["m1"]).start()
+    down_url = down.url
+    down.stop()
+    try:
+        manager = make_manager([down_url, up.url])
+        for _ in range(3):
+            assert "ok from" in generate(manager)["response"]
+        assert up.generate_calls == 3
+        health = manager.refresh_health()
+        assert health["up"] and "m1" in health["models"]
+        print("✓ Unreachable host skipped")
+    finally:
+        up.stop()
+
+
+def test_model_affinity_grouping():
+    """Interleaved calls for two models run as two groups, loaded model first"""
+    host = StandInOllama(["m1", "m2"]).start()
+    try:
+        manager = make_manager([host.url])
+        generate(manager, "m2")
+        models = ["m1", "m2", "m1", "m2", "m1", "m2"]
+        results = manager.scheduler.run(
+            [(model, lambda model=model: generate(manager, model)["model"]) for model in models]
+        )
+        assert results == models, results  # input order is kept
+        stats = manager.scheduler.stats()
+        # m2 was loaded: its group runs first, then a single swap to m1
+        assert stats["swaps"] == 1 and stats["swaps_avoided"] == 5, stats
+        print(f"✓ Calls grouped by model: {stats['swaps']} swap, {stats['swaps_avoided']} avoided")
+    finally:
+        host.stop()
+
+
+def main():
+    """Run all tests"""
+    print("Running multi-host Ollama routing tests...")
+    print("==========================================")
+
+    tests = [
+        test_routes_to_resident_model,
+        test_least_loaded_balancing,
+        test_load_on_every_host,
+        test_eject_and_recover,
+        test_unreachable_host,
+        test_model_affinity_grouping,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+        print()
+
+    print(f"Tests passed: {passed}/{len(tests)}")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Test script for the shared LLM request queue
+Checks that sessions waiting for a slot take turns.
+"""
+
+import sys
+import threading
+import time
+
+
+def test_request_queue_fairness():
+    """With one slot busy, waiting calls from different sessions run round-robin"""
+    import contextvars
+    from models.request_queue import LLMRequestQueue, llm_request_context
+
+    queue = LLMRequestQueue(max_concurrency=1)
+    order = []
+
+    def call(label):
+        with queue.slot():
+            order.append(label)
+
+    def submit(label, session):
+        with llm_request_context(session=session, priority="background"):
+            thread = threading.Thread(target=contextvars.copy_context().run, args=(call, label))
+        thread.start()
+        return thread
+
+    with queue.slot():
+        threads = []
+        for label, session in [("a1", "a"), ("a2", "a"), ("a3", "a"), ("b1", "b"), ("b2", "b")]:
+            threads.append(submit(label, session))
+            while queue.stats()["depth"] < len(threads):
+                time.sleep(0.01)
+        stats = queue.stats()
+        assert stats["depth_by_priority"] == {"background": 5}, stats
+        assert stats["sessions_waiting"] == 2, stats
+    for thread in threads:
+        thread.join(timeout=5)
+    assert order == ["a1", "b1", "a2", "b2", "a3"], order
+    assert queue.stats()["in_flight"] == 0
+    print(f"✓ Queue order: {' '.join(order)}")
+
+
+def main():
+    """Run all tests"""
+    print("Running request queue tests...")
+    print("==============================")
+
+    tests = [
+        test_request_queue_fairness,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+        print()
+
+    print(f"Tests passed: {passed}/{len(tests)}")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
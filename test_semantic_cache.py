@@ -0,0 +1,83 @@
+"""
+Test script for the semantic LLM response cache tier
+Checks that near-duplicate prompts are answered from the semantic tier, that
+task classes don't share entries, and that the index evicts least recently used
+entries at capacity. Uses a bag-of-words stand-in for the embedding model.
+"""
+
+import sys
+
+from test_ollama_pool import StandInOllama, make_manager
+
+
+def test_semantic_cache_tier():
+    """Near-duplicate prompts are answered from the semantic tier; the index evicts LRU"""
+    import tempfile
+    import numpy as np
+    from models.llm_manager import LocalLLMClient
+    from models.response_cache import LLMResponseCache
+    from models.semantic_cache import SemanticCache
+
+    def bag_of_words(text):
+        # Stand-in embedding: hashed word counts, so shared words mean high similarity
+        vector = np.zeros(64, dtype=np.float32)
+        for word in text.lower().split():
+            vector[hash(word) % 64] += 1
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    host = StandInOllama(["m1"], resident=["m1"]).start()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            manager = make_manager([host.url])
+            manager.response_cache = LLMResponseCache(directory=directory, enabled=True)
+            manager.semantic_cache = SemanticCache(manager.response_cache, capacity=2, enabled=True,
+                                                   thresholds={"summarize": 0.9}, embedder=bag_of_words)
+            client = LocalLLMClient("m1", "researcher", manager, task="summarize")
+            abstract = "raft elects a leader and replicates a log to a majority of followers " * 3
+
+            first = client.invoke(abstract)
+            near = client.invoke("  " + abstract.replace("followers", "followers\n") + " truncated")
+            assert first.response_metadata["cache"]["status"] == "miss"
+            assert near.response_metadata["cache"]["status"] == "semantic_hit", near.response_metadata
+            assert near.content == first.content and host.generate_calls == 1
+            assert near.response_metadata["cache"]["similarity"] >= 0.9
+
+            # Same prompt on another task class (different scope and threshold) is not shared
+            writer = LocalLLMClient("m1", "writer", manager)
+            assert writer.invoke(abstract).response_metadata["cache"]["status"] == "miss"
+
+            for prompt in ("b-trees keep keys sorted in pages", "css grid lays out rows and columns"):
+                client.invoke(prompt)
+            stats = manager.semantic_cache.stats()
+            assert stats["semantic_entries"] == 2 and stats["semantic_hits"] == 1, stats
+            # The abstract was least recently used and got evicted
+            assert client.invoke(abstract + " again").response_metadata["cache"]["status"] == "miss"
+        print("✓ Near-duplicate answered from semantic tier; LRU eviction at capacity")
+    finally:
+        host.stop()
+
+
+def main():
+    """Run all tests"""
+    print("Running semantic cache tests...")
+    print("===============================")
+
+    tests = [
+        test_semantic_cache_tier,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+        print()
+
+    print(f"Tests passed: {passed}/{len(tests)}")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Test script for single-flight coalescing
+Checks that concurrent identical calls run once and share the result (as
+copies) or the exception, that count_collapses sees its own context's
+collapsed calls, and that nothing is kept once a call finishes.
+"""
+
+import sys
+import threading
+import time
+
+
+def run_together(fn, args_list):
+    """Call fn with each args tuple on its own thread, all started at once"""
+    import contextvars
+
+    results = [None] * len(args_list)
+    errors = [None] * len(args_list)
+    barrier = threading.Barrier(len(args_list))
+
+    def _call(i, args):
+        barrier.wait()
+        try:
+            results[i] = fn(*args)
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=contextvars.copy_context().run, args=(_call, i, args))
+               for i, args in enumerate(args_list)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results, errors
+
+
+def test_concurrent_duplicates_collapse():
+    """Four identical calls run once; a different key runs on its own; results are copies"""
+    from utils.single_flight import coalesce, count_collapses, single_flight
+
+    runs = []
+
+    @coalesce("test_search", key=lambda query: query)
+    def search(query):
+        runs.append(query)
+        time.sleep(0.2)
+        return {"query": query, "results": [1, 2]}
+
+    single_flight.reset_stats()
+    with count_collapses() as collapses:
+        results, errors = run_together(search, [("q",)] * 4 + [("other",)])
+    assert errors == [None] * 5, errors
+    assert sorted(runs) == ["other", "q"], runs
+    assert all(r == {"query": "q", "results": [1, 2]} for r in results[:4]), results
+    assert len({id(r) for r in results[:4]}) == 4  # waiters get their own copy
+    assert collapses == ["test_search"] * 3, collapses
+    assert single_flight.stats()["test_search"] == {"executed": 2, "collapsed": 3}, single_flight.stats()
+
+    search("q")  # not a cache: a later call runs again
+    assert runs.count("q") == 2, runs
+    print("✓ 4 concurrent duplicates ran once (3 collapsed); a later call ran again")
+
+
+def test_exception_shared_and_collapses_scoped():
+    """Every waiter gets the leader's exception; count_collapses only sees its own context"""
+    from utils.single_flight import coalesce, count_collapses
+
+    @coalesce("test_failing", key=lambda query: query)
+    def failing(query):
+        time.sleep(0.2)
+        raise RuntimeError(f"search for {query} failed")
+
+    with count_collapses() as outer:
+        results, errors = run_together(failing, [("q",)] * 3)
+        with count_collapses() as inner:
+            pass
+    assert all(isinstance(e, RuntimeError) and "q failed" in str(e) for e in errors), errors
+    assert outer == ["test_failing"] * 2 and inner == [], (outer, inner)
+    print("✓ Leader's exception raised in all 3 callers")
+
+
+def main():
+    """Run all tests"""
+    print("Running single-flight tests...")
+    print("==============================")
+
+    tests = [
+        test_concurrent_duplicates_collapse,
+        test_exception_shared_and_collapses_scoped,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+        print()
+
+    print(f"Tests passed: {passed}/{len(tests)}")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Test script for the two-tier summary cache
+Checks LRU eviction and TTL expiry in the memory tier, and that the disk tier
+serves (and promotes) entries for a new cache instance on the same directory.
+"""
+
+import sys
+import time
+
+
+def test_memory_lru_and_ttl():
+    """The least recently used entry is evicted at capacity; expired entries miss"""
+    from models.summary_cache import SummaryCache
+
+    cache = SummaryCache(max_entries=2, shards=1, ttl_seconds=60, persist=False)
+    keys = [SummaryCache.make_key(f"content {i}", "query") for i in range(3)]
+    cache.set(keys[0], "zero")
+    cache.set(keys[1], "one")
+    assert cache.get(keys[0]) == "zero"  # now most recently used
+    cache.set(keys[2], "two")
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "zero" and cache.get(keys[2]) == "two"
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["memory_entries"] == 2, stats
+
+    cache = SummaryCache(max_entries=10, shards=1, ttl_seconds=1, persist=False)
+    cache.set(keys[0], "zero")
+    assert cache.get(keys[0]) == "zero"
+    time.sleep(1.1)
+    assert cache.get(keys[0]) is None
+    assert cache.stats()["expirations"] == 1, cache.stats()
+    print("✓ LRU entry evicted at capacity, expired entry dropped")
+
+
+def test_disk_tier_across_instances():
+    """A fresh instance on the same directory hits the disk tier, then memory"""
+    import tempfile
+    from models.summary_cache import SummaryCache
+
+    with tempfile.TemporaryDirectory() as directory:
+        key = SummaryCache.make_key("long document", "query", "llama3.1:8b")
+        assert key != SummaryCache.make_key("long document", "query", "mistral:7b")
+        first = SummaryCache(directory=directory, max_entries=10, ttl_seconds=60, persist=True)
+        first.set(key, "summary")
+        first.set(SummaryCache.make_key("empty", "query"), "")  # empty summaries are not stored
+
+        second = SummaryCache(directory=directory, max_entries=10, ttl_seconds=60, persist=True)
+        assert second.get(key) == "summary"
+        assert second.get(key) == "summary"
+        assert second.get(SummaryCache.make_key("empty", "query")) is None
+        stats = second.stats()
+        assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1), stats
+    print("✓ Disk tier shared across instances; hits promoted to memory")
+
+
+def main():
+    """Run all tests"""
+    print("Running summary cache tests...")
+    print("==============================")
+
+    tests = [
+        test_memory_lru_and_ttl,
+        test_disk_tier_across_instances,
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"✗ {test.__name__} failed: {e}")
+        print()
+
+    print(f"Tests passed: {passed}/{len(tests)}")
+    return 0 if passed == len(tests) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
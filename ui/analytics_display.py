@@ -2,6 +2,8 @@ import streamlit as st
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime
+from utils.telemetry import summarize_by_node
+from models.scheduler import count_swaps
 
 
 def render_analytics(result_state: dict):
@@ -385,6 +387,10 @@ def render_performance_analytics(result_state: dict):
     
     st.divider()
     
+    render_llm_latency(result_state)
+    
+    st.divider()
+    
     # Plagiarism check results
     st.subheader("Plagiarism Check Results")
     
@@ -469,4 +475,185 @@ def render_performance_analytics(result_state: dict):
             
             st.plotly_chart(fig_bar, use_container_width=True)
     else:
-        st.info("No plagiarism checks performed yet.")
\ No newline at end of file
+        st.info("No plagiarism checks performed yet.")
+
+
+def render_llm_latency(result_state: dict):
+    """Per-node LLM latency breakdown and decode throughput from the run's call ledger"""
+    st.subheader("LLM Latency")
+    calls = result_state.get("llm_calls") or []
+    if not calls:
+        st.info("No LLM calls recorded for this run.")
+        return
+    
+    by_node = summarize_by_node(calls)
+    nodes = list(by_node.keys())
+    total_wall = sum(c.get("wall_ms", 0) for c in calls)
+    decoded = [c for c in calls if c.get("tokens_per_sec")]
+    avg_tps = sum(c["tokens_per_sec"] for c in decoded) / len(decoded) if decoded else 0
+    cache_hits = sum(1 for c in calls if c.get("cache") in ("hit", "semantic_hit"))
+    semantic_hits = sum(1 for c in calls if c.get("cache") == "semantic_hit")
+    coalesced = sum(1 for c in calls if c.get("cache") == "coalesced")
+    coalesced_searches = sum(e.get("count", 0) for e in result_state.get("llm_events") or []
+                             if e.get("kind") == "coalesced_searches")
+    # Calls that reached Ollama, in ledger order; each model change may be a full reload
+    swaps = count_swaps([c.get("model") for c in calls if c.get("cache") not in ("hit", "semantic_hit", "coalesced")])
+    
+    col1, col2, col3, col4, col5, col6 = st.columns(6)
+    col1.metric("LLM Calls", len(calls))
+    col2.metric("LLM Time", f"{total_wall / 1000:.1f}s")
+    col3.metric("Avg Decode", f"{avg_tps:.1f} tok/s")
+    col4.metric("Cache Hits", cache_hits,
+                help=f"Exact and semantic (near-duplicate prompt) hits; {semantic_hits} semantic")
+    col5.metric("Coalesced", coalesced + coalesced_searches,
+                help="Duplicate LLM calls and research searches that waited on an identical in-flight request")
+    col6.metric("Model Swaps", swaps,
+                help="Consecutive calls on different models (see LLM_MODEL_AFFINITY)")
+    
+    # Stacked per-node breakdown; "Other" is wall time neither the request queue nor Ollama
+    # accounted for (network, parsing, fallback)
+    phases = [
+        ("Queue wait", "queue_ms", "#F59E0B"),
+        ("Model load", "load_ms", "#334155"),
+        ("Prompt eval", "prompt_eval_ms", "#7B8DA6"),
+        ("Decode", "eval_ms", "#60A5FA"),
+    ]
+    fig = go.Figure()
+    for label, key, color in phases:
+        fig.add_trace(go.Bar(
+            name=label,
+            x=nodes,
+            y=[by_node[n][key] / 1000 for n in nodes],
+            marker=dict(color=color)
+        ))
+    fig.add_trace(go.Bar(
+        name="Other",
+        x=nodes,
+        y=[max(0.0, by_node[n]["wall_ms"] - sum(by_node[n][k] for _, k, _ in phases)) / 1000 for n in nodes],
+        marker=dict(color="#1F2937")
+    ))
+    fig.update_layout(
+        barmode="stack",
+        title="LLM Time by Node",
+        xaxis_title="Node",
+        yaxis_title="Seconds",
+        height=400,
+        xaxis_tickangle=-45,
+        template="plotly_dark",
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        font_color="#E5E7EB",
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    
+    if decoded:
+        fig_tps = go.Figure()
+        for model in sorted({c["model"] for c in decoded}):
+            points = [(i + 1, c) for i, c in enumerate(calls) if c.get("tokens_per_sec") and c["model"] == model]
+            fig_tps.add_trace(go.Scatter(
+                name=model,
+                x=[i for i, _ in points],
+                y=[c["tokens_per_sec"] for _, c in points],
+                mode="markers+lines",
+                text=[c.get("node", "") for _, c in points],
+                hovertemplate="%{text}<br>call %{x}: %{y:.1f} tok/s<extra></extra>"
+            ))
+        fig_tps.update_layout(
+            title="Decode Throughput per Call",
+            xaxis_title="Call",
+            yaxis_title="Tokens / second",
+            height=350,
+            template="plotly_dark",
+            plot_bgcolor="rgba(0,0,0,0)",
+            paper_bgcolor="rgba(0,0,0,0)",
+            font_color="#E5E7EB",
+        )
+        st.plotly_chart(fig_tps, use_container_width=True)
+    
+    node_rows = [
+        {
+            "Node": n,
+            "Calls": int(v["calls"]),
+            "Wall (s)": round(v["wall_ms"] / 1000, 2),
+            "Queue (s)": round(v["queue_ms"] / 1000, 2),
+            "Load (s)": round(v["load_ms"] / 1000, 2),
+            "Prompt Eval (s)": round(v["prompt_eval_ms"] / 1000, 2),
+            "Decode (s)": round(v["eval_ms"] / 1000, 2),
+            "Tokens": int(v["completion_tokens"]),
+            "Tok/s": round(v["completion_tokens"] / (v["eval_ms"] / 1000), 1) if v["eval_ms"] else 0.0,
+            "Cache Hits": int(v["cache_hits"]),
+        }
+        for n, v in by_node.items()
+    ]
+    st.dataframe(node_rows, use_container_width=True, hide_index=True)
+    
+    # Per task class (see ModelConfig.TASK_CLASSES): shows whether classification traffic stays cheap
+    by_task = summarize_by_node(calls, field="task")
+    st.caption("By task class")
+    task_models = {}
+    for c in calls:
+        task_models.setdefault(c.get("task") or "unknown", set()).add(c.get("model", ""))
+    task_rows = [
+        {
+            "Task": t,
+            "Models": ", ".join(sorted(task_models.get(t, []))),
+            "Calls": int(v["calls"]),
+            "Avg Latency (s)": round(v["wall_ms"] / v["calls"] / 1000, 2) if v["calls"] else 0.0,
+            "Total (s)": round(v["wall_ms"] / 1000, 2),
+            "Tok/s": round(v["completion_tokens"] / (v["eval_ms"] / 1000), 1) if v["eval_ms"] else 0.0,
+        }
+        for t, v in by_task.items()
+    ]
+    st.dataframe(task_rows, use_container_width=True, hide_index=True)
+    
+    # Semantic cache per task: how often near-duplicates hit, and how close the misses came
+    # (a best miss just under the threshold is the signal to tune LLM_SEMANTIC_THRESHOLDS)
+    looked_up = [c for c in calls if c.get("similarity") is not None or c.get("cache") == "semantic_hit"]
+    if looked_up:
+        st.caption("Semantic cache")
+        semantic_rows = []
+        for t in dict.fromkeys(c.get("task") or "unknown" for c in looked_up):
+            task_calls = [c for c in looked_up if (c.get("task") or "unknown") == t]
+            hits = [c["similarity"] for c in task_calls if c.get("cache") == "semantic_hit"]
+            misses = [c["similarity"] for c in task_calls if c.get("cache") != "semantic_hit"]
+            semantic_rows.append({
+                "Task": t,
+                "Lookups": len(task_calls),
+                "Hits": len(hits),
+                "Hit Rate": f"{len(hits) / len(task_calls):.0%}",
+                "Mean Hit Similarity": round(sum(hits) / len(hits), 4) if hits else None,
+                "Best Miss Similarity": round(max(misses), 4) if misses else None,
+            })
+        st.dataframe(semantic_rows, use_container_width=True, hide_index=True)
+    
+    # Incremental summarization: share of each long document's chunks whose cached summary was reused
+    chunk_events = [e for e in result_state.get("llm_events") or [] if e.get("kind") == "summary_chunks"]
+    if chunk_events:
+        st.caption("Chunked summaries")
+        chunk_rows = [
+            {
+                "Node": e.get("node", ""),
+                "Chunks": e.get("chunks", 0),
+                "Reused": e.get("reused", 0),
+                "Reuse Rate": f"{e.get('reuse_rate', 0.0):.0%}",
+            }
+            for e in chunk_events
+        ]
+        st.dataframe(chunk_rows, use_container_width=True, hide_index=True)
+
+    # Circuit breaker transitions and hedged requests (see LLM_BREAKER_* / LLM_HEDGE_*)
+    events = [e for e in result_state.get("llm_events") or [] if e.get("kind") in ("circuit", "hedge")]
+    if events:
+        st.caption("Backend events")
+        event_rows = [
+            {
+                "Time": datetime.fromtimestamp(e.get("time", 0)).strftime("%H:%M:%S"),
+                "Node": e.get("node", ""),
+                "Event": e.get("kind", ""),
+                "Backend": e.get("backend", ""),
+                "Detail": (f"{e.get('previous')} → {e.get('state')}: {e.get('reason', '')}" if e.get("kind") == "circuit"
+                           else f"hedged after {e.get('delay_ms')} ms, answered by {e.get('winner')}"),
+            }
+            for e in events
+        ]
+        st.dataframe(event_rows, use_container_width=True, hide_index=True)
@@ -7,6 +7,7 @@ from ui.editor_display import render_editor
 from workflow_runner import execute_workflow_with_status
 # from state_management import get_initial_state
 from models.llm_manager import local_llm_manager
+from models.summarizer import summarizer, summary_cache
 from config import ModelConfig
 from ui.components import section_header, card, panel, status_pills, icon_button, list_row
 from ui.sidebar import process_uploaded_files
@@ -238,7 +239,7 @@ def render_welcome_screen():
 
     # Model Settings moved from sidebar
     with st.expander("Model Settings", expanded=True):
-        ollama_up = local_llm_manager.is_ollama_up()
+        ollama_up = bool(local_llm_manager.health()["up"])
         current_writer = local_llm_manager.selected_writer_model or ModelConfig.LOCAL_WRITER_MODEL
         current_researcher = local_llm_manager.selected_researcher_model or ModelConfig.LOCAL_RESEARCHER_MODEL
         models_list = local_llm_manager.available_models or []
@@ -290,6 +291,48 @@ def render_welcome_screen():
                             st.toast("Failed to stop Ollama service")
                     st.rerun()
 
+        if len(local_llm_manager.hosts.hosts) > 1:
+            st.markdown("#### Ollama Hosts")
+            host_rows = [
+                {
+                    "Host": h["url"],
+                    "Status": "Ejected" if h["ejected"] else "Up" if h["up"] else "Down",
+                    "In Flight": h["in_flight"],
+                    "Calls": h["calls"],
+                    "Failures": h["failures"],
+                    "Model Swaps": h["swaps"],
+                    "Utilization": f"{h['utilization']:.0%}",
+                    "Loaded Models": ", ".join(h["resident_models"]),
+                }
+                for h in local_llm_manager.host_utilization()
+            ]
+            st.dataframe(host_rows, use_container_width=True, hide_index=True)
+
+        # Shared LLM request queue: every session's calls pass through it (LLM_QUEUE_CONCURRENCY)
+        queue = local_llm_manager.request_queue.stats()
+        if queue["in_flight"] or queue["depth"] or any(queue["served_by_priority"].values()):
+            st.markdown("#### LLM Queue")
+            q1, q2, q3 = st.columns(3)
+            q1.metric("Running", f"{queue['in_flight']}/{queue['max_concurrency']}")
+            q2.metric("Waiting", queue["depth"], help=f"From {queue['sessions_waiting']} session(s)")
+            q3.metric("Wait (p95)", f"{queue['wait_ms']['background']['p95'] / 1000:.1f}s",
+                      help=f"Median {queue['wait_ms']['background']['p50'] / 1000:.1f}s")
+
+        summaries = summary_cache.stats()
+        if summaries["memory_hits"] + summaries["disk_hits"] + summaries["misses"]:
+            st.caption(
+                f"Summary cache: {summaries['hit_rate']:.0%} hit rate "
+                f"({summaries['memory_hits']} memory, {summaries['disk_hits']} disk, {summaries['misses']} misses), "
+                f"{summaries['evictions']} evicted · {summaries['memory_entries']} in memory, "
+                f"{summaries['disk_mb']} MB on disk"
+            )
+        chunk_reuse = summarizer.chunk_reuse_stats()
+        if chunk_reuse["calls"]:
+            st.caption(
+                f"Chunked summaries: {chunk_reuse['reuse_rate']:.0%} of {chunk_reuse['chunks']} chunks reused "
+                f"over {chunk_reuse['calls']} document(s), {chunk_reuse['last_reuse_rate']:.0%} on the last one"
+            )
+
         st.markdown("#### Model Selection")
         writer_status = "Available" if writer_available else "Not Installed"
         researcher_status = "Available" if researcher_available else "Not Installed"
@@ -300,6 +343,9 @@ def render_welcome_screen():
         writer_col1, writer_col2 = st.columns([0.45, 0.55])
         with writer_col1:
             st.markdown(f"<div style='font-weight: 600; color: {writer_status_color}; font-size: 0.9rem; margin-top: 0.2rem;'>{writer_status}</div>", unsafe_allow_html=True)
+            writer_warmup = local_llm_manager.warmup_results.get(current_writer, {})
+            if writer_warmup.get("ok"):
+                st.caption(f"Preloaded (load {writer_warmup['load_seconds']:.1f}s)")
         with writer_col2:
             writer_options = models_list if models_list else [current_writer]
             writer_index = writer_options.index(current_writer) if current_writer in writer_options else 0
@@ -315,6 +361,9 @@ def render_welcome_screen():
         researcher_col1, researcher_col2 = st.columns([0.45, 0.55])
         with researcher_col1:
             st.markdown(f"<div style='font-weight: 600; color: {researcher_status_color}; font-size: 0.9rem; margin-top: 0.2rem;'>{researcher_status}</div>", unsafe_allow_html=True)
+            researcher_warmup = local_llm_manager.warmup_results.get(current_researcher, {})
+            if researcher_warmup.get("ok"):
+                st.caption(f"Preloaded (load {researcher_warmup['load_seconds']:.1f}s)")
         with researcher_col2:
             researcher_options = models_list if models_list else [current_researcher]
             researcher_index = researcher_options.index(current_researcher) if current_researcher in researcher_options else 0
@@ -331,6 +380,7 @@ def render_welcome_screen():
             if st.button("Apply Selected Models", key="sb_apply_models", type="primary", use_container_width=True, help="Apply the selected models for content generation and research"):
                 with st.spinner("Updating model configuration..."):
                     local_llm_manager.set_default_models(writer=sb_writer, researcher=sb_researcher)
+                    local_llm_manager.start_warm_up()
                 st.success("Models updated successfully")
                 st.toast("Model configuration updated")
                 st.rerun()
@@ -0,0 +1,73 @@
+"""Splitting long text into content-defined chunks on sentence and paragraph boundaries.
+
+Boundaries come from a gear rolling hash: each character shifts the 32-bit
+hash left by one and adds a fixed random value, so the hash's top bits depend
+only on the last 32 characters. A position where those bits are zero is a
+candidate, and the cut moves forward to the next sentence or paragraph end.
+Because candidates depend on local content and not on offsets, an edit only
+changes the chunks around it: unchanged regions of an edited document produce
+the same chunks (and the same summary cache keys) as before.
+"""
+
+import math
+import random
+import re
+from typing import List, Optional
+
+# A sentence ends at ., ! or ? (plus closing quotes/brackets) followed by whitespace and a capital or digit
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[A-Z0-9\"'(\[])")
+_BOUNDARY = re.compile(r"[.!?][\"')\]]*\s+|\n\s*\n")
+
+# Fixed seed: boundaries must be identical across processes and runs
+_rng = random.Random(0x5EED)
+_GEAR = [_rng.getrandbits(32) for _ in range(256)]
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_END.split(text) if s.strip()]
+
+
+def _cut_after(text: str, position: int, limit: int) -> int:
+    """First sentence or paragraph end in text[position:limit], else the last whitespace before limit"""
+    match = _BOUNDARY.search(text, position, limit)
+    if match:
+        return match.end()
+    space = max(text.rfind(" ", position, limit), text.rfind("\n", position, limit))
+    return space + 1 if space > position else limit
+
+
+def content_defined_chunks(text: str, max_chars: int, min_chars: Optional[int] = None,
+                           avg_chars: Optional[int] = None) -> List[str]:
+    """Split text into chunks of min_chars..max_chars (about avg_chars) that cover all of it.
+
+    Defaults: min_chars = max_chars / 4, avg_chars = max_chars / 2. Only the
+    final chunk, or a run with no whitespace, can fall outside those bounds.
+    """
+    min_chars = max(32, min_chars or max_chars // 4)
+    avg_chars = max(min_chars + 1, avg_chars or max_chars // 2)
+    bits = max(1, round(math.log2(avg_chars - min_chars)))
+    mask = ((1 << bits) - 1) << (32 - bits)
+
+    chunks: List[str] = []
+    start, length = 0, len(text)
+    while start < length:
+        limit = min(start + max_chars, length)
+        cut = limit
+        if limit < length:
+            cut = None
+            h = 0
+            for i in range(start, limit):
+                h = ((h << 1) + _GEAR[ord(text[i]) & 0xFF]) & 0xFFFFFFFF
+                if i - start >= min_chars and not h & mask:
+                    cut = _cut_after(text, i, limit)
+                    break
+            if cut is None:
+                # No candidate before max_chars: cut at the last sentence end (or whitespace) that fits
+                ends = [m.end() for m in _BOUNDARY.finditer(text, start + min_chars, limit)]
+                space = max(text.rfind(" ", start + min_chars, limit), text.rfind("\n", start + min_chars, limit))
+                cut = ends[-1] if ends else space + 1 if space >= 0 else limit
+        chunk = text[start:cut].strip()
+        if chunk:
+            chunks.append(chunk)
+        start = cut
+    return chunks
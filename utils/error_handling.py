@@ -1,41 +1,199 @@
+import collections
+import concurrent.futures
+import contextvars
 import functools
+import threading
 import time
-from typing import Any, Callable
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose circuit is open"""
 
 
 class CircuitBreaker:
-    def __init__(self, failure_threshold=5, recovery_timeout=60):
+    """Stops calling a failing dependency after consecutive failures.
+
+    CLOSED: calls go through; failure_threshold consecutive failures open it.
+    OPEN: calls fail fast with CircuitOpenError until recovery_timeout passes.
+    HALF_OPEN: one trial call goes through; success closes, failure re-opens.
+
+    is_failure decides which exceptions count (e.g. not a 404 for a missing
+    model); on_transition(name, old, new, reason) is called on state changes.
+    Usable as a decorator or through call()/allow()/record_*().
+    """
+
+    def __init__(self, failure_threshold=5, recovery_timeout=60, name: str = "",
+                 is_failure: Optional[Callable[[BaseException], bool]] = None,
+                 on_transition: Optional[Callable[[str, str, str, str], Any]] = None):
         self.failure_threshold = failure_threshold
         self.recovery_timeout = recovery_timeout
-        self.failures = 0
+        self.name = name
+        self.is_failure = is_failure or (lambda e: True)
+        self.on_transition = on_transition
+        self.failures = 0  # consecutive
         self.last_failure_time = 0
         self.state = "CLOSED"  # CLOSED, OPEN, HALF_OPEN
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str, reason: str):
+        # Called with the lock held
+        old, self.state = self.state, state
+        if old != state and self.on_transition is not None:
+            self.on_transition(self.name, old, state, reason)
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (claims the single HALF_OPEN trial)"""
+        with self._lock:
+            if self.state == "OPEN":
+                if time.time() - self.last_failure_time < self.recovery_timeout:
+                    return False
+                self._transition("HALF_OPEN", f"{self.recovery_timeout}s recovery timeout elapsed")
+            if self.state == "HALF_OPEN":
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_in_flight = False
+            if self.state != "CLOSED":
+                self._transition("CLOSED", "trial call succeeded")
+
+    def record_failure(self, error: BaseException):
+        with self._lock:
+            self._trial_in_flight = False
+            if not self.is_failure(error):
+                return
+            self.failures += 1
+            self.last_failure_time = time.time()
+            if self.state == "HALF_OPEN":
+                self._transition("OPEN", f"trial call failed: {error}")
+            elif self.state == "CLOSED" and self.failures >= self.failure_threshold:
+                self._transition("OPEN", f"{self.failures} consecutive failures, last: {error}")
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit breaker {self.name} is OPEN" if self.name else "Circuit breaker is OPEN")
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return result
+
+    async def acall(self, func: Callable, *args, **kwargs) -> Any:
+        """call() for a coroutine function"""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit breaker {self.name} is OPEN" if self.name else "Circuit breaker is OPEN")
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return result
 
     def __call__(self, func: Callable) -> Any:
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            if self.state == "OPEN":
-                if time.time() - self.last_failure_time > self.recovery_timeout:
-                    self.state = "HALF_OPEN"
-                else:
-                    raise Exception("Circuit breaker is OPEN")
-
-            try:
-                result = func(*args, **kwargs)
-                if self.state == "HALF_OPEN":
-                    self.state = "CLOSED"
-                    self.failures = 0
-                return result
-            except Exception as e:
-                self.failures += 1
-                self.last_failure_time = time.time()
-                if self.failures >= self.failure_threshold:
-                    self.state = "OPEN"
-                raise e
+            return self.call(func, *args, **kwargs)
 
         return wrapper
 
 
+class LatencyWindow:
+    """Rolling window of recent call latencies (seconds) for percentile estimates"""
+
+    def __init__(self, size: int = 100):
+        self._samples = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+class HedgeError(Exception):
+    """Both the primary and the hedged secondary call failed"""
+
+    def __init__(self, primary_error: BaseException, secondary_error: Optional[BaseException] = None):
+        self.primary_error = primary_error
+        self.secondary_error = secondary_error
+        detail = f"; secondary: {secondary_error}" if secondary_error else ""
+        super().__init__(f"{primary_error}{detail}")
+
+
+def _spawn(fn: Callable[[], Any]) -> concurrent.futures.Future:
+    """Run fn on its own daemon thread, in a copy of the caller's context (so its calls reach the
+    caller's ledger). Not a shared pool: waiting for a free worker would count as the call's latency."""
+    future: concurrent.futures.Future = concurrent.futures.Future()
+    context = contextvars.copy_context()
+
+    def _run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(context.run(fn))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=_run, name="hedge", daemon=True).start()
+    return future
+
+
+def hedged_call(primary: Callable[[], Any], secondary: Callable[[], Any], delay: Optional[float],
+                on_hedge: Optional[Callable[[], Any]] = None,
+                started: Optional[threading.Event] = None) -> Tuple[Any, str]:
+    """Run primary; if it hasn't answered after delay seconds, start secondary too.
+
+    With started, the delay counts from when that event is set (e.g. once the
+    primary holds its slot in a request queue) rather than from the call; the
+    primary must set it, or finish, eventually.
+
+    Returns (result, "primary" | "secondary") from whichever succeeds first; the
+    other call is left to finish in the background. A primary failure before the
+    hedge fires is re-raised as is (the caller's normal fallback applies); once
+    both were started and both fail, HedgeError carries the two errors.
+    """
+    if delay is None:
+        return primary(), "primary"
+    first = _spawn(primary)
+    if started is not None:
+        started.wait()
+    try:
+        return first.result(timeout=delay), "primary"
+    except concurrent.futures.TimeoutError:
+        pass
+    if on_hedge is not None:
+        on_hedge()
+    labels = {first: "primary", _spawn(secondary): "secondary"}
+    errors: Dict[str, BaseException] = {}
+    pending = set(labels)
+    while pending:
+        done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result(), labels[future]
+            errors[labels[future]] = future.exception()
+    raise HedgeError(errors["primary"], errors.get("secondary"))
+
+
 def retry_with_backoff(max_retries=3, initial_delay=1, backoff_factor=2):
     def decorator(func):
         @functools.wraps(func)
@@ -0,0 +1,109 @@
+"""Query-aware extractive summarization with no model: TF-IDF plus TextRank.
+
+Sentences are scored by a mix of centrality (TextRank over the TF-IDF cosine
+similarity graph) and cosine similarity to the query, then the best ones are
+kept, in document order, until the length budget is spent. The matrix is a
+dense NumPy array over one document's vocabulary (documents are capped at
+SummarizationConfig.MAX_CONTENT_LENGTH), which keeps a summary in the
+millisecond range without scipy.
+"""
+
+import re
+from typing import List
+
+import numpy as np
+
+from utils.chunking import split_sentences
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9_\-]*")
+_STOPWORDS = frozenset("""
+a an and are as at be been but by can could did do does for from had has have how i if in into is it its
+may more most not of on or our over such than that the their them then there these they this those to
+was we were what when where which while who why will with would you your also about after all any each
+""".split())
+
+
+def _tokens(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS and len(t) > 1]
+
+
+def _textrank(similarity: np.ndarray, damping: float = 0.85, iterations: int = 50, tol: float = 1e-6) -> np.ndarray:
+    """PageRank by power iteration over a weighted sentence graph (no self-loops)"""
+    n = similarity.shape[0]
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    # A sentence sharing no terms with the rest links to every sentence equally
+    transition = np.divide(similarity, out_weight, out=np.full_like(similarity, 1.0 / n), where=out_weight > 0)
+    rank = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition.T @ rank)
+        if np.abs(updated - rank).sum() < tol:
+            return updated
+        rank = updated
+    return rank
+
+
+def _scaled(scores: np.ndarray) -> np.ndarray:
+    top = scores.max()
+    return scores / top if top > 0 else scores
+
+
+def extractive_summary(text: str, query: str = "", max_chars: int = 500, query_weight: float = 0.5,
+                       redundancy: float = 0.8) -> str:
+    """Pick the most central, query-relevant sentences that fit in max_chars.
+
+    query_weight balances query similarity against centrality (ignored when
+    the query shares no terms with the text). A sentence whose similarity to
+    one already picked exceeds redundancy is skipped.
+    """
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    sentences = split_sentences(text)
+    if len(sentences) < 2:
+        return text[:max_chars] + "..."
+
+    vocabulary = {}
+    rows, cols = [], []
+    for i, sentence in enumerate(sentences):
+        for token in _tokens(sentence):
+            rows.append(i)
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+    if not vocabulary:
+        return text[:max_chars] + "..."
+
+    n = len(sentences)
+    counts = np.zeros((n, len(vocabulary)), dtype=np.float32)
+    np.add.at(counts, (np.array(rows), np.array(cols)), 1.0)
+    document_frequency = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + n) / (1 + document_frequency)) + 1.0
+    # Sublinear term frequency, so one repeated word doesn't dominate a sentence
+    matrix = np.log1p(counts) * idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0.0)
+    scores = _scaled(_textrank(similarity))
+
+    query_columns = [vocabulary[t] for t in _tokens(query) if t in vocabulary]
+    if query_columns:
+        query_vector = np.zeros(len(vocabulary), dtype=np.float32)
+        np.add.at(query_vector, np.array(query_columns), 1.0)
+        query_vector *= idf
+        relevance = matrix @ (query_vector / np.linalg.norm(query_vector))
+        scores = (1 - query_weight) * scores + query_weight * _scaled(relevance)
+
+    picked, used = [], 0
+    for i in np.argsort(-scores, kind="stable"):
+        cost = len(sentences[i]) + (1 if picked else 0)
+        if used + cost > max_chars:
+            continue
+        if picked and similarity[i, picked].max() > redundancy:
+            continue
+        picked.append(int(i))
+        used += cost
+
+    if not picked:
+        best = sentences[int(np.argmax(scores))]
+        return best[:max_chars] + "..."
+    return " ".join(sentences[i] for i in sorted(picked))
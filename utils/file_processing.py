@@ -1,10 +1,9 @@
 import hashlib
 from PyPDF2 import PdfReader
 
-# Try to import Image processor
+# Try to import Image processor (cheap: its ML dependencies load on first OCR call)
 try:
-    from utils.ocr_processor import image_processor
-    IMAGE_PROCESSING_AVAILABLE = True
+    from utils.ocr_processor import image_processor, IMAGE_PROCESSING_AVAILABLE
 except ImportError:
     IMAGE_PROCESSING_AVAILABLE = False
     print("Image processor not available")
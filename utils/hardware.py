@@ -0,0 +1,68 @@
+"""Hardware detection for the local machine (see docs/HARDWARE_DETECTION.md).
+
+Only describes the machine this process runs on; remote Ollama hosts have to
+be described by hand (e.g. the auto-tuner's --threads / --memory-gb).
+"""
+
+import platform
+import shutil
+import subprocess
+from typing import Any, Dict
+
+import psutil
+
+
+def detect_cpu() -> Dict[str, Any]:
+    """Detect CPU specifications"""
+    return {
+        "processor": platform.processor() or platform.machine(),
+        "cores_physical": psutil.cpu_count(logical=False) or psutil.cpu_count(logical=True) or 1,
+        "cores_logical": psutil.cpu_count(logical=True) or 1,
+        "architecture": platform.machine(),  # x86_64, arm64, etc.
+    }
+
+
+def detect_gpu() -> Dict[str, Any]:
+    """Detect GPU specifications (Apple Silicon, or NVIDIA via nvidia-smi)"""
+    gpu_info = {"has_gpu": False, "gpu_type": None, "vram_gb": 0.0}
+
+    # Apple Silicon: unified memory, so the GPU can use most of RAM
+    if platform.system() == "Darwin" and platform.machine() == "arm64":
+        gpu_info.update(has_gpu=True, gpu_type="Apple Silicon", vram_gb=psutil.virtual_memory().total / 1e9)
+        return gpu_info
+
+    # NVIDIA CUDA
+    if shutil.which("nvidia-smi"):
+        try:
+            result = subprocess.run(
+                ["nvidia-smi", "--query-gpu=memory.total", "--format=csv,noheader,nounits"],
+                capture_output=True, text=True, timeout=5,
+            )
+            totals_mb = [float(line) for line in result.stdout.split() if line.strip()]
+            if result.returncode == 0 and totals_mb:
+                gpu_info.update(has_gpu=True, gpu_type="NVIDIA CUDA", vram_gb=sum(totals_mb) / 1024)
+        except (OSError, ValueError, subprocess.SubprocessError):
+            pass
+    return gpu_info
+
+
+def detect_ram() -> Dict[str, Any]:
+    """Detect RAM specifications"""
+    mem = psutil.virtual_memory()
+    return {
+        "total_gb": mem.total / 1e9,
+        "available_gb": mem.available / 1e9,
+        "percent_used": mem.percent,
+    }
+
+
+def detect_hardware() -> Dict[str, Any]:
+    return {"cpu": detect_cpu(), "gpu": detect_gpu(), "ram": detect_ram()}
+
+
+def memory_budget_gb(hardware: Dict[str, Any], fraction: float = 0.8) -> float:
+    """Memory a model may occupy: a fraction of VRAM on a discrete GPU, else of total RAM"""
+    gpu = hardware["gpu"]
+    if gpu["has_gpu"] and gpu["gpu_type"] != "Apple Silicon":
+        return gpu["vram_gb"] * fraction
+    return hardware["ram"]["total_gb"] * fraction
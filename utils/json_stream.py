@@ -0,0 +1,105 @@
+"""Tolerant JSON extraction for LLM output.
+
+JsonStreamParser is fed generated text chunk by chunk and reports when the
+first top-level object or array has closed, so generation can be stopped right
+there instead of running on into trailing whitespace or prose. parse_json
+recovers a value from a finished (or cut-off) generation: it skips code fences
+and leading prose, drops trailing commas, and closes anything left open.
+"""
+
+import json
+import re
+from typing import Any, List
+
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+
+
+class JsonStreamParser:
+    """Incremental scanner for the first top-level JSON value in a text stream."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.start = -1
+        self.end = -1
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._pos = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.end != -1
+
+    @property
+    def text(self) -> str:
+        """The JSON value seen so far (complete or not)"""
+        if self.start == -1:
+            return ""
+        return self.buffer[self.start:self.end + 1] if self.complete else self.buffer[self.start:]
+
+    def feed(self, chunk: str) -> bool:
+        """Consume a chunk; returns True once the top-level value has closed"""
+        if self.complete:
+            return True
+        self.buffer += chunk
+        while self._pos < len(self.buffer):
+            ch = self.buffer[self._pos]
+            if self.start == -1:
+                if ch in "{[":
+                    self.start = self._pos
+                    self._stack.append("}" if ch == "{" else "]")
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._stack.append("}" if ch == "{" else "]")
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if not self._stack:
+                    self.end = self._pos
+                    return True
+            self._pos += 1
+        return False
+
+    def closed_text(self) -> str:
+        """The value so far with any open string and brackets closed"""
+        text = self.text
+        if self.complete or not text:
+            return text
+        if self._in_string:
+            text += '"'
+        text = text.rstrip().rstrip(",:")
+        return text + "".join(reversed(self._stack))
+
+
+def parse_json(text: str) -> Any:
+    """Parse the first JSON object/array in LLM output, repairing what it can.
+
+    Raises ValueError when nothing usable is found.
+    """
+    text = (text or "").strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    parser = JsonStreamParser()
+    parser.feed(text)
+    candidate = parser.closed_text()
+    if not candidate:
+        raise ValueError("No JSON value found in model output")
+    try:
+        return json.loads(candidate)
+    except ValueError:
+        pass
+    try:
+        return json.loads(_TRAILING_COMMA.sub(r"\1", candidate))
+    except ValueError as e:
+        raise ValueError(f"Could not parse JSON from model output: {e}")
@@ -5,34 +5,51 @@ Handles both OCR and general image understanding with platform-optimized executi
 
 import os
 import logging
-import torch
+import importlib.util
 from typing import Optional, Dict, Any
-from PIL import Image
 import tempfile
 
-# Try to import vLLM and image processing dependencies
-try:
-    from vllm import LLM, SamplingParams
-    from transformers import AutoTokenizer, AutoProcessor
-    from PIL import Image
-    import torch
-    
-    # Check for Apple Silicon
-    IS_APPLE_SILICON = torch.backends.mps.is_available()
-    
-    # Try to import MLX for Apple Silicon optimization
+# torch, vLLM, transformers and MLX are heavy; only check they are installed here
+# and import them on first model initialization (see _load_backends) so importing
+# this module stays cheap at app startup.
+IMAGE_PROCESSING_AVAILABLE = all(
+    importlib.util.find_spec(name) is not None
+    for name in ("torch", "vllm", "transformers", "PIL")
+)
+IS_APPLE_SILICON = False
+MLX_AVAILABLE = False
+LLM = SamplingParams = AutoTokenizer = AutoProcessor = None
+_BACKENDS_LOADED = False
+
+if not IMAGE_PROCESSING_AVAILABLE:
+    logging.warning("Image processing dependencies not available. Install vllm, transformers, and PIL to enable image functionality.")
+
+
+def _load_backends() -> bool:
+    """Import vLLM/transformers/torch on first use; returns IMAGE_PROCESSING_AVAILABLE."""
+    global IMAGE_PROCESSING_AVAILABLE, IS_APPLE_SILICON, MLX_AVAILABLE, _BACKENDS_LOADED
+    global LLM, SamplingParams, AutoTokenizer, AutoProcessor
+    if _BACKENDS_LOADED or not IMAGE_PROCESSING_AVAILABLE:
+        return IMAGE_PROCESSING_AVAILABLE
     try:
-        import mlx.core as mx
-        MLX_AVAILABLE = True
+        from vllm import LLM, SamplingParams
+        from transformers import AutoTokenizer, AutoProcessor
+        import torch
+
+        # Check for Apple Silicon
+        IS_APPLE_SILICON = torch.backends.mps.is_available()
+
+        # Try to import MLX for Apple Silicon optimization
+        try:
+            import mlx.core as mx
+            MLX_AVAILABLE = True
+        except ImportError:
+            MLX_AVAILABLE = False
     except ImportError:
-        MLX_AVAILABLE = False
-    
-    IMAGE_PROCESSING_AVAILABLE = True
-except ImportError:
-    IMAGE_PROCESSING_AVAILABLE = False
-    IS_APPLE_SILICON = False
-    MLX_AVAILABLE = False
-    logging.warning("Image processing dependencies not available. Install vllm, transformers, and PIL to enable image functionality.")
+        IMAGE_PROCESSING_AVAILABLE = False
+        logging.warning("Image processing dependencies not available. Install vllm, transformers, and PIL to enable image functionality.")
+    _BACKENDS_LOADED = True
+    return IMAGE_PROCESSING_AVAILABLE
 
 logger = logging.getLogger(__name__)
 
@@ -46,7 +63,7 @@ class ImageProcessor:
         
     def initialize_ocr_model(self) -> bool:
         """Initialize the DeepSeek-OCR model with platform-optimized settings"""
-        if not IMAGE_PROCESSING_AVAILABLE:
+        if not _load_backends():
             logger.warning("Image processing dependencies not available")
             return False
             
@@ -83,7 +100,7 @@ class ImageProcessor:
     
     def initialize_vision_model(self) -> bool:
         """Initialize a general vision model for image understanding with platform-optimized settings"""
-        if not IMAGE_PROCESSING_AVAILABLE:
+        if not _load_backends():
             logger.warning("Image processing dependencies not available")
             return False
             
@@ -162,6 +179,8 @@ class ImageProcessor:
                 return "Image understanding model not available."
         
         try:
+            from PIL import Image
+
             # Load and preprocess image
             image = Image.open(image_path)
             
@@ -0,0 +1,132 @@
+"""Single-flight coalescing of identical concurrent requests.
+
+When several threads ask for the same thing at once (the same research query
+from the "web" and "perplexity" sources, the same summarizer prompt from two
+workers), only the first caller runs the request; the others wait for it and
+share its result or exception. Nothing is kept once the call finishes, so this
+is not a cache: it only removes duplicate work that overlaps in time.
+"""
+
+import contextvars
+import copy
+import functools
+import hashlib
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Tuple
+
+log = logging.getLogger(__name__)
+
+_active_collapses: contextvars.ContextVar = contextvars.ContextVar("single_flight_collapses", default=None)
+
+
+def fingerprint(*parts) -> str:
+    """Stable digest of the JSON-serialisable parts that identify a request"""
+    material = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent duplicates share the outcome."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Tuple[str, str], _Flight] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def do(self, namespace: str, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn() unless an identical call is in flight; returns (result, shared).
+
+        shared is True for callers that waited on another caller's call. An
+        exception raised by fn is re-raised in every caller.
+        """
+        flight_key = (namespace, key)
+        with self._lock:
+            stats = self._stats.setdefault(namespace, {"executed": 0, "collapsed": 0})
+            flight = self._flights.get(flight_key)
+            if flight is not None:
+                flight.waiters += 1
+                stats["collapsed"] += 1
+                leader = False
+            else:
+                flight = self._flights[flight_key] = _Flight()
+                stats["executed"] += 1
+                leader = True
+
+        if not leader:
+            collapses = _active_collapses.get()
+            if collapses is not None:
+                collapses.append(namespace)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[flight_key]
+            flight.done.set()
+            if flight.waiters:
+                log.info(f"Single-flight {namespace}: {flight.waiters} duplicate call(s) collapsed")
+        return flight.result, False
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """{namespace: {"executed", "collapsed"}} since start (or reset), across every caller in the process"""
+        with self._lock:
+            return {ns: dict(counts) for ns, counts in self._stats.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+
+# Process-wide instance shared by LLM calls and research providers
+single_flight = SingleFlight()
+
+
+@contextmanager
+def count_collapses():
+    """Collect the namespace of each call made in this context (and copies of it)
+    that was served by another caller's flight.
+
+    Unlike stats(), this only sees the caller's own calls, not those of
+    concurrent sessions.
+    """
+    collapses: List[str] = []
+    token = _active_collapses.set(collapses)
+    try:
+        yield collapses
+    finally:
+        _active_collapses.reset(token)
+
+
+def coalesce(namespace: str, key: Callable[..., Any]):
+    """Decorator: coalesce concurrent calls whose key(*args, **kwargs) match.
+
+    Waiting callers get a deep copy of the result so they can mutate it freely.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            request = fingerprint(fn.__qualname__, key(*args, **kwargs))
+            result, shared = single_flight.do(namespace, request, lambda: fn(*args, **kwargs))
+            return copy.deepcopy(result) if shared else result
+        return wrapper
+    return decorator
@@ -0,0 +1,122 @@
+"""Per-call LLM telemetry collected into a per-run ledger on the state.
+
+Workflow nodes are wrapped with traced_node(); every LocalLLMClient call made
+while a node runs (including from worker threads started with
+contextvars.copy_context()) is appended to that node's ledger, which the
+wrapper then adds to state.llm_calls. Events that aren't calls (circuit
+breaker transitions, hedged requests, chunk reuse of chunked summaries) go to
+state.llm_events the same way.
+"""
+
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+_active_ledger: contextvars.ContextVar = contextvars.ContextVar("llm_call_ledger", default=None)
+
+
+@contextmanager
+def record_llm_calls(node: str):
+    """Collect LLM calls made in this context (and copies of it) under the given node name"""
+    calls: List[Dict[str, Any]] = []
+    events: List[Dict[str, Any]] = []
+    token = _active_ledger.set((node, calls, events))
+    try:
+        yield calls, events
+    finally:
+        _active_ledger.reset(token)
+
+
+def current_node() -> Optional[str]:
+    active = _active_ledger.get()
+    return active[0] if active else None
+
+
+def record_call(model: str, role: str, metadata: Dict[str, Any], wall_seconds: float,
+                task: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Build a ledger entry from a response's metadata and append it to the active ledger"""
+    active = _active_ledger.get()
+    if active is None:
+        return None
+    node, calls, _ = active
+    timings = metadata.get("timings", {}) or {}
+    usage = metadata.get("token_usage", {}) or {}
+    eval_ms = timings.get("eval_ms", 0)
+    prompt_eval_ms = timings.get("prompt_eval_ms", 0)
+    completion_tokens = usage.get("completion_tokens", 0)
+    entry = {
+        "node": node,
+        "model": metadata.get("model", model),
+        "role": role,
+        "task": task or role,
+        "wall_ms": round(wall_seconds * 1000, 1),
+        "total_ms": timings.get("total_ms", 0),
+        "load_ms": timings.get("load_ms", 0),
+        # Waiting for a slot in the shared request queue (other sessions' calls ahead of this one)
+        "queue_ms": timings.get("queue_ms", 0),
+        "prompt_eval_ms": prompt_eval_ms,
+        "eval_ms": eval_ms,
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": completion_tokens,
+        # Decode throughput; prompt evaluation is reported separately since it runs much faster
+        "tokens_per_sec": round(completion_tokens / (eval_ms / 1000), 1) if eval_ms else 0.0,
+        "prompt_tokens_per_sec": round(
+            (metadata.get("prompt_eval", {}) or {}).get("tokens", 0) / (prompt_eval_ms / 1000), 1
+        ) if prompt_eval_ms else 0.0,
+        "cache": (metadata.get("cache", {}) or {}).get("status", "off"),
+        # Semantic cache: similarity of the hit, or of the closest stored prompt on a miss
+        "similarity": (metadata.get("cache", {}) or {}).get("similarity"),
+    }
+    calls.append(entry)
+    return entry
+
+
+def record_event(kind: str, **fields) -> Optional[Dict[str, Any]]:
+    """Append a non-call event (e.g. kind="circuit", "hedge") to the active ledger"""
+    active = _active_ledger.get()
+    if active is None:
+        return None
+    node, _, events = active
+    entry = {"node": node, "kind": kind, "time": time.time(), **fields}
+    events.append(entry)
+    return entry
+
+
+def traced_node(name: str, node):
+    """Wrap a workflow node so LLM calls (and events) made while it runs land in state.llm_calls (llm_events)"""
+    @functools.wraps(node)
+    def wrapper(state):
+        with record_llm_calls(name) as (calls, events):
+            result = node(state)
+        if not calls and not events:
+            return result
+        if isinstance(result, dict):
+            return {
+                **result,
+                "llm_calls": list(result.get("llm_calls") or state.llm_calls) + calls,
+                "llm_events": list(result.get("llm_events") or state.llm_events) + events,
+            }
+        return result.update(llm_calls=list(result.llm_calls) + calls,
+                             llm_events=list(result.llm_events) + events)
+    return wrapper
+
+
+def summarize_by_node(calls: List[Dict[str, Any]], field: str = "node") -> Dict[str, Dict[str, float]]:
+    """Aggregate ledger entries per node (or per another field, e.g. "task"), in first-seen order"""
+    summary: Dict[str, Dict[str, float]] = {}
+    for call in calls:
+        node = summary.setdefault(call.get(field) or "unknown", {
+            "calls": 0, "wall_ms": 0.0, "queue_ms": 0.0, "load_ms": 0.0, "prompt_eval_ms": 0.0, "eval_ms": 0.0,
+            "completion_tokens": 0, "cache_hits": 0,
+        })
+        node["calls"] += 1
+        node["wall_ms"] += call.get("wall_ms", 0)
+        node["queue_ms"] += call.get("queue_ms", 0)
+        node["load_ms"] += call.get("load_ms", 0)
+        node["prompt_eval_ms"] += call.get("prompt_eval_ms", 0)
+        node["eval_ms"] += call.get("eval_ms", 0)
+        node["completion_tokens"] += call.get("completion_tokens", 0)
+        node["cache_hits"] += 1 if call.get("cache") in ("hit", "semantic_hit") else 0
+    return summary
@@ -0,0 +1,119 @@
+"""Token counting and prompt budgeting with the model's own tokenizer.
+
+Ollama model names are mapped to a Hugging Face tokenizer (ModelConfig.TOKENIZER_MAP,
+extendable with the OLLAMA_TOKENIZER_MAP env var). Tokenizers are loaded once
+per model, in a background thread and from the local Hugging Face cache only
+(TOKENIZER_ALLOW_DOWNLOAD=true lets that thread fetch them), so no LLM call
+waits on transformers or the network. Until a tokenizer is ready, or when none
+is mapped or it cannot be loaded, counts fall back to a conservative
+characters-per-token estimate.
+"""
+
+import logging
+import math
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from config import ModelConfig
+
+log = logging.getLogger(__name__)
+
+# Conservative for English prose and code (real ratio is ~3.5-4.5 chars/token)
+CHARS_PER_TOKEN = 3.5
+
+def _tokenizer_repo(model: str) -> Optional[str]:
+    """Hugging Face repo for an Ollama model name, matched on the longest family prefix"""
+    family = model.split(":")[0].lower()
+    matches = [prefix for prefix in ModelConfig.TOKENIZER_MAP if family.startswith(prefix)]
+    return ModelConfig.TOKENIZER_MAP[max(matches, key=len)] if matches else None
+
+
+class TokenCounter:
+    """Counts and truncates text in a model's tokens."""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.tokenizer = None
+        repo = _tokenizer_repo(model)
+        if repo:
+            threading.Thread(target=self._load, args=(repo,), name=f"tokenizer-{model}", daemon=True).start()
+
+    def _load(self, repo: str):
+        try:
+            from transformers import AutoTokenizer  # heavy; only on first use
+
+            self.tokenizer = AutoTokenizer.from_pretrained(
+                repo, local_files_only=not ModelConfig.TOKENIZER_ALLOW_DOWNLOAD
+            )
+        except Exception as e:
+            log.warning(f"Tokenizer for {self.model} ({repo}) unavailable, estimating: {e}")
+
+    @property
+    def exact(self) -> bool:
+        return self.tokenizer is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        tokenizer = self.tokenizer
+        if tokenizer is not None:
+            return len(tokenizer.encode(text, add_special_tokens=False))
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text to at most max_tokens tokens"""
+        if max_tokens <= 0 or not text:
+            return ""
+        tokenizer = self.tokenizer
+        if tokenizer is not None:
+            ids = tokenizer.encode(text, add_special_tokens=False)
+            if len(ids) <= max_tokens:
+                return text
+            return tokenizer.decode(ids[:max_tokens])
+        return text[:int(max_tokens * CHARS_PER_TOKEN)]
+
+
+@lru_cache(maxsize=16)
+def get_token_counter(model: str) -> TokenCounter:
+    """Cached TokenCounter per model name"""
+    return TokenCounter(model)
+
+
+def count_tokens(text: str, model: str) -> int:
+    return get_token_counter(model).count(text)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str) -> str:
+    return get_token_counter(model).truncate(text, max_tokens)
+
+
+def pack_sections(sections: List[Tuple[str, str, int]], budget_tokens: int, model: str) -> Dict[str, str]:
+    """Fit named prompt sections into a token budget by priority.
+
+    sections is a list of (name, text, priority); lower priority numbers are
+    kept first. Sections are included whole while they fit, the first one that
+    doesn't is truncated to the remaining budget, and anything after is
+    emptied. Returns {name: text} for every section.
+    """
+    counter = get_token_counter(model)
+    packed = {name: "" for name, _, _ in sections}
+    remaining = budget_tokens
+    for name, text, _ in sorted(sections, key=lambda s: s[2]):
+        if remaining <= 0 or not text:
+            continue
+        tokens = counter.count(text)
+        if tokens <= remaining:
+            packed[name] = text
+            remaining -= tokens
+        else:
+            packed[name] = counter.truncate(text, remaining)
+            remaining = 0
+    return packed
+
+
+def context_window_for(needed_tokens: int) -> int:
+    """Smallest num_ctx step that holds needed_tokens, capped at ModelConfig.MAX_NUM_CTX"""
+    for size in ModelConfig.NUM_CTX_STEPS:
+        if size >= needed_tokens:
+            return min(size, ModelConfig.MAX_NUM_CTX)
+    return ModelConfig.MAX_NUM_CTX
@@ -1,6 +1,7 @@
 from langgraph.graph import StateGraph, END
 from state import EnhancedBlogState
 from nodes import *
+from utils.telemetry import traced_node
 
 def build_workflow():
     builder = StateGraph(EnhancedBlogState)
@@ -27,7 +28,7 @@ def build_workflow():
     ]
     
     for name, node in nodes:
-        builder.add_node(name, node)
+        builder.add_node(name, traced_node(name, node))
     
     # Set entry point
     builder.set_entry_point("process_inputs")
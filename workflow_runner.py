@@ -1,4 +1,6 @@
+import uuid
 import streamlit as st
+from models.request_queue import llm_request_context
 from workflow import build_workflow
 from state_management import get_initial_state
 
@@ -21,11 +23,14 @@ def execute_workflow_with_status(user_inputs: dict):
             initial_state = get_initial_state(user_inputs)
 
             st.write("Executing workflow...")
-            # Allow deeper rewrite/evaluation cycles while still bounded
-            result = workflow.invoke(
-                initial_state,
-                config={"recursion_limit": 80},
-            )
+            # Generation is background work in the shared LLM queue; sessions take turns
+            session_id = st.session_state.setdefault("llm_session_id", uuid.uuid4().hex)
+            with llm_request_context(session=session_id, priority="background"):
+                # Allow deeper rewrite/evaluation cycles while still bounded
+                result = workflow.invoke(
+                    initial_state,
+                    config={"recursion_limit": 80},
+                )
 
             # Ensure UI receives a plain dict
             st.session_state.result = result.dict() if hasattr(result, "dict") else result